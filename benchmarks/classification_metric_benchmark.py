@@ -0,0 +1,74 @@
+"""
+Benchmark of the classification metrics: sklearn f1 / precision / recall (one validation
+and confusion count each) against the single bincount of get_classification_score, and the
+sorted cumulative-sum threshold sweep against scoring every threshold separately.
+
+usage:
+    python -m benchmarks.classification_metric_benchmark
+    python -m benchmarks.classification_metric_benchmark --rows 100000 1000000 --positive-rate 0.02
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+
+from sensor.constant.training_pipeline import APS_FALSE_POSITIVE_COST, APS_FALSE_NEGATIVE_COST
+from sensor.ml.metric.classification_metric import get_classification_score, get_best_threshold
+
+
+def time_call(function, repeats: int):
+    result = function()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats, result
+
+
+def sklearn_scores(y_true, y_pred):
+    return f1_score(y_true, y_pred), precision_score(y_true, y_pred), recall_score(y_true, y_pred)
+
+
+def naive_best_threshold(y_true, probability, n_thresholds: int):
+    """
+    Scores `n_thresholds` candidate thresholds one confusion matrix at a time.
+    """
+    best = (np.inf, np.inf)
+    for threshold in np.unique(probability)[-n_thresholds:]:
+        tn, fp, fn, tp = confusion_matrix(y_true, probability >= threshold, labels=[0, 1]).ravel()
+        cost = APS_FALSE_POSITIVE_COST * fp + APS_FALSE_NEGATIVE_COST * fn
+        if cost < best[1]:
+            best = (threshold, cost)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--positive-rate", type=float, default=0.02)
+    parser.add_argument("--naive-thresholds", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'rows':>8} | {'sklearn x3':>10} | {'bincount':>9} | {'speedup':>7} | "
+          f"{'naive/thr':>9} | {'sweep (all)':>11} | distinct scores")
+    for n_rows in args.rows:
+        y_true = (rng.random(n_rows) < args.positive_rate).astype(np.int8)
+        probability = np.clip(rng.normal(0.2 + 0.5 * y_true, 0.2), 0, 1).astype(np.float32)
+        y_pred = (probability > 0.5).astype(np.int64)
+
+        sklearn_time, expected = time_call(lambda: sklearn_scores(y_true, y_pred), args.repeats)
+        engine_time, metric = time_call(lambda: get_classification_score(y_true, y_pred), args.repeats)
+        assert np.allclose(expected, (metric.f1_score, metric.precision_score, metric.recall_score))
+
+        naive_time, _ = time_call(lambda: naive_best_threshold(y_true, probability, args.naive_thresholds), 1)
+        sweep_time, (threshold, cost) = time_call(lambda: get_best_threshold(y_true, probability), args.repeats)
+        n_distinct = len(np.unique(probability))
+        print(f"{n_rows:>8} | {sklearn_time * 1e3:8.2f}ms | {engine_time * 1e3:7.2f}ms | {sklearn_time / engine_time:6.1f}x | "
+              f"{naive_time / args.naive_thresholds * 1e3:7.2f}ms | {sweep_time * 1e3:9.2f}ms | {n_distinct} "
+              f"(best threshold {threshold:.4f}, cost {cost:.0f})")
+
+
+if __name__ == "__main__":
+    main()
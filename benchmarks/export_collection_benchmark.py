@@ -0,0 +1,81 @@
+"""
+Benchmark of SensorData.export_collection_as_dataframe (list + DataFrame + replace)
+against SensorData.stream_collection_as_dataframe (batched float32 build) and
+SensorData.export_collection_partitioned (one worker process per `_id` range).
+
+Each mode runs in its own process so the reported peak RSS belongs to that mode only.
+
+usage:
+    python -m benchmarks.export_collection_benchmark --collection Live_Sensor
+    python -m benchmarks.export_collection_benchmark --seed-rows 60000   # seed a synthetic collection first
+    python -m benchmarks.export_collection_benchmark --partitions 8
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCH_COLLECTION = "Live_Sensor_benchmark"
+
+
+def seed_collection(collection_name: str, n_rows: int, n_columns: int = 170, na_rate: float = 0.05) -> None:
+    from sensor.data_access.sensor_data import SensorData
+
+    rng = np.random.default_rng(42)
+    collection = SensorData()._get_collection(collection_name)
+    collection.drop()
+    columns = [f"c{index:03d}" for index in range(n_columns)]
+    for start in range(0, n_rows, 5000):
+        size = min(5000, n_rows - start)
+        values = rng.integers(0, 100000, size=(size, n_columns)).astype(str).astype(object)
+        values[rng.random(values.shape) < na_rate] = "na"
+        labels = np.where(rng.random(size) < 0.02, "pos", "neg")
+        documents = [dict(zip(columns, row), **{"class": label}) for row, label in zip(values.tolist(), labels)]
+        collection.insert_many(documents, ordered=False)
+    print(f"seeded {n_rows} documents into '{collection_name}'")
+
+
+def run_mode(mode: str, collection_name: str, batch_size: int, n_partitions: int) -> None:
+    from sensor.data_access.sensor_data import SensorData
+
+    sensor_data = SensorData()
+    start = time.perf_counter()
+    if mode == "list":
+        df = sensor_data.export_collection_as_dataframe(collection_name=collection_name)
+    elif mode == "stream":
+        df = sensor_data.stream_collection_as_dataframe(collection_name=collection_name, batch_size=batch_size)
+    else:
+        df = sensor_data.export_collection_partitioned(collection_name=collection_name, n_partitions=n_partitions,
+                                                       batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    frame_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"{mode:>8} | rows {len(df):>8} | wall {elapsed:8.2f}s | peak rss {peak_rss_mb:9.1f} MB | frame {frame_mb:8.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collection", default=BENCH_COLLECTION)
+    parser.add_argument("--seed-rows", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--mode", choices=["list", "stream", "partitioned"])
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.collection, args.batch_size, args.partitions)
+        return
+
+    if args.seed_rows:
+        seed_collection(args.collection, args.seed_rows)
+
+    for mode in ("list", "stream", "partitioned"):
+        subprocess.run([sys.executable, "-m", "benchmarks.export_collection_benchmark", "--mode", mode, "--collection", args.collection,
+                        "--batch-size", str(args.batch_size), "--partitions", str(args.partitions)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark of the per-request preprocessing: the fitted sklearn SimpleImputer -> RobustScaler
+pipeline against FusedPreprocessor compiled from it, for batch sizes seen by /predict.
+
+usage:
+    python -m benchmarks.fused_transform_benchmark
+    python -m benchmarks.fused_transform_benchmark --batch-sizes 1 32 1024 --repeats 500
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from sensor.components.data_transformation import DataTransformation
+from sensor.ml.model.fused_transform import FusedPreprocessor
+
+
+def make_frame(rng, n_rows: int, n_columns: int, na_rate: float = 0.08) -> pd.DataFrame:
+    values = np.round(rng.lognormal(mean=6, sigma=1.5, size=(n_rows, n_columns)))
+    values[rng.random(values.shape) < na_rate] = np.nan
+    return pd.DataFrame(values, columns=[f"c{index:03d}" for index in range(n_columns)])
+
+
+def time_per_call(function, repeats: int) -> float:
+    function()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--train-rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=170)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    pipeline = DataTransformation.get_data_transformer_object().fit(make_frame(rng, args.train_rows, args.columns))
+    fused = FusedPreprocessor.from_pipeline(pipeline)
+
+    print(f"{'rows':>6} | {'sklearn':>10} | {'fused':>10} | {'speedup':>7} | max |diff|")
+    for batch_size in args.batch_sizes:
+        batch = make_frame(rng, batch_size, args.columns)
+        repeats = max(3, args.repeats * 100 // max(batch_size, 100))
+        sklearn_time = time_per_call(lambda: pipeline.transform(batch), repeats)
+        fused_time = time_per_call(lambda: fused.transform(batch), repeats)
+        max_error = np.max(np.abs(fused.transform(batch) - pipeline.transform(batch)))
+        print(f"{batch_size:>6} | {sklearn_time * 1e3:8.3f}ms | {fused_time * 1e3:8.3f}ms | {sklearn_time / fused_time:6.1f}x | {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark of the imbalance strategies of DataTransformation: wall time and memory of the
+resampling step, training time and F1 of an XGBoost model on an untouched test set.
+
+The data mimics the transformed APS training set: 170 scaled features and a rare positive
+class (about 1.7% of the rows).
+
+usage:
+    python -m benchmarks.imbalance_benchmark
+    python -m benchmarks.imbalance_benchmark --rows 120000 --strategies approx_smote class_weight
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+from sensor.ml.imbalance.strategy import IMBALANCE_STRATEGIES, get_imbalance_strategy
+from sensor.utils.memory_monitor import PeakMemoryMonitor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=60000)
+    parser.add_argument("--columns", type=int, default=170)
+    parser.add_argument("--positive-rate", type=float, default=0.017)
+    parser.add_argument("--strategies", nargs="+", default=list(IMBALANCE_STRATEGIES))
+    args = parser.parse_args()
+
+    x, y = make_classification(n_samples=args.rows, n_features=args.columns, n_informative=20, n_redundant=20,
+                               weights=[1 - args.positive_rate], flip_y=0.005, class_sep=2.0, random_state=42)
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, stratify=y, random_state=42)
+
+    print(f"{'strategy':>13} | {'resample':>9} | {'peak +MB':>8} | {'train rows':>10} | {'fit':>7} | {'F1':>6}")
+    for name in args.strategies:
+        strategy = get_imbalance_strategy(name, random_state=42)
+        with PeakMemoryMonitor() as memory:
+            start = time.perf_counter()
+            x_resampled, y_resampled = strategy.fit_resample(x_train, y_train)
+            resample_time = time.perf_counter() - start
+
+        scale_pos_weight = strategy.scale_pos_weight(y_resampled)
+        model = XGBClassifier() if scale_pos_weight is None else XGBClassifier(scale_pos_weight=scale_pos_weight)
+        start = time.perf_counter()
+        model.fit(x_resampled, y_resampled)
+        fit_time = time.perf_counter() - start
+        score = f1_score(y_test, model.predict(x_test))
+        print(f"{name:>13} | {resample_time:8.2f}s | {memory.increase_mb:8.1f} | {len(y_resampled):>10} | "
+              f"{fit_time:6.2f}s | {score:.4f}")
+        del x_resampled, y_resampled
+
+
+if __name__ == "__main__":
+    main()
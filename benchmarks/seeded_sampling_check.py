@@ -0,0 +1,65 @@
+"""
+Check of the seeded `_id` hash SensorData.export_sampled_dataframe filters on: for documents
+inserted one after the other (consecutive ObjectId counters), the kept fraction should match
+the sampling ratio and kept documents should not come in runs of consecutive inserts.
+
+The hash is evaluated in numpy with the same constants as the server-side expression, so the
+check runs without a database.
+
+usage:
+    python -m benchmarks.seeded_sampling_check
+    python -m benchmarks.seeded_sampling_check --rows 1000000 --ratios 0.01 0.1 0.25 --seeds 42 7
+"""
+import argparse
+
+import numpy as np
+from bson import ObjectId
+
+from sensor.data_access.sensor_data import _ID_HASH_MODULUS, _ID_HASH_MULTIPLIER, _id_hash_offset
+
+
+def id_hash(counters: np.ndarray, seed: int) -> np.ndarray:
+    """
+    numpy mirror of `_id_hash_expression` over the last 8 hex digits of the `_id`s.
+    """
+    value = counters.astype(np.int64) % _ID_HASH_MODULUS
+    return (value * _ID_HASH_MULTIPLIER + _id_hash_offset(seed)) % _ID_HASH_MODULUS
+
+
+def run_lengths(kept: np.ndarray) -> np.ndarray:
+    """
+    Lengths of the runs of consecutive kept documents.
+    """
+    edges = np.diff(np.concatenate([[0], kept.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.01, 0.1, 0.25, 0.5])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[42, 7])
+    args = parser.parse_args()
+
+    # ObjectIds of one inserting process: a fixed process byte followed by an incrementing counter
+    start = int(str(ObjectId())[16:], 16)
+    counters = (start + np.arange(args.rows, dtype=np.int64)) % (1 << 32)
+
+    failed = False
+    for seed in args.seeds:
+        hashes = id_hash(counters, seed)
+        for ratio in args.ratios:
+            kept = hashes < ratio * _ID_HASH_MODULUS
+            runs = run_lengths(kept)
+            fraction = kept.mean()
+            # a random downsample keeps runs of mean length 1 / (1 - ratio)
+            ok = abs(fraction - ratio) <= 4 * np.sqrt(ratio * (1 - ratio) / args.rows) and runs.mean() <= 1 / (1 - ratio) + 0.5
+            failed |= not ok
+            print(f"seed {seed:>6} | ratio {ratio:5.2f} | kept {fraction:7.4f} | mean run {runs.mean():6.2f} | "
+                  f"max run {runs.max():4d} | {'ok' if ok else 'FAILED'}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
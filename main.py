@@ -14,6 +14,8 @@ from sensor.pipeline.training_pipeline import TrainPipeline
 import os
 from sensor.utils.main_utils import read_yaml_file
 from sensor.constant.training_pipeline import SAVED_MODEL_DIR
+from sensor.utils.schema_loader import SchemaLoader
+from sensor.ml.drift.monitor import DriftMonitor
 
 
 from  fastapi import FastAPI
@@ -27,9 +29,11 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 from fastapi import FastAPI, File, UploadFile, Response
 import pandas as pd
+from typing import Optional
 
 
 app = FastAPI()
+drift_monitor = DriftMonitor(model_dir=SAVED_MODEL_DIR)
 
 
 
@@ -44,6 +48,16 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def start_drift_monitor():
+    drift_monitor.start()
+
+
+@app.on_event("shutdown")
+def stop_drift_monitor():
+    drift_monitor.stop()
+
+
 @app.get("/",tags=["authentication"])
 async def index():
     return RedirectResponse(url="/docs")
@@ -53,10 +67,10 @@ async def index():
 
 
 @app.get("/train")
-async def train():
+async def train(resume_timestamp: Optional[str] = None):
     try:
 
-        training_pipeline = TrainPipeline()
+        training_pipeline = TrainPipeline(resume_timestamp=resume_timestamp)
 
         if training_pipeline.is_pipeline_running:
             return Response("Training pipeline is already running.")
@@ -74,7 +88,7 @@ async def train():
 async def predict(file: UploadFile = File(...)):
     try:
         # Read the uploaded file into a DataFrame
-        df = pd.read_csv(file.file)
+        df = SchemaLoader.get().read_csv(file.file)
         
         # Initialize model resolver and load the best model
         model_resolver = ModelResolver(model_dir=SAVED_MODEL_DIR)
@@ -84,10 +98,16 @@ async def predict(file: UploadFile = File(...)):
         best_model_path = model_resolver.get_best_model_path()
         model = load_object(file_path=best_model_path)
         
+        # Record the batch for drift monitoring; a monitor failure must not fail the request
+        try:
+            drift_monitor.observe(df)
+        except Exception as e:
+            logging.exception(e)
+
         # Make predictions
         y_pred = model.predict(df)
         df['predicted_column'] = y_pred
-        df['predicted_column'].replace(TargetValueMapping().reverse_mapping, inplace=True)
+        df['predicted_column'] = df['predicted_column'].replace(TargetValueMapping().reverse_mapping())
         
         # Convert DataFrame to JSON and return
         prediction_results = df.to_json(orient="records")
@@ -99,6 +119,20 @@ async def predict(file: UploadFile = File(...)):
 
 
 
+@app.get("/drift")
+async def drift(refresh: bool = False):
+    try:
+        # refresh=true compares the traffic seen so far now instead of waiting for the schedule
+        if refresh:
+            drift_monitor.compare()
+        return drift_monitor.get_status()
+    except Exception as e:
+        logging.exception(e)
+        return Response(f"Error Occurred! {e}", status_code=500)
+
+
+
+
 def main():
     try:
             
@@ -2,42 +2,139 @@ import os
 import sys
 from sensor.exception import CustomException
 from sensor.logger import logging
+import pandas as pd
 from pandas import DataFrame
 from sensor.entity.config_entity import DataIngestionConfig
 from sensor.entity.artifact_entity import DataIngestionArtifact
 from sensor.data_access.sensor_data import SensorData
+from sensor.data_access.feature_store import FeatureStore
 from sklearn.model_selection import train_test_split
-from sensor.utils.main_utils import read_yaml_file
-from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.utils.main_utils import read_yaml_file, save_dataframe
+from sensor.utils.schema_loader import SchemaLoader
+from sensor.utils.artifact_store import artifact_store
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, SCHEMA_DROP_COLS, CSV_FILE_EXTENSION, TARGET_COLUMN
 
 class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig):
         try:
             self.data_ingestion_config = data_ingestion_config
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self.sampling_plan = None
             logging.info(f"Data Ingestion Config: {self.data_ingestion_config.__dict__}")
             logging.info(f"Schema Config: {self._schema_config}")
         except Exception as e:
             raise CustomException(e, sys)
         
+    def get_pushdown_columns(self) -> list:
+        """
+        Columns left on the server by the export projection (schema `drop_columns`).
+        """
+        if not self.data_ingestion_config.pushdown_projection:
+            return []
+        return list(self._schema_config.get(SCHEMA_DROP_COLS, []))
+
     def export_data_into_feature_store(self) -> DataFrame:
         try:
+            if self.data_ingestion_config.incremental_ingestion:
+                return self.export_delta_into_feature_store()
             logging.info("Exporting data from MongoDB to feature store.")
             sensor_data = SensorData()
             logging.info(f"Using collection name: {self.data_ingestion_config.collection_name}")
-            dataframe = sensor_data.export_collection_as_dataframe(collection_name=self.data_ingestion_config.collection_name)
+            if self.data_ingestion_config.sampling_ratios:
+                dataframe, self.sampling_plan = sensor_data.export_sampled_dataframe(
+                    collection_name=self.data_ingestion_config.collection_name,
+                    target_column=TARGET_COLUMN,
+                    sampling_ratios=self.data_ingestion_config.sampling_ratios,
+                    query=self.data_ingestion_config.row_filter,
+                    exclude_columns=self.get_pushdown_columns(),
+                    seed=self.data_ingestion_config.sampling_seed,
+                    batch_size=self.data_ingestion_config.export_batch_size
+                )
+            elif self.data_ingestion_config.streaming_export:
+                dataframe = sensor_data.export_collection_partitioned(
+                    collection_name=self.data_ingestion_config.collection_name,
+                    n_partitions=self.data_ingestion_config.export_partitions,
+                    batch_size=self.data_ingestion_config.export_batch_size,
+                    query=self.data_ingestion_config.row_filter,
+                    exclude_columns=self.get_pushdown_columns()
+                )
+            else:
+                dataframe = sensor_data.export_collection_as_dataframe(collection_name=self.data_ingestion_config.collection_name)
             if dataframe.empty:
                 logging.error("The DataFrame is empty after exporting data from MongoDB.")
                 raise ValueError("The exported DataFrame is empty. Check the data in MongoDB.")
+            dataframe = SchemaLoader.get().apply(dataframe)
             feature_store_file_path = self.data_ingestion_config.feature_store_dir
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            dataframe.to_csv(feature_store_file_path, index=False, header=True)
+            self.save_dataframe(feature_store_file_path, dataframe, keep=False)
             logging.info(f"Data exported to {feature_store_file_path}")
             return dataframe
         except Exception as e:
             logging.error(f"Error exporting data: {e}")
             raise CustomException(e, sys)
+    def export_delta_into_feature_store(self) -> DataFrame:
+        """
+        Incremental ingestion: fetches only the documents whose `_id` is above the
+        watermark of the persistent feature store, appends them to the store and
+        returns the full dataset (stored parts + delta).
+        """
+        try:
+            sensor_data = SensorData()
+            collection_name = self.data_ingestion_config.collection_name
+            if self.data_ingestion_config.sampling_ratios:
+                logging.warning("Class sampling is not applied in incremental ingestion, the feature store keeps every row.")
+            feature_store = FeatureStore(self.data_ingestion_config.persistent_feature_store_dir,
+                                         compression=self.data_ingestion_config.file_compression)
+
+            watermark = feature_store.get_watermark()
+            max_object_id = sensor_data.get_max_object_id(collection_name=collection_name)
+            if max_object_id is None:
+                raise ValueError(f"No documents found in collection '{collection_name}'")
+            logging.info(f"Feature store watermark: {watermark}, latest _id in collection: {max_object_id}")
+
+            stored_dataframe = feature_store.load()
+            if watermark is not None and watermark >= max_object_id:
+                logging.info("No new documents since the last ingestion.")
+                return stored_dataframe
+
+            query = {"_id": {"$lte": max_object_id}}
+            if watermark is not None:
+                query["_id"]["$gt"] = watermark
+            if self.data_ingestion_config.row_filter:
+                query = {"$and": [self.data_ingestion_config.row_filter, query]}
+            delta_dataframe = sensor_data.stream_collection_as_dataframe(
+                collection_name=collection_name,
+                batch_size=self.data_ingestion_config.export_batch_size,
+                query=query,
+                exclude_columns=self.get_pushdown_columns()
+            )
+            delta_dataframe = SchemaLoader.get().apply(delta_dataframe)
+            feature_store.append(delta_dataframe, watermark=max_object_id)
+            logging.info(f"Ingested {len(delta_dataframe)} new rows on top of {len(stored_dataframe)} stored rows.")
+
+            if stored_dataframe.empty:
+                return delta_dataframe
+            return pd.concat([stored_dataframe, delta_dataframe], ignore_index=True)
+        except Exception as e:
+            logging.error(f"Error exporting delta: {e}")
+            raise CustomException(e, sys)
+
+    def save_dataframe(self, file_path: str, dataframe: DataFrame, keep: bool = True) -> None:
+        """
+        Hands the DataFrame to the next stage through the artifact store, which writes the
+        columnar file (and, when `export_csv` is enabled, a CSV copy next to it) in the background.
+        """
+        try:
+            artifact_store.put(file_path, dataframe, save_fn=self._write_dataframe, keep=keep)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _write_dataframe(self, file_path: str, dataframe: DataFrame) -> None:
+        save_dataframe(file_path, dataframe, compression=self.data_ingestion_config.file_compression)
+        if self.data_ingestion_config.export_csv:
+            csv_file_path = os.path.splitext(file_path)[0] + CSV_FILE_EXTENSION
+            save_dataframe(csv_file_path, dataframe)
+            logging.info(f"CSV copy exported to {csv_file_path}")
+
     def split_data_as_train_test(self, dataframe: DataFrame) -> None:
         try:
             train_set, test_set = train_test_split(
@@ -45,12 +142,8 @@ class DataIngestion:
             )
             logging.info("Performed train-test split on the DataFrame.")
             
-            dir_path = os.path.dirname(self.data_ingestion_config.train_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            logging.info(f"Creating directories: {dir_path}")
-            
-            train_set.to_csv(self.data_ingestion_config.train_file_path, index=False, header=True)
-            test_set.to_csv(self.data_ingestion_config.test_file_path, index=False, header=True)
+            self.save_dataframe(self.data_ingestion_config.train_file_path, train_set)
+            self.save_dataframe(self.data_ingestion_config.test_file_path, test_set)
             logging.info(f"Train data exported to {self.data_ingestion_config.train_file_path}")
             logging.info(f"Test data exported to {self.data_ingestion_config.test_file_path}")
         except Exception as e:
@@ -69,17 +162,25 @@ class DataIngestion:
             drop_columns = self._schema_config.get('drop_columns', [])
             columns_to_drop = [col for col in drop_columns if col in dataframe.columns]
             if columns_to_drop:
-                dataframe = dataframe.drop(self._schema_config['drop_columns'], axis=1)
+                dataframe = dataframe.drop(columns_to_drop, axis=1)
                 logging.info(f"Dropped Column: {columns_to_drop}")
+            elif self.get_pushdown_columns():
+                logging.info(f"Columns {drop_columns} were already projected out by MongoDB.")
             else:
                 logging.warning(f"No columns to drop. Columns requested for dropping: {drop_columns} not found in DataFrame.")
                 
             logging.info(f"Dataframe shape after dropping columns: {dataframe.shape}")
             
             self.split_data_as_train_test(dataframe=dataframe)
+            if self.data_ingestion_config.incremental_ingestion:
+                feature_store_file_path = self.data_ingestion_config.persistent_feature_store_dir
+            else:
+                feature_store_file_path = self.data_ingestion_config.feature_store_dir
             data_ingestion_artifact = DataIngestionArtifact(
                 train_file_path=self.data_ingestion_config.train_file_path,
-                test_file_path=self.data_ingestion_config.test_file_path
+                test_file_path=self.data_ingestion_config.test_file_path,
+                feature_store_file_path=feature_store_file_path,
+                sampling_plan=self.sampling_plan
             )
             logging.info(f"Data ingestion artifact created: {data_ingestion_artifact}")
             return data_ingestion_artifact
@@ -2,7 +2,7 @@ import sys
 import os
 import numpy as np
 import pandas as pd
-from imblearn.combine import SMOTETomek
+from typing import List
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import RobustScaler
 from sklearn.pipeline import Pipeline
@@ -12,7 +12,11 @@ from sensor.entity.artifact_entity import DataTransformationArtifact, DataValida
 from sensor.entity.config_entity import DataTransformationConfig
 from sensor.logger import logging
 from sensor.ml.model.estimator import TargetValueMapping
+from sensor.ml.imbalance.strategy import get_imbalance_strategy
+from sensor.ml.model.streaming_fit import fit_preprocessor_streaming
 from sensor.utils.main_utils import save_numpy_array_data, load_numpy_array_data, save_object, load_object
+from sensor.utils.schema_loader import SchemaLoader
+from sensor.utils.artifact_store import artifact_store
 from sensor.exception import CustomException
 
 # Set the pandas option for future behavior
@@ -27,9 +31,11 @@ class DataTransformation:
             raise CustomException(e, sys)
         
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, columns=None) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            if columns is None:
+                return artifact_store.get(file_path, load_fn=SchemaLoader.get().read)
+            return SchemaLoader.get().read(file_path, columns=columns)
         except Exception as e:
             raise CustomException(e, sys)
         
@@ -48,49 +54,129 @@ class DataTransformation:
         except Exception as e:
             raise CustomException(e, sys)
     
+    def transform_in_chunks(self, preprocessor: Pipeline, file_path: str, columns: List[str]):
+        """
+        Transformed float32 features and mapped target of a saved DataFrame, read chunk by chunk
+        so the raw rows are never all in memory.
+        """
+        try:
+            features, targets = [], []
+            for chunk in SchemaLoader.get().iter_chunks(file_path, self.data_transformation_config.fit_chunk_size):
+                features.append(np.asarray(preprocessor.transform(chunk[columns].astype(np.float32)),
+                                           dtype=self.data_transformation_config.feature_dtype))
+                targets.append(chunk[TARGET_COLUMN].map(TargetValueMapping().to_dict()).astype(int).to_numpy())
+            return np.concatenate(features), np.concatenate(targets)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def fit_transform_streaming(self):
+        """
+        Streaming fit of the preprocessor and chunked transform of the train and test files:
+        memory is bounded by the transformed float32 matrices (which the imbalance strategy and
+        the trainer need whole) plus one chunk of raw rows.
+        Returns (x_train, y_train, x_test, y_test, preprocessor).
+        """
+        try:
+            train_file_path = self.data_validation_artifact.valid_train_file_path
+            test_file_path = self.data_validation_artifact.valid_test_file_path
+            # both files are read from disk, validation may still be writing them in the background
+            artifact_store.wait(train_file_path)
+            artifact_store.wait(test_file_path)
+
+            first_chunk = next(SchemaLoader.get().iter_chunks(train_file_path, 1024))
+            columns = [column for column in first_chunk.columns if column != TARGET_COLUMN]
+            preprocessor_object = fit_preprocessor_streaming(self.get_data_transformer_object(), train_file_path,
+                                                             columns=columns,
+                                                             chunk_size=self.data_transformation_config.fit_chunk_size,
+                                                             k=self.data_transformation_config.sketch_k,
+                                                             n_jobs=self.data_transformation_config.fit_workers)
+            x_train, y_train = self.transform_in_chunks(preprocessor_object, train_file_path, columns)
+            x_test, y_test = self.transform_in_chunks(preprocessor_object, test_file_path, columns)
+            return x_train, y_train, x_test, y_test, preprocessor_object
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         try:
-            train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path)
-            test_df = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
-            
-            preprocessor = self.get_data_transformer_object()
-            
-            # Training dataframe
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
-            target_feature_train_df = train_df[TARGET_COLUMN]
-            target_feature_train_df = target_feature_train_df.replace(TargetValueMapping().to_dict()).infer_objects(copy=False)
-            
-            # Testing dataframe
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
-            target_feature_test_df = test_df[TARGET_COLUMN]
-            target_feature_test_df = target_feature_test_df.replace(TargetValueMapping().to_dict()).infer_objects(copy=False)
-            
-            preprocessor_object = preprocessor.fit(input_feature_train_df)
-            
-            transformed_input_train_feature = preprocessor_object.transform(input_feature_train_df)
-            transformed_input_test_feature = preprocessor_object.transform(input_feature_test_df)
+            if self.data_transformation_config.streaming_fit:
+                (transformed_input_train_feature, target_feature_train_df,
+                 transformed_input_test_feature, target_feature_test_df, preprocessor_object) = self.fit_transform_streaming()
+            else:
+                train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path)
+                test_df = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
+                
+                preprocessor = self.get_data_transformer_object()
+                
+                # Training dataframe
+                input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
+                target_feature_train_df = train_df[TARGET_COLUMN]
+                target_feature_train_df = target_feature_train_df.map(TargetValueMapping().to_dict()).astype(int)
+                
+                # Testing dataframe
+                input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
+                target_feature_test_df = test_df[TARGET_COLUMN]
+                target_feature_test_df = target_feature_test_df.map(TargetValueMapping().to_dict()).astype(int)
+                
+                preprocessor_object = preprocessor.fit(input_feature_train_df)
+                
+                # transformed in float32, the dtype the model is trained and served with
+                transformed_input_train_feature = preprocessor_object.transform(input_feature_train_df.astype(np.float32))
+                transformed_input_test_feature = preprocessor_object.transform(input_feature_test_df.astype(np.float32))
+                target_feature_train_df = target_feature_train_df.to_numpy()
             
-            # Check if there is more than one class in the target variable
+            # Only the training set is rebalanced, the test set keeps the real class distribution
+            imbalance_strategy = get_imbalance_strategy(self.data_transformation_config.imbalance_strategy,
+                                                        k_neighbors=self.data_transformation_config.smote_k_neighbors,
+                                                        neighbor_pool=self.data_transformation_config.smote_neighbor_pool)
+            scale_pos_weight = None
             if len(np.unique(target_feature_train_df)) > 1:
-                smt = SMOTETomek(sampling_strategy="minority")
-                input_feature_train_final, target_feature_train_final = smt.fit_resample(transformed_input_train_feature, target_feature_train_df)
-                input_feature_test_final, target_feature_test_final = smt.fit_resample(transformed_input_test_feature, target_feature_test_df)
+                input_feature_train_final, target_feature_train_final = imbalance_strategy.fit_resample(transformed_input_train_feature, target_feature_train_df)
+                scale_pos_weight = imbalance_strategy.scale_pos_weight(target_feature_train_final)
+                logging.info(f"Imbalance strategy {imbalance_strategy.name}: {len(target_feature_train_df)} -> "
+                             f"{len(target_feature_train_final)} training rows, scale_pos_weight={scale_pos_weight}")
             else:
                 input_feature_train_final, target_feature_train_final = transformed_input_train_feature, target_feature_train_df
-                input_feature_test_final, target_feature_test_final = transformed_input_test_feature, target_feature_test_df
+            input_feature_test_final, target_feature_test_final = transformed_input_test_feature, target_feature_test_df
             
-            train_arr = np.c_[input_feature_train_final, np.array(target_feature_train_final)]
-            test_arr = np.c_[input_feature_test_final, np.array(target_feature_test_final)]
+            # features and target are stored apart so the trainer can memory-map contiguous float32 features
+            feature_dtype = self.data_transformation_config.feature_dtype
+            target_dtype = self.data_transformation_config.target_dtype
+            x_train = np.ascontiguousarray(input_feature_train_final, dtype=feature_dtype)
+            y_train = np.asarray(target_feature_train_final, dtype=target_dtype)
+            x_test = np.ascontiguousarray(input_feature_test_final, dtype=feature_dtype)
+            y_test = np.asarray(target_feature_test_final, dtype=target_dtype)
             
             # Save numpy array data
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_arr)
-            save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_object)
+            artifact_store.put(self.data_transformation_config.transformed_train_file_path, x_train, save_fn=save_numpy_array_data)
+            artifact_store.put(self.data_transformation_config.transformed_train_target_file_path, y_train, save_fn=save_numpy_array_data)
+            unbalanced_train_file_path = self.data_transformation_config.transformed_train_file_path
+            unbalanced_train_target_file_path = self.data_transformation_config.transformed_train_target_file_path
+            if input_feature_train_final is not transformed_input_train_feature:
+                # rows before resampling, the train metrics and validation splits of the later stages are drawn from them
+                unbalanced_train_file_path = self.data_transformation_config.transformed_unbalanced_train_file_path
+                unbalanced_train_target_file_path = self.data_transformation_config.transformed_unbalanced_train_target_file_path
+                artifact_store.put(unbalanced_train_file_path, np.ascontiguousarray(transformed_input_train_feature, dtype=feature_dtype),
+                                   save_fn=save_numpy_array_data)
+                artifact_store.put(unbalanced_train_target_file_path, np.asarray(target_feature_train_df, dtype=target_dtype),
+                                   save_fn=save_numpy_array_data)
+            artifact_store.put(self.data_transformation_config.transformed_test_file_path, x_test, save_fn=save_numpy_array_data)
+            artifact_store.put(self.data_transformation_config.transformed_test_target_file_path, y_test, save_fn=save_numpy_array_data)
+            artifact_store.put(self.data_transformation_config.transformed_object_file_path, preprocessor_object, save_fn=save_object)
             
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                imbalance_strategy=imbalance_strategy.name,
+                scale_pos_weight=scale_pos_weight,
+                transformed_train_target_file_path=self.data_transformation_config.transformed_train_target_file_path,
+                transformed_test_target_file_path=self.data_transformation_config.transformed_test_target_file_path,
+                train_shape=list(x_train.shape),
+                test_shape=list(x_test.shape),
+                feature_dtype=str(x_train.dtype),
+                target_dtype=str(y_train.dtype),
+                transformed_unbalanced_train_file_path=unbalanced_train_file_path,
+                transformed_unbalanced_train_target_file_path=unbalanced_train_target_file_path
             )
             logging.info(f"Data Transformation artifact: {data_transformation_artifact}")
             return data_transformation_artifact
@@ -1,11 +1,17 @@
 from distutils import dir_util
-from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, DATA_VALIDATION_DRIFT_THRESHOLD
 from sensor.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from sensor.entity.config_entity import DataValidationConfig
 from sensor.exception import CustomException
 from sensor.logger import logging
-from sensor.utils.main_utils import read_yaml_file, write_yaml_file
-from scipy.stats import ks_2samp
+from sensor.utils.main_utils import read_yaml_file, write_yaml_file, save_object, read_dataframe_columns
+from sensor.utils.memory_monitor import PeakMemoryMonitor
+from sensor.utils.schema_loader import SchemaLoader
+from sensor.utils.artifact_store import artifact_store
+from sensor.ml.drift.drift_engine import DriftEngine
+from sensor.ml.drift.sketch import ReferenceSketch
+from sensor.ml.drift.profile import DatasetProfile
+from typing import List
 import pandas as pd
 import os
 import sys
@@ -17,34 +23,44 @@ class DataValidation:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self._profiles = {}
         except Exception as e:
             raise CustomException(e, sys)
 
-    def drop_zero_std_columns(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+    def get_profile(self, file_path: str, dataframe: pd.DataFrame) -> DatasetProfile:
+        """
+        Profiles the DataFrame loaded from `file_path` once; every check reads the cached profile.
+        """
         try:
-            columns_to_drop = [column for column in dataframe.columns if dataframe[column].std() == 0]
+            if file_path not in self._profiles:
+                self._profiles[file_path] = DatasetProfile.from_dataframe(dataframe)
+            return self._profiles[file_path]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def drop_zero_std_columns(self, dataframe: pd.DataFrame, profile: DatasetProfile = None) -> pd.DataFrame:
+        try:
+            profile = profile if profile is not None else DatasetProfile.from_dataframe(dataframe)
+            columns_to_drop = profile.zero_variance_columns
             logging.info(f"Dropping columns with zero standard deviation: {columns_to_drop}")
             dataframe.drop(columns=columns_to_drop, inplace=True)
             return dataframe
         except Exception as e:
             raise CustomException(e, sys)
 
-    def validate_number_of_columns(self, dataframe: pd.DataFrame) -> bool:
+    def validate_number_of_columns(self, profile: DatasetProfile) -> bool:
         try:
             number_of_columns = len(self._schema_config["columns"])
             logging.info(f"Required number of columns: {number_of_columns}")
-            logging.info(f"Data frame has columns: {len(dataframe.columns)}")
+            logging.info(f"Data frame has columns: {profile.n_columns}")
 
-            return len(dataframe.columns) == number_of_columns
+            return profile.n_columns == number_of_columns
         except Exception as e:
             raise CustomException(e, sys)
 
-    def is_numerical_column_exist(self, dataframe: pd.DataFrame) -> bool:
+    def is_numerical_column_exist(self, profile: DatasetProfile) -> bool:
         try:
-            numerical_columns = self._schema_config["numerical_columns"]
-            dataframe_columns = dataframe.columns
-
-            missing_numerical_columns = [num_column for num_column in numerical_columns if num_column not in dataframe_columns]
+            missing_numerical_columns = profile.missing_numerical_columns
 
             if missing_numerical_columns:
                 logging.info(f"Missing numerical columns: {missing_numerical_columns}")
@@ -55,29 +71,36 @@ class DataValidation:
             raise CustomException(e, sys)
 
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, columns=None) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            if columns is None:
+                return artifact_store.get(file_path, load_fn=lambda path: SchemaLoader.get().read(path, schema_columns_only=False))
+            return SchemaLoader.get().read(file_path, columns=columns, schema_columns_only=False)
         except Exception as e:
             raise CustomException(e, sys)
 
-    def detect_dataset_drift(self, base_df: pd.DataFrame, current_df: pd.DataFrame, threshold=0.05) -> bool:
+    @staticmethod
+    def common_columns(base_profile: DatasetProfile, current_profile: DatasetProfile) -> List[str]:
+        current_columns = set(current_profile.columns)
+        return [column for column in base_profile.columns if column in current_columns]
+
+    def write_drift_report(self, drift_report: pd.DataFrame, base_profile: DatasetProfile,
+                           current_profile: DatasetProfile) -> bool:
+        """
+        Adds location and spread of both sides from the profiles, writes the report and
+        returns True when no column drifted.
+        """
         try:
-            status = True
-            report = {}
-            for column in base_df.columns:
-                d1 = base_df[column]
-                d2 = current_df[column]
-                is_same_dist = ks_2samp(d1, d2)
-                is_found = threshold > is_same_dist.pvalue
-                if is_found:
-                    status = False
-                report.update({
-                    column: {
-                        "p_value": float(is_same_dist.pvalue),
-                        "drift_status": is_found
-                    }
-                })
+            columns = drift_report.index
+            for prefix, profile in (("reference", base_profile), ("current", current_profile)):
+                stats = profile.to_dataframe().loc[columns, ["mean", "std"]]
+                drift_report[f"{prefix}_mean"] = stats["mean"]
+                drift_report[f"{prefix}_std"] = stats["std"]
+            status = not drift_report["drift_status"].any()
+            report = {
+                column: {key: None if pd.isna(value) else value for key, value in row.items()}
+                for column, row in drift_report.to_dict(orient="index").items()
+            }
 
             drift_report_file_path = self.data_validation_config.drift_report_file_path
 
@@ -89,33 +112,122 @@ class DataValidation:
         except Exception as e:
             raise CustomException(e, sys)
 
-    def initiate_data_validation(self) -> DataValidationArtifact:
+    def detect_dataset_drift(self, base_df: pd.DataFrame, current_df: pd.DataFrame, threshold=DATA_VALIDATION_DRIFT_THRESHOLD,
+                             base_profile: DatasetProfile = None, current_profile: DatasetProfile = None) -> bool:
         try:
-            error_message = ""
-            train_file_path = self.data_ingestion_artifact.train_file_path
-            test_file_path = self.data_ingestion_artifact.test_file_path
+            base_profile = base_profile if base_profile is not None else DatasetProfile.from_dataframe(base_df)
+            current_profile = current_profile if current_profile is not None else DatasetProfile.from_dataframe(current_df)
+            columns = DataValidation.common_columns(base_profile, current_profile)
+            with DriftEngine(threshold=threshold, n_jobs=self.data_validation_config.drift_workers) as drift_engine:
+                drift_report = drift_engine.fit(base_df, columns=columns).compare(current_df)
+            return self.write_drift_report(drift_report, base_profile, current_profile)
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            # Reading data from train and test file location
-            train_dataframe = DataValidation.read_data(train_file_path)
-            test_dataframe = DataValidation.read_data(test_file_path)
+    def save_reference_sketch(self, dataframe: pd.DataFrame) -> ReferenceSketch:
+        """
+        Summarizes the reference data into a ReferenceSketch, so later drift checks do not need the rows.
+        """
+        try:
+            reference_sketch = ReferenceSketch.from_dataframe(dataframe, k=self.data_validation_config.sketch_k)
+            save_object(self.data_validation_config.reference_sketch_file_path, reference_sketch)
+            return reference_sketch
+        except Exception as e:
+            raise CustomException(e, sys)
 
+    def validate_columns(self, train_profile: DatasetProfile, test_profile: DatasetProfile) -> None:
+        try:
+            error_message = ""
             # Validate number of columns
-            if not self.validate_number_of_columns(train_dataframe):
+            if not self.validate_number_of_columns(train_profile):
                 error_message += "Train dataframe does not contain all columns.\n"
-            if not self.validate_number_of_columns(test_dataframe):
+            if not self.validate_number_of_columns(test_profile):
                 error_message += "Test dataframe does not contain all columns.\n"
 
             # Validate numerical columns
-            if not self.is_numerical_column_exist(train_dataframe):
+            if not self.is_numerical_column_exist(train_profile):
                 error_message += "Train dataframe does not contain all numerical columns.\n"
-            if not self.is_numerical_column_exist(test_dataframe):
+            if not self.is_numerical_column_exist(test_profile):
                 error_message += "Test dataframe does not contain all numerical columns.\n"
 
             if error_message:
                 raise Exception(error_message)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def save_profiles(self, train_profile: DatasetProfile, test_profile: DatasetProfile) -> None:
+        write_yaml_file(self.data_validation_config.train_profile_file_path, train_profile.to_dict())
+        write_yaml_file(self.data_validation_config.test_profile_file_path, test_profile.to_dict())
+
+    def validate_in_memory(self, train_file_path: str, test_file_path: str) -> bool:
+        try:
+            # Reading data from train and test file location
+            train_dataframe = DataValidation.read_data(train_file_path)
+            test_dataframe = DataValidation.read_data(test_file_path)
+
+            # One profiling pass per frame feeds every check below
+            train_profile = self.get_profile(train_file_path, train_dataframe)
+            test_profile = self.get_profile(test_file_path, test_dataframe)
+            self.save_profiles(train_profile, test_profile)
+            self.validate_columns(train_profile, test_profile)
 
             logging.info("Checking data drift status")
-            status = self.detect_dataset_drift(base_df=train_dataframe, current_df=test_dataframe)
+            status = self.detect_dataset_drift(base_df=train_dataframe, current_df=test_dataframe,
+                                               base_profile=train_profile, current_profile=test_profile)
+
+            logging.info("Building reference sketch of the train data")
+            self.save_reference_sketch(train_dataframe)
+            return status
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def validate_out_of_core(self, train_file_path: str, test_file_path: str) -> bool:
+        """
+        Validation with bounded memory: schema and column checks read only the file headers,
+        profiles and sketches are accumulated over chunks of `chunk_size` rows, and drift is
+        computed between the train and test sketches.
+        """
+        try:
+            # the files are read from disk, ingestion may still be writing them in the background
+            artifact_store.wait(train_file_path)
+            artifact_store.wait(test_file_path)
+            schema_loader = SchemaLoader.get()
+            train_profile = DatasetProfile.from_columns(read_dataframe_columns(train_file_path), schema_loader)
+            test_profile = DatasetProfile.from_columns(read_dataframe_columns(test_file_path), schema_loader)
+            self.validate_columns(train_profile, test_profile)
+
+            columns = DataValidation.common_columns(train_profile, test_profile)
+            chunk_size = self.data_validation_config.chunk_size
+            reference_sketch = ReferenceSketch(columns, k=self.data_validation_config.sketch_k)
+            for chunk in schema_loader.iter_chunks(train_file_path, chunk_size, schema_columns_only=False):
+                train_profile.update(chunk)
+                reference_sketch.update(chunk)
+            current_sketch = ReferenceSketch(columns, k=self.data_validation_config.sketch_k, hist_edges=reference_sketch.hist_edges)
+            for chunk in schema_loader.iter_chunks(test_file_path, chunk_size, schema_columns_only=False):
+                test_profile.update(chunk)
+                current_sketch.update(chunk)
+            self._profiles.update({train_file_path: train_profile, test_file_path: test_profile})
+            self.save_profiles(train_profile, test_profile)
+
+            logging.info("Checking data drift status against the train sketch")
+            drift_report = reference_sketch.compare(current_sketch)
+            status = self.write_drift_report(drift_report, train_profile, test_profile)
+            save_object(self.data_validation_config.reference_sketch_file_path, reference_sketch)
+            return status
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_data_validation(self) -> DataValidationArtifact:
+        try:
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+
+            with PeakMemoryMonitor() as memory_monitor:
+                if self.data_validation_config.out_of_core:
+                    status = self.validate_out_of_core(train_file_path, test_file_path)
+                else:
+                    status = self.validate_in_memory(train_file_path, test_file_path)
+            logging.info(f"Data validation peak memory: {memory_monitor.peak_mb:.1f} MB (+{memory_monitor.increase_mb:.1f} MB)")
 
             data_validation_artifact = DataValidationArtifact(
                 validation_status=status,
@@ -124,6 +236,10 @@ class DataValidation:
                 invalid_train_file_path=None,
                 invalid_test_file_path=None,
                 drift_report_file_path=self.data_validation_config.drift_report_file_path,
+                reference_sketch_file_path=self.data_validation_config.reference_sketch_file_path,
+                train_profile_file_path=self.data_validation_config.train_profile_file_path,
+                test_profile_file_path=self.data_validation_config.test_profile_file_path,
+                peak_memory_mb=round(memory_monitor.peak_mb, 1),
             )
 
             logging.info(f"Data validation artifact: {data_validation_artifact}")
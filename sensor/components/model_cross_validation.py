@@ -0,0 +1,108 @@
+from sensor.constant.training_pipeline import TARGET_COLUMN
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.entity.artifact_entity import (DataValidationArtifact, DataTransformationArtifact, ModelTuningArtifact,
+                                           ModelCrossValidationArtifact, ClassificationMetricArtifact)
+from sensor.entity.config_entity import ModelCrossValidationConfig
+from sensor.components.data_transformation import DataTransformation
+from sensor.ml.imbalance.strategy import get_imbalance_strategy
+from sensor.ml.model.cross_validation import StratifiedKFoldEvaluation
+from sensor.ml.model.estimator import TargetValueMapping
+from sensor.utils.main_utils import save_numpy_array_data, save_dataframe, load_object
+from sensor.utils.schema_loader import SchemaLoader
+from sensor.utils.artifact_store import artifact_store
+from typing import Optional
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+
+class ModelCrossValidation:
+    """
+    Stratified k-fold evaluation of the model over every validated row (train and test files),
+    so the accept / reject decision of the trainer does not rest on one random split.
+    """
+
+    def __init__(self, model_cross_validation_config: ModelCrossValidationConfig, data_validation_artifact: DataValidationArtifact,
+                 data_transformation_artifact: DataTransformationArtifact, model_tuning_artifact: Optional[ModelTuningArtifact] = None):
+        try:
+            self.model_cross_validation_config = model_cross_validation_config
+            self.data_validation_artifact = data_validation_artifact
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_tuning_artifact = model_tuning_artifact
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def save_dataset(self) -> None:
+        """
+        Saves the raw float32 features of the train and test rows, in the column order of the
+        fitted preprocessor, and their target as one pair the fold workers memory-map. Rows are
+        neither transformed nor rebalanced here: each fold fits its own imputer and scaler on
+        its training rows and rebalances them, so the validation rows never influence either.
+        """
+        try:
+            preprocessor = artifact_store.get(self.data_transformation_artifact.transformed_object_file_path, load_fn=load_object)
+            dataframe = pd.concat([artifact_store.get(file_path, load_fn=SchemaLoader.get().read) for file_path in
+                                   (self.data_validation_artifact.valid_train_file_path, self.data_validation_artifact.valid_test_file_path)],
+                                  ignore_index=True)
+            target = dataframe[TARGET_COLUMN].map(TargetValueMapping().to_dict()).astype(int)
+            features = dataframe[list(preprocessor.feature_names_in_)].to_numpy(dtype=np.float32)
+            save_numpy_array_data(self.model_cross_validation_config.features_file_path,
+                                  np.ascontiguousarray(features, dtype=self.model_cross_validation_config.feature_dtype))
+            save_numpy_array_data(self.model_cross_validation_config.target_file_path,
+                                  np.asarray(target, dtype=self.model_cross_validation_config.target_dtype))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_model_cross_validation(self) -> ModelCrossValidationArtifact:
+        try:
+            self.save_dataset()
+
+            # the model the trainer fits: its engine, tuned hyperparameters, XGBoost defaults otherwise
+            params = {}
+            if self.model_tuning_artifact is not None:
+                params = dict(self.model_tuning_artifact.best_params)
+                if self.model_cross_validation_config.engine != "quantile_dmatrix":
+                    params["n_estimators"] = self.model_tuning_artifact.best_rounds
+            quantile_params = {
+                "max_bin": self.model_cross_validation_config.max_bin,
+                "max_rounds": self.model_cross_validation_config.max_rounds,
+                "early_stopping_rounds": self.model_cross_validation_config.early_stopping_rounds,
+                "validation_split": self.model_cross_validation_config.validation_split,
+                "batch_rows": self.model_cross_validation_config.batch_rows,
+            }
+            imbalance_strategy = get_imbalance_strategy(self.model_cross_validation_config.imbalance_strategy,
+                                                        k_neighbors=self.model_cross_validation_config.smote_k_neighbors,
+                                                        neighbor_pool=self.model_cross_validation_config.smote_neighbor_pool,
+                                                        random_state=self.model_cross_validation_config.seed)
+            evaluation = StratifiedKFoldEvaluation(
+                n_splits=self.model_cross_validation_config.n_splits,
+                n_jobs=self.model_cross_validation_config.workers,
+                nthread=self.model_cross_validation_config.nthread,
+                imbalance_strategy=imbalance_strategy,
+                params=params,
+                seed=self.model_cross_validation_config.seed,
+                engine=self.model_cross_validation_config.engine,
+                quantile_params=quantile_params,
+                preprocessor=DataTransformation.get_data_transformer_object(),
+            ).fit(self.model_cross_validation_config.features_file_path, self.model_cross_validation_config.target_file_path)
+
+            os.makedirs(os.path.dirname(self.model_cross_validation_config.folds_file_path), exist_ok=True)
+            evaluation.fold_results.to_csv(self.model_cross_validation_config.folds_file_path, index=False)
+            save_dataframe(self.model_cross_validation_config.fold_predictions_file_path, evaluation.fold_predictions)
+
+            model_cross_validation_artifact = ModelCrossValidationArtifact(
+                folds_file_path=self.model_cross_validation_config.folds_file_path,
+                fold_predictions_file_path=self.model_cross_validation_config.fold_predictions_file_path,
+                n_splits=self.model_cross_validation_config.n_splits,
+                mean_metric_artifact=ClassificationMetricArtifact(**evaluation.mean),
+                variance_metric_artifact=ClassificationMetricArtifact(**evaluation.variance),
+                train_mean_metric_artifact=ClassificationMetricArtifact(**evaluation.train_mean),
+                best_threshold=evaluation.best_threshold,
+                best_threshold_cost=evaluation.best_threshold_cost,
+            )
+            logging.info(f"Model cross validation artifact: {model_cross_validation_artifact}")
+            return model_cross_validation_artifact
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -11,9 +11,15 @@ from sensor.ml.metric.classification_metric import get_classification_score
 from sensor.ml.model.estimator import SensorModel
 
 from sensor.utils.main_utils import save_object,load_object,write_yaml_file
+from sensor.utils.schema_loader import SchemaLoader
+from sensor.utils.artifact_store import artifact_store
 from sensor.ml.model.estimator import ModelResolver
 from sensor.constant.training_pipeline import TARGET_COLUMN
 from sensor.ml.model.estimator import TargetValueMapping
+from sensor.ml.model.prediction_cache import PredictionCache, hash_file, hash_rows
+from sklearn.model_selection import train_test_split
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas  as  pd
 
 
@@ -33,8 +39,78 @@ class ModelEvaluation:
             self.model_trainer_artifact=model_trainer_artifact
         except Exception as e:
             raise CustomException(e,sys)
-    
 
+    def subsample(self, df: pd.DataFrame, y_true: pd.Series):
+        """
+        Stratified subsample of `max_rows` rows when the evaluation data is larger.
+        """
+        try:
+            if len(df) <= self.model_eval_config.max_rows:
+                return df, y_true
+            index, _ = train_test_split(np.arange(len(df)), train_size=self.model_eval_config.max_rows,
+                                        stratify=y_true.to_numpy(), random_state=self.model_eval_config.seed)
+            index = np.sort(index)
+            logging.info(f"Evaluating on a stratified subsample of {len(index)} of {len(df)} rows")
+            return df.iloc[index], y_true.iloc[index]
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def predict(self, model_file_path: str, df: pd.DataFrame, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Loads a model and scores `df` (only `rows`, a boolean mask, when given).
+        """
+        try:
+            model = artifact_store.get(model_file_path, load_fn=load_object)
+            return np.asarray(model.predict(df if rows is None else df[rows]))
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def score_models(self, train_model_file_path: str, latest_model_path: str, df: pd.DataFrame):
+        """
+        Predictions of the trained and the best model on `df`, scored side by side by
+        `workers` threads (model prediction releases the GIL). With the prediction cache the
+        best model only scores the rows it has no cached prediction for, and the trained
+        model's predictions are kept for the run where it is the best model.
+        Returns (trained predictions, best model predictions, best model rows from the cache).
+        """
+        try:
+            prediction_cache, row_hashes, latest_model_hash = None, None, None
+            latest_pred = None
+            missing = np.ones(len(df), dtype=bool)
+            if self.model_eval_config.prediction_cache:
+                prediction_cache = PredictionCache(self.model_eval_config.prediction_cache_dir,
+                                                   max_models=self.model_eval_config.prediction_cache_max_models)
+                row_hashes = hash_rows(df)
+                latest_model_hash = hash_file(latest_model_path)
+                latest_pred, hit = prediction_cache.lookup(latest_model_hash, row_hashes)
+                missing = ~hit
+
+            with ThreadPoolExecutor(max_workers=max(1, self.model_eval_config.workers)) as executor:
+                trained_future = executor.submit(self.predict, train_model_file_path, df)
+                latest_future = executor.submit(self.predict, latest_model_path, df, missing) if missing.any() else None
+                y_trained_pred = trained_future.result()
+                y_missing_pred = latest_future.result() if latest_future is not None else None
+
+            if latest_pred is None:
+                return y_trained_pred, y_missing_pred, 0
+            if y_missing_pred is not None:
+                latest_pred[missing] = y_missing_pred
+                prediction_cache.update(latest_model_hash, row_hashes[missing], y_missing_pred)
+            return y_trained_pred, latest_pred, int((~missing).sum())
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def cache_trained_predictions(self, train_model_file_path: str, df: pd.DataFrame, y_trained_pred: np.ndarray) -> None:
+        """
+        Caches the predictions of an accepted model, the best model of the next run.
+        """
+        try:
+            # the pusher copies the model file as is, so the content hash is the one of the saved model
+            artifact_store.wait(train_model_file_path)
+            PredictionCache(self.model_eval_config.prediction_cache_dir, max_models=self.model_eval_config.prediction_cache_max_models) \
+                .update(hash_file(train_model_file_path), hash_rows(df), y_trained_pred)
+        except Exception as e:
+            raise CustomException(e,sys)
 
     def initiate_model_evaluation(self)->ModelEvaluationArtifact:
         try:
@@ -42,14 +118,13 @@ class ModelEvaluation:
             valid_test_file_path = self.data_validation_artifact.valid_test_file_path
 
             #valid train and test file dataframe
-            train_df = pd.read_csv(valid_train_file_path)
-            test_df = pd.read_csv(valid_test_file_path)
+            schema_loader = SchemaLoader.get()
+            train_df = artifact_store.get(valid_train_file_path, load_fn=schema_loader.read)
+            test_df = artifact_store.get(valid_test_file_path, load_fn=schema_loader.read)
 
-            df = pd.concat([train_df,test_df])
+            df = pd.concat([train_df,test_df], ignore_index=True)
 
-            y_true = df[TARGET_COLUMN]
-
-            y_true.replace(TargetValueMapping().to_dict(),inplace=True)
+            y_true = df[TARGET_COLUMN].map(TargetValueMapping().to_dict()).astype(int)
 
             df.drop(TARGET_COLUMN,axis=1,inplace=True)
 
@@ -77,11 +152,9 @@ class ModelEvaluation:
 
             latest_model_path = model_resolver.get_best_model_path()
 
-            latest_model = load_object(file_path=latest_model_path)
-            train_model = load_object(file_path=train_model_file_path)
-            
-            y_trained_pred = train_model.predict(df)
-            y_latest_pred  =latest_model.predict(df)
+            df, y_true = self.subsample(df, y_true)
+            y_trained_pred, y_latest_pred, latest_cached_rows = self.score_models(train_model_file_path, latest_model_path, df)
+            logging.info(f"Scored {len(df)} rows, {latest_cached_rows} best model predictions from the cache")
 
             trained_metric = get_classification_score(y_true, y_trained_pred)
             latest_metric = get_classification_score(y_true, y_latest_pred)
@@ -94,6 +167,8 @@ class ModelEvaluation:
             else:
                 is_model_accepted=False
 
+            if is_model_accepted and self.model_eval_config.prediction_cache:
+                self.cache_trained_predictions(train_model_file_path, df, y_trained_pred)
             
             model_evaluation_artifact = ModelEvaluationArtifact(
                     is_model_accepted=is_model_accepted, 
@@ -101,7 +176,9 @@ class ModelEvaluation:
                     best_model_path=latest_model_path, 
                     trained_model_path=train_model_file_path, 
                     train_model_metric_artifact=trained_metric, 
-                    best_model_metric_artifact=latest_metric)
+                    best_model_metric_artifact=latest_metric,
+                    evaluated_rows=len(df),
+                    best_model_cached_rows=latest_cached_rows)
 
             model_eval_report = model_evaluation_artifact.__dict__
 
@@ -1,7 +1,9 @@
 from sensor.exception import CustomException
 from sensor.logger import logging
-from sensor.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact
+from sensor.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact, DataValidationArtifact
 from sensor.entity.config_entity import ModelPusherConfig
+from sensor.utils.artifact_store import artifact_store
+from typing import Optional
 import os
 import sys
 import shutil
@@ -12,17 +14,20 @@ class ModelPusher:
     It copies the model from the evaluation artifact to the specified paths in the configuration.
     """
     
-    def __init__(self, model_pusher_config: ModelPusherConfig, model_eval_artifact: ModelEvaluationArtifact):
+    def __init__(self, model_pusher_config: ModelPusherConfig, model_eval_artifact: ModelEvaluationArtifact,
+                 data_validation_artifact: Optional[DataValidationArtifact] = None):
         """
         Initializes the ModelPusher with configuration and model evaluation artifact.
         
         :param model_pusher_config: ModelPusherConfig object containing the configuration for model pushing.
         :param model_eval_artifact: ModelEvaluationArtifact object containing the evaluated model details.
+        :param data_validation_artifact: DataValidationArtifact whose reference sketch is pushed next to the model.
         """
         try:
             logging.info("Initializing ModelPusher.")
             self.model_pusher_config = model_pusher_config
             self.model_eval_artifact = model_eval_artifact
+            self.data_validation_artifact = data_validation_artifact
             logging.info(f"ModelPusherConfig: {self.model_pusher_config}")
             logging.info(f"ModelEvaluationArtifact: {self.model_eval_artifact}")
         except Exception as e:
@@ -46,6 +51,9 @@ class ModelPusher:
             logging.info(f"Model file path: {model_file_path}")
             logging.info(f"Saved model path: {saved_model_path}")
 
+            # the trained model may still be written by the artifact store
+            artifact_store.wait(trained_model_path)
+
             logging.info("Creating model pusher directory to save model.")
             os.makedirs(os.path.dirname(model_file_path), exist_ok=True)
             shutil.copy(src=trained_model_path, dst=model_file_path)
@@ -55,10 +63,19 @@ class ModelPusher:
             shutil.copy(src=trained_model_path, dst=saved_model_path)
             logging.info(f"Model copied to saved model path: {saved_model_path}")
 
+            saved_reference_sketch_path = None
+            reference_sketch_file_path = getattr(self.data_validation_artifact, "reference_sketch_file_path", None)
+            if reference_sketch_file_path and os.path.exists(reference_sketch_file_path):
+                saved_reference_sketch_path = self.model_pusher_config.saved_reference_sketch_path
+                shutil.copy(src=reference_sketch_file_path, dst=self.model_pusher_config.reference_sketch_file_path)
+                shutil.copy(src=reference_sketch_file_path, dst=saved_reference_sketch_path)
+                logging.info(f"Reference sketch copied to saved model dir: {saved_reference_sketch_path}")
+
             logging.info("Preparing ModelPusherArtifact.")
             model_pusher_artifact = ModelPusherArtifact(
                 saved_model_path=saved_model_path,
-                model_file_path=model_file_path
+                model_file_path=model_file_path,
+                saved_reference_sketch_path=saved_reference_sketch_path
             )
             logging.info(f"ModelPusherArtifact created: {model_pusher_artifact}")
             return model_pusher_artifact
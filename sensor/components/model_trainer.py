@@ -1,76 +1,269 @@
 from sensor.utils.main_utils import load_numpy_array_data
 from sensor.exception import CustomException
 from sensor.logger import logging
-from sensor.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from sensor.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ModelTuningArtifact, DataValidationArtifact, ModelCrossValidationArtifact
 from sensor.entity.config_entity import ModelTrainerConfig
+from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
+from sensor.constant.training_pipeline import TARGET_COLUMN
+from sensor.data_access.feature_store import FeatureStore
+from sensor.ml.imbalance.strategy import get_imbalance_strategy
 from sensor.ml.metric.classification_metric import get_classification_score
-from sensor.ml.model.estimator import SensorModel
+from sensor.ml.model.estimator import SensorModel, ModelResolver, TargetValueMapping
+from sensor.ml.model.xgb_training import train_quantile_dmatrix, continue_training
 from sensor.utils.main_utils import save_object, load_object
+from sensor.utils.artifact_store import artifact_store
+from functools import partial
+from typing import Optional
+import numpy as np
+import pandas as pd
 import os
 import sys
+import time
 
 class ModelTrainer:
 
-    def __init__(self, model_trainer_config: ModelTrainerConfig, data_transformation_artifact: DataTransformationArtifact):
+    def __init__(self, model_trainer_config: ModelTrainerConfig, data_transformation_artifact: DataTransformationArtifact,
+                 model_tuning_artifact: Optional[ModelTuningArtifact] = None,
+                 data_validation_artifact: Optional[DataValidationArtifact] = None,
+                 model_cross_validation_artifact: Optional[ModelCrossValidationArtifact] = None):
+        """
+        :param data_validation_artifact: valid test file a warm-started model is scored on, warm starts are off without it
+        :param model_cross_validation_artifact: when given, a fully retrained model is accepted on its k-fold metrics
+        """
         try:
             self.model_trainer_config = model_trainer_config
             self.data_transformation_artifact = data_transformation_artifact
+            self.model_tuning_artifact = model_tuning_artifact
+            self.data_validation_artifact = data_validation_artifact
+            self.model_cross_validation_artifact = model_cross_validation_artifact
         except Exception as e:
             raise CustomException(e, sys)
 
+    @staticmethod
+    def load_transformed_data(features_file_path: str, target_file_path: Optional[str]):
+        """
+        Returns (features, target) of a transformed split. Artifacts written before features and
+        target were stored apart hold both in one array, the target being the last column.
+        """
+        try:
+            load_mmap = partial(load_numpy_array_data, mmap_mode="r")
+            features = artifact_store.get(features_file_path, load_fn=load_mmap)
+            if target_file_path is None:
+                return features[:, :-1], features[:, -1]
+            return features, artifact_store.get(target_file_path, load_fn=load_mmap)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load_unbalanced_train_data(self):
+        """
+        Training rows before the imbalance strategy resampled them, i.e. with the class distribution
+        of the test split. Falls back to the training split for artifacts that do not record them.
+        """
+        if self.data_transformation_artifact.transformed_unbalanced_train_file_path is None:
+            return self.load_transformed_data(self.data_transformation_artifact.transformed_train_file_path,
+                                              self.data_transformation_artifact.transformed_train_target_file_path)
+        return self.load_transformed_data(self.data_transformation_artifact.transformed_unbalanced_train_file_path,
+                                          self.data_transformation_artifact.transformed_unbalanced_train_target_file_path)
+
     def train_model(self, x_train, y_train):
         try:
-            xgb_clf = XGBClassifier()
+            # set when the imbalance strategy weights the classes instead of resampling them
+            scale_pos_weight = self.data_transformation_artifact.scale_pos_weight
+            # hyperparameters found by the tuning stage, XGBoost defaults otherwise
+            params = dict(self.model_tuning_artifact.best_params) if self.model_tuning_artifact is not None else {}
+            if self.model_trainer_config.engine == "quantile_dmatrix":
+                # (x_train, y_train) are the rows before resampling, rebalanced after the early stopping hold-out
+                imbalance_strategy = get_imbalance_strategy(self.model_trainer_config.imbalance_strategy,
+                                                            k_neighbors=self.model_trainer_config.smote_k_neighbors,
+                                                            neighbor_pool=self.model_trainer_config.smote_neighbor_pool)
+                return train_quantile_dmatrix(x_train, y_train, imbalance_strategy, params=params,
+                                              nthread=self.model_trainer_config.nthread,
+                                              max_bin=self.model_trainer_config.max_bin,
+                                              max_rounds=self.model_trainer_config.max_rounds,
+                                              early_stopping_rounds=self.model_trainer_config.early_stopping_rounds,
+                                              validation_split=self.model_trainer_config.validation_split,
+                                              batch_rows=self.model_trainer_config.batch_rows)
+            if self.model_tuning_artifact is not None:
+                params["n_estimators"] = self.model_tuning_artifact.best_rounds
+            if scale_pos_weight is not None:
+                params["scale_pos_weight"] = scale_pos_weight
+            xgb_clf = XGBClassifier(**params)
             xgb_clf.fit(x_train, y_train)
             return xgb_clf
         except Exception as e:
             raise CustomException(e, sys)
 
-    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+    def check_metrics(self, classification_train_metric, classification_test_metric) -> None:
+        # Checking if trained model meets expected accuracy
+        if classification_train_metric.f1_score <= self.model_trainer_config.expected_accuracy:
+            raise CustomException("Trained model does not meet expected accuracy.")
+
+        # Checking for overfitting/underfitting
+        diff = abs(classification_train_metric.f1_score - classification_test_metric.f1_score)
+        if diff > self.model_trainer_config.overfitting_underfitting_threshold:
+            raise CustomException("Model shows signs of overfitting or underfitting.")
+
+    def get_data_watermark(self) -> Optional[str]:
+        """
+        Watermark of the persistent feature store the data of this run was read from.
+        """
+        if not self.model_trainer_config.incremental_ingestion:
+            return None
+        return FeatureStore(self.model_trainer_config.feature_store_dir).read_manifest().get("watermark")
+
+    @staticmethod
+    def get_drift_share(delta_df: pd.DataFrame) -> Optional[float]:
+        """
+        Share of features of `delta_df` drifted from the reference sketch of the best model,
+        None when that model was pushed without one.
+        """
+        reference_sketch_path = ModelResolver().get_best_reference_sketch_path()
+        if not os.path.exists(reference_sketch_path):
+            return None
+        reference = load_object(reference_sketch_path)
+        columns = [column for column in reference.columns if column != TARGET_COLUMN and column in delta_df.columns]
+        drift_report = reference.select(columns).compare(delta_df)
+        return float(drift_report["drift_status"].mean())
+
+    @staticmethod
+    def transform_raw(preprocessor, dataframe: pd.DataFrame):
+        """
+        Features and target of raw rows, transformed as DataTransformation does with the given preprocessor.
+        """
+        target = dataframe[TARGET_COLUMN].map(TargetValueMapping().to_dict())
+        dataframe = dataframe[target.notna().to_numpy()]
+        features = preprocessor.transform(dataframe[list(preprocessor.feature_names_in_)].astype(np.float32))
+        return np.ascontiguousarray(features, dtype=np.float32), target.dropna().to_numpy(dtype=np.int8)
+
+    def warm_start(self) -> Optional[ModelTrainerArtifact]:
+        """
+        Continues boosting the best model on the rows ingested since it was trained, keeping its
+        fitted preprocessor. Returns None, meaning a full retrain, when there is nothing to warm
+        start from, when the rows added since the last full retrain exceed `warm_start_max_delta_ratio`
+        of the rows it saw, or when more than `warm_start_max_drift_share` of the features drifted.
+        The model is scored on a stratified `warm_start_test_split` of the new rows, held out from
+        the boosting: the validated test file holds rows the champion was trained on.
+        """
         try:
-            train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            test_file_path = self.data_transformation_artifact.transformed_test_file_path
+            model_resolver = ModelResolver()
+            if self.data_validation_artifact is None or not model_resolver.is_model_exists():
+                return None
+            best_model_path = model_resolver.get_best_model_path()
+            champion = load_object(best_model_path)
+            training_state = getattr(champion, "training_state", None)
+            if not training_state or training_state.get("data_watermark") is None:
+                logging.info(f"Full retrain: {best_model_path} has no data watermark to warm start from")
+                return None
 
-            # Loading training and testing data arrays
-            train_arr = load_numpy_array_data(train_file_path)
-            test_arr = load_numpy_array_data(test_file_path)
+            delta_df = FeatureStore(self.model_trainer_config.feature_store_dir).load_since(training_state["data_watermark"])
+            if delta_df is None or delta_df.empty:
+                logging.info(f"Full retrain: no rows in the feature store after watermark {training_state['data_watermark']}")
+                return None
+            delta_rows = training_state["delta_rows"] + len(delta_df)
+            delta_ratio = delta_rows / max(training_state["full_train_rows"], 1)
+            if delta_ratio > self.model_trainer_config.warm_start_max_delta_ratio:
+                logging.info(f"Full retrain: {delta_rows} rows added since the last full retrain ({delta_ratio:.2%})")
+                return None
+            drift_share = self.get_drift_share(delta_df)
+            if drift_share is not None and drift_share > self.model_trainer_config.warm_start_max_drift_share:
+                logging.info(f"Full retrain: {drift_share:.2%} of the features drifted in the new rows")
+                return None
 
-            x_train, y_train = train_arr[:, :-1], train_arr[:, -1]
-            x_test, y_test = test_arr[:, :-1], test_arr[:, -1]
+            x_delta, y_delta = self.transform_raw(champion.preprocessor, delta_df)
+            classes, class_counts = np.unique(y_delta, return_counts=True)
+            n_test = int(np.ceil(len(y_delta) * self.model_trainer_config.warm_start_test_split))
+            if len(classes) < 2 or class_counts.min() < 2 or min(n_test, len(y_delta) - n_test) < len(classes):
+                logging.info(f"Full retrain: too few new rows per class to hold out a test set ({dict(zip(classes, class_counts))})")
+                return None
+            x_delta, x_test, y_delta, y_test = train_test_split(x_delta, y_delta, test_size=n_test, stratify=y_delta,
+                                                                random_state=self.model_trainer_config.warm_start_seed)
 
-            # Training the model
-            model = self.train_model(x_train, y_train)
+            start = time.perf_counter()
+            model = continue_training(champion.model, x_delta, y_delta, rounds=self.model_trainer_config.warm_start_rounds)
+            train_time_seconds = time.perf_counter() - start
+            n_rounds = model.get_booster().num_boosted_rounds()
+            logging.info(f"Warm start: {self.model_trainer_config.warm_start_rounds} rounds on {len(y_delta)} new rows "
+                         f"on top of {best_model_path} in {train_time_seconds:.2f}s, {len(y_test)} new rows held out")
 
-            # Evaluating on training data
-            y_train_pred = model.predict(x_train)
-            classification_train_metric = get_classification_score(y_true=y_train, y_pred=y_train_pred)
+            classification_train_metric = get_classification_score(y_true=y_delta, y_pred=model.predict(x_delta))
+            classification_test_metric = get_classification_score(y_true=y_test, y_pred=model.predict(x_test))
+            self.check_metrics(classification_train_metric, classification_test_metric)
 
-            # Checking if trained model meets expected accuracy
-            if classification_train_metric.f1_score <= self.model_trainer_config.expected_accuracy:
-                raise CustomException("Trained model does not meet expected accuracy.")
+            training_state = {**training_state, "data_watermark": self.get_data_watermark(), "delta_rows": delta_rows,
+                              "warm_starts": training_state["warm_starts"] + 1, "mode": "warm_start"}
+            sensor_model = SensorModel(preprocessor=champion.preprocessor, model=model, training_state=training_state)
+            artifact_store.put(self.model_trainer_config.trained_model_file_path, sensor_model, save_fn=save_object)
 
-            # Evaluating on testing data
+            return ModelTrainerArtifact(
+                trained_model_file_path=self.model_trainer_config.trained_model_file_path,
+                train_metric_artifact=classification_train_metric,
+                test_metric_artifact=classification_test_metric,
+                n_rounds=n_rounds,
+                train_time_seconds=train_time_seconds,
+                training_mode="warm_start"
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        try:
+            if self.model_trainer_config.warm_start:
+                model_trainer_artifact = self.warm_start()
+                if model_trainer_artifact is not None:
+                    logging.info(f"Model trainer artifact: {model_trainer_artifact}")
+                    return model_trainer_artifact
+
+            # Memory-mapped float32 features and small integer targets, no copy before training
+            x_train, y_train = self.load_transformed_data(self.data_transformation_artifact.transformed_train_file_path,
+                                                          self.data_transformation_artifact.transformed_train_target_file_path)
+            x_test, y_test = self.load_transformed_data(self.data_transformation_artifact.transformed_test_file_path,
+                                                        self.data_transformation_artifact.transformed_test_target_file_path)
+            x_train_unbalanced, y_train_unbalanced = self.load_unbalanced_train_data()
+
+            # Training the model, the quantile engine holds its early stopping rows out before resampling
+            start = time.perf_counter()
+            if self.model_trainer_config.engine == "quantile_dmatrix":
+                model = self.train_model(x_train_unbalanced, y_train_unbalanced)
+            else:
+                model = self.train_model(x_train, y_train)
+            train_time_seconds = time.perf_counter() - start
+            # trees the model predicts with: an early stopped booster is cut after its best iteration
+            n_rounds = model.get_booster().num_boosted_rounds()
+            logging.info(f"Trained {n_rounds} rounds with engine {self.model_trainer_config.engine} in {train_time_seconds:.2f}s")
+
+            # Evaluating on training and testing data, the training rows as they were before resampling
+            # so both metrics are measured on the real class distribution
+            y_train_pred = model.predict(x_train_unbalanced)
+            classification_train_metric = get_classification_score(y_true=y_train_unbalanced, y_pred=y_train_pred)
             y_test_pred = model.predict(x_test)
             classification_test_metric = get_classification_score(y_true=y_test, y_pred=y_test_pred)
-
-            # Checking for overfitting/underfitting
-            diff = abs(classification_train_metric.f1_score - classification_test_metric.f1_score)
-            if diff > self.model_trainer_config.overfitting_underfitting_threshold:
-                raise CustomException("Model shows signs of overfitting or underfitting.")
+            if self.model_cross_validation_artifact is not None:
+                # mean metrics over the folds instead of the single train / test split
+                self.check_metrics(self.model_cross_validation_artifact.train_mean_metric_artifact,
+                                   self.model_cross_validation_artifact.mean_metric_artifact)
+            else:
+                self.check_metrics(classification_train_metric, classification_test_metric)
 
             # Loading preprocessor object and saving trained model
-            preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
-            model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
-            os.makedirs(model_dir_path, exist_ok=True)
-            sensor_model = SensorModel(preprocessor=preprocessor, model=model)
-            save_object(self.model_trainer_config.trained_model_file_path, obj=sensor_model)
+            preprocessor = artifact_store.get(self.data_transformation_artifact.transformed_object_file_path, load_fn=load_object)
+            data_watermark = self.get_data_watermark()
+            # later warm starts measure their delta against the rows of this full retrain
+            full_train_rows = FeatureStore(self.model_trainer_config.feature_store_dir).read_manifest()["rows"] \
+                if data_watermark is not None else len(y_train)
+            training_state = {"data_watermark": data_watermark, "full_train_rows": full_train_rows, "delta_rows": 0,
+                              "warm_starts": 0, "mode": "full"}
+            sensor_model = SensorModel(preprocessor=preprocessor, model=model, training_state=training_state)
+            artifact_store.put(self.model_trainer_config.trained_model_file_path, sensor_model, save_fn=save_object)
 
             # Creating model trainer artifact
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_trainer_config.trained_model_file_path,
                 train_metric_artifact=classification_train_metric,
-                test_metric_artifact=classification_test_metric
+                test_metric_artifact=classification_test_metric,
+                n_rounds=n_rounds,
+                train_time_seconds=train_time_seconds,
+                training_mode="full"
             )
             logging.info(f"Model trainer artifact: {model_trainer_artifact}")
             return model_trainer_artifact
@@ -0,0 +1,63 @@
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.entity.artifact_entity import DataTransformationArtifact, ModelTuningArtifact
+from sensor.entity.config_entity import ModelTuningConfig
+from sensor.ml.imbalance.strategy import get_imbalance_strategy
+from sensor.ml.model.hyperparameter_search import SuccessiveHalvingSearch
+from sensor.utils.artifact_store import artifact_store
+import os
+import sys
+
+
+class ModelTuning:
+
+    def __init__(self, model_tuning_config: ModelTuningConfig, data_transformation_artifact: DataTransformationArtifact):
+        try:
+            self.model_tuning_config = model_tuning_config
+            self.data_transformation_artifact = data_transformation_artifact
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_model_tuning(self) -> ModelTuningArtifact:
+        try:
+            # rows before resampling, the search holds validation rows out of them and rebalances the rest
+            features_file_path = self.data_transformation_artifact.transformed_unbalanced_train_file_path
+            target_file_path = self.data_transformation_artifact.transformed_unbalanced_train_target_file_path
+            if features_file_path is None or target_file_path is None:
+                raise ValueError("Model tuning needs the training rows before resampling, rerun data transformation")
+            # the workers memory-map the arrays, so they have to be on disk
+            artifact_store.wait(features_file_path)
+            artifact_store.wait(target_file_path)
+
+            imbalance_strategy = get_imbalance_strategy(self.model_tuning_config.imbalance_strategy,
+                                                        k_neighbors=self.model_tuning_config.smote_k_neighbors,
+                                                        neighbor_pool=self.model_tuning_config.smote_neighbor_pool,
+                                                        random_state=self.model_tuning_config.seed)
+            search = SuccessiveHalvingSearch(
+                n_configurations=self.model_tuning_config.n_configurations,
+                min_rounds=self.model_tuning_config.min_rounds,
+                max_rounds=self.model_tuning_config.max_rounds,
+                eta=self.model_tuning_config.eta,
+                n_jobs=self.model_tuning_config.workers,
+                validation_split=self.model_tuning_config.validation_split,
+                overfitting_threshold=self.model_tuning_config.overfitting_underfitting_threshold,
+                max_bin=self.model_tuning_config.max_bin,
+                batch_rows=self.model_tuning_config.batch_rows,
+                imbalance_strategy=imbalance_strategy,
+                seed=self.model_tuning_config.seed,
+            ).fit(features_file_path, target_file_path)
+
+            os.makedirs(os.path.dirname(self.model_tuning_config.results_file_path), exist_ok=True)
+            search.results.to_csv(self.model_tuning_config.results_file_path, index=False)
+
+            model_tuning_artifact = ModelTuningArtifact(
+                results_file_path=self.model_tuning_config.results_file_path,
+                best_params=search.best_params,
+                best_rounds=int(search.best_rounds),
+                best_validation_f1=float(search.best_validation_f1),
+                n_configurations=self.model_tuning_config.n_configurations,
+            )
+            logging.info(f"Model tuning artifact: {model_tuning_artifact}")
+            return model_tuning_artifact
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,2 +1,10 @@
 APP_HOST = "127.0.0.1"
-APP_PORT = 8080
\ No newline at end of file
+APP_PORT = 8080
+
+"""
+Online drift monitor for /predict traffic
+"""
+DRIFT_MONITOR_INTERVAL_SECONDS: int = 300
+DRIFT_MONITOR_WINDOWS: int = 12
+DRIFT_MONITOR_BUFFER_ROWS: int = 5000
+DRIFT_MONITOR_MIN_ROWS: int = 100
@@ -1,2 +1,16 @@
 DATABASE_NAME = "Sensor"
-COLLECTION_NAME = 'Live_Sensor'
\ No newline at end of file
+COLLECTION_NAME = 'Live_Sensor'
+
+# missing sensor readings are stored as this literal string in the collection
+NA_VALUE = "na"
+EXPORT_BATCH_SIZE = 10000
+# partitioned export forks the calling process, opt-in for standalone training runs
+EXPORT_PARTITIONS = 1
+# documents read to decide which columns are numeric before a partitioned export
+EXPORT_SAMPLE_SIZE = 1000
+
+# bulk loading of CSV dumps into the collection
+BULK_LOAD_CHUNK_SIZE = 50000
+BULK_LOAD_BATCH_SIZE = 5000
+BULK_LOAD_WORKERS = 4
+BULK_LOAD_MAX_RETRIES = 3
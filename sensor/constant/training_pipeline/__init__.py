@@ -3,18 +3,37 @@ import os
 TARGET_COLUMN = "class"
 PIPELINE_NAME = "sensor"
 ARTIFACT_DIR = "artifact"
-FILE_NAME = "sensor.csv"
+FILE_NAME = "sensor.parquet"
 
 SAVED_MODEL_DIR =os.path.join("saved_models")
 
 
-TRAIN_FILE_NAME: str = "train.csv"
-TEST_FILE_NAME: str = "test.csv"
+TRAIN_FILE_NAME: str = "train.parquet"
+TEST_FILE_NAME: str = "test.parquet"
+CSV_FILE_EXTENSION: str = ".csv"
 
 
 PREPROCSSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 MODEL_FILE_NAME = "model.pkl"
 
+# APS failure challenge misclassification costs: an unnecessary check vs a missed failure
+APS_FALSE_POSITIVE_COST: float = 10
+APS_FALSE_NEGATIVE_COST: float = 500
+
+
+# stage outputs are handed to the next stage in memory and written to disk in the background
+ARTIFACT_IN_MEMORY_HANDOFF: bool = True
+ARTIFACT_WRITER_THREADS: int = 2
+
+# stages whose fingerprint (inputs, config, schema, code) matches an earlier run reuse its artifact
+STAGE_CACHE_ENABLED: bool = True
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+
+# per run manifest of completed stages, used to resume a failed run from its artifact dir
+CHECKPOINT_FILE_NAME: str = "checkpoint.yaml"
+CHECKPOINT_STATUS_COMPLETED: str = "completed"
+CHECKPOINT_STATUS_FAILED: str = "failed"
+
 
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 SCHEMA_DROP_COLS = "drop_columns"
@@ -29,6 +48,25 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATION: float = 0.2
+DATA_INGESTION_STREAMING_EXPORT: bool = True
+DATA_INGESTION_EXPORT_BATCH_SIZE: int = 10000
+# > 1 forks export workers from the calling process: opt-in, not from the API server (threads)
+DATA_INGESTION_EXPORT_PARTITIONS: int = 1
+# server side push-down: schema drop_columns are projected out, rows are filtered with a
+# MongoDB query and classes listed in the ratios are downsampled, e.g. {"neg": 0.25}
+DATA_INGESTION_PUSHDOWN_PROJECTION: bool = True
+DATA_INGESTION_ROW_FILTER: dict = {}
+DATA_INGESTION_SAMPLING_RATIOS: dict = {}
+DATA_INGESTION_SAMPLING_SEED: int = 42
+DATA_INGESTION_INCREMENTAL: bool = False
+DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR: str = os.path.join("feature_store")
+DATA_INGESTION_FEATURE_STORE_MANIFEST_FILE_NAME: str = "manifest.yaml"
+DATA_INGESTION_FEATURE_STORE_COMPRESSION: str = "snappy"
+DATA_INGESTION_EXPORT_CSV: bool = False
+# reuse the ingestion of an earlier run when the collection fingerprint matches: opt-in, the fingerprint
+# (document count, latest `_id` and, where the server runs it, the dbHash of the collection) may miss
+# in-place updates, and every later stage follows a reused ingestion
+DATA_INGESTION_STAGE_CACHE: bool = False
 
 
 
@@ -41,6 +79,17 @@ DATA_VALIDATION_VALID_DIR: str = "validated"
 DATA_VALIDATION_INVALID_DIR: str = "invalid"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_PROFILE_DIR: str = "profile"
+DATA_VALIDATION_OUT_OF_CORE: bool = False
+DATA_VALIDATION_CHUNK_SIZE: int = 50000
+DATA_VALIDATION_DRIFT_THRESHOLD: float = 0.05
+DATA_VALIDATION_DRIFT_METRICS: list = ["ks", "psi", "wasserstein"]
+DATA_VALIDATION_PSI_BINS: int = 10
+DATA_VALIDATION_DRIFT_WORKERS: int = 1
+DATA_VALIDATION_DRIFT_BLOCK_SIZE: int = 8
+DATA_VALIDATION_REFERENCE_SKETCH_DIR: str = "reference_sketch"
+DATA_VALIDATION_SKETCH_K: int = 1024
+REFERENCE_SKETCH_FILE_NAME: str = "reference_sketch.pkl"
 
 
 """
@@ -50,6 +99,26 @@ Data Transformation realted constant Start With Data_Transformation
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_TARGET_FILE_SUFFIX: str = "_target"
+# the transformed training rows before the imbalance strategy resampled them, the metrics are computed on them
+DATA_TRANSFORMATION_UNBALANCED_FILE_SUFFIX: str = "_unbalanced"
+DATA_TRANSFORMATION_FEATURE_DTYPE: str = "float32"
+DATA_TRANSFORMATION_TARGET_DTYPE: str = "int8"
+# how the class imbalance of the training set is handled: "smote_tomek", "approx_smote" or "class_weight"
+DATA_TRANSFORMATION_IMBALANCE_STRATEGY: str = "smote_tomek"
+DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS: int = 5
+DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL: int = 2000
+# fit the preprocessor from quantile sketches and transform the train / test files chunk by chunk,
+# only the transformed float32 matrices are held whole
+DATA_TRANSFORMATION_STREAMING_FIT: bool = False
+DATA_TRANSFORMATION_FIT_CHUNK_SIZE: int = 50000
+DATA_TRANSFORMATION_FIT_WORKERS: int = 1
+DATA_TRANSFORMATION_SKETCH_K: int = 1024
+# inference-only fused imputer -> scaler: rows per reused transform buffer, and the tolerances
+# the fused output must match the fitted sklearn pipeline within
+FUSED_TRANSFORM_MAX_BUFFER_ROWS: int = 65536
+FUSED_TRANSFORM_RTOL: float = 1e-4
+FUSED_TRANSFORM_ATOL: float = 1e-4
 
 
 """
@@ -61,6 +130,55 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODEL_TRAINER_OVER_FITING_UNDER_FITING_THRESHOLD: float = 0.05
+# "xgb_classifier" fits XGBClassifier on the arrays, "quantile_dmatrix" trains on a QuantileDMatrix with early stopping
+MODEL_TRAINER_ENGINE: str = "xgb_classifier"
+MODEL_TRAINER_NTHREAD: int = -1
+MODEL_TRAINER_MAX_BIN: int = 256
+MODEL_TRAINER_MAX_ROUNDS: int = 1000
+MODEL_TRAINER_EARLY_STOPPING_ROUNDS: int = 20
+MODEL_TRAINER_VALIDATION_SPLIT: float = 0.1
+MODEL_TRAINER_BATCH_ROWS: int = 16384
+# continue boosting the champion on the rows ingested since it was trained (needs DATA_INGESTION_INCREMENTAL),
+# with a full retrain once the cumulative delta or the drift of the delta exceeds its threshold
+MODEL_TRAINER_WARM_START: bool = False
+MODEL_TRAINER_WARM_START_ROUNDS: int = 20
+MODEL_TRAINER_WARM_START_MAX_DELTA_RATIO: float = 0.25
+MODEL_TRAINER_WARM_START_MAX_DRIFT_SHARE: float = 0.3
+# stratified share of the new rows held out to score the warm started model, no model has trained on them
+MODEL_TRAINER_WARM_START_TEST_SPLIT: float = 0.2
+MODEL_TRAINER_WARM_START_SEED: int = 42
+
+
+"""
+Model Tuning (successive halving hyperparameter search) related constants
+"""
+MODEL_TUNING_ENABLED: bool = False
+MODEL_TUNING_DIR_NAME: str = "model_tuning"
+MODEL_TUNING_RESULTS_FILE_NAME: str = "results.csv"
+MODEL_TUNING_N_CONFIGURATIONS: int = 27
+MODEL_TUNING_MIN_ROUNDS: int = 20
+MODEL_TUNING_MAX_ROUNDS: int = 540
+MODEL_TUNING_ETA: int = 3
+MODEL_TUNING_WORKERS: int = 1
+MODEL_TUNING_VALIDATION_SPLIT: float = 0.2
+MODEL_TUNING_SEED: int = 42
+
+
+"""
+Model Cross Validation (stratified k-fold evaluation) related constants
+"""
+MODEL_CROSS_VALIDATION_ENABLED: bool = False
+MODEL_CROSS_VALIDATION_DIR_NAME: str = "model_cross_validation"
+MODEL_CROSS_VALIDATION_DATA_DIR: str = "data"
+MODEL_CROSS_VALIDATION_FEATURES_FILE_NAME: str = "features.npy"
+MODEL_CROSS_VALIDATION_TARGET_FILE_NAME: str = "target.npy"
+MODEL_CROSS_VALIDATION_FOLDS_FILE_NAME: str = "folds.csv"
+MODEL_CROSS_VALIDATION_PREDICTIONS_FILE_NAME: str = "fold_predictions.parquet"
+MODEL_CROSS_VALIDATION_N_SPLITS: int = 5
+# fold worker processes, and XGBoost threads per fold model (-1: cores split evenly between the workers)
+MODEL_CROSS_VALIDATION_WORKERS: int = 1
+MODEL_CROSS_VALIDATION_NTHREAD: int = -1
+MODEL_CROSS_VALIDATION_SEED: int = 42
 
 
 """
@@ -69,6 +187,15 @@ Model Evaluation Related Constant
 MODEL_EVALUATION_DIR_NAME = "model_evaluation"
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_EVALUATION_REPORT_NAME = "report.yaml"
+# predictions of saved models per row content, shared by every run, so the champion only scores new rows
+MODEL_EVALUATION_PREDICTION_CACHE: bool = True
+MODEL_EVALUATION_PREDICTION_CACHE_DIR: str = os.path.join("prediction_cache")
+MODEL_EVALUATION_PREDICTION_CACHE_MAX_MODELS: int = 4
+# stratified subsample of the evaluation rows above this size
+MODEL_EVALUATION_MAX_ROWS: int = 200000
+MODEL_EVALUATION_SEED: int = 42
+# threads scoring the trained and the best model side by side
+MODEL_EVALUATION_WORKERS: int = 2
 
 
 """
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, List, Optional
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+from sensor.constant.database import NA_VALUE, BULK_LOAD_CHUNK_SIZE, BULK_LOAD_BATCH_SIZE, BULK_LOAD_WORKERS, BULK_LOAD_MAX_RETRIES
+from sensor.exception import CustomException
+from sensor.logger import logging
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+RETRY_BACKOFF_SECONDS = 0.5
+
+
+def chunk_to_documents(chunk: pd.DataFrame) -> List[dict]:
+    """
+    Builds documents column-wise from the typed arrays of a CSV chunk.
+    Missing floats are written back as the "na" string the collection already uses.
+    """
+    columns = chunk.columns.to_list()
+    column_values = []
+    for column in columns:
+        values = chunk[column].to_numpy()
+        if values.dtype.kind == "f":
+            missing = np.isnan(values)
+            if missing.any():
+                values = values.astype(object)
+                values[missing] = NA_VALUE
+        column_values.append(values.tolist())
+    return [dict(zip(columns, row)) for row in zip(*column_values)]
+
+
+def insert_batch(collection: Collection, documents: List[dict], max_retries: int = BULK_LOAD_MAX_RETRIES) -> int:
+    """
+    Unordered insert_many with retries. pymongo assigns `_id` to the documents before
+    sending them, so a resent document that already made it raises a duplicate key
+    error, which is treated as success. Only the documents that failed are resent.
+    """
+    pending = documents
+    for attempt in range(max_retries + 1):
+        try:
+            collection.insert_many(pending, ordered=False)
+            return len(documents)
+        except BulkWriteError as e:
+            failed = [error["index"] for error in e.details.get("writeErrors", [])
+                      if error.get("code") != DUPLICATE_KEY_ERROR_CODE]
+            if not failed:
+                return len(documents)
+            pending = [pending[index] for index in failed]
+            last_error = e
+        except PyMongoError as e:
+            last_error = e
+        if attempt < max_retries:
+            logging.warning(f"Insert of {len(pending)} documents failed (attempt {attempt + 1}): {last_error}")
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+    raise last_error
+
+
+def bulk_load_csv(collection: Collection, file_path: str,
+                  chunk_size: int = BULK_LOAD_CHUNK_SIZE,
+                  batch_size: int = BULK_LOAD_BATCH_SIZE,
+                  n_workers: int = BULK_LOAD_WORKERS,
+                  max_retries: int = BULK_LOAD_MAX_RETRIES,
+                  progress_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Loads a CSV dump into `collection` chunk by chunk. Each chunk is turned into
+    documents and sent as unordered insert_many batches of `batch_size` from a pool of
+    `n_workers` threads. At most 2 * n_workers batches are in flight, which bounds memory.
+    Returns the number of inserted documents.
+    """
+    try:
+        inserted = 0
+        start_time = time.perf_counter()
+
+        def collect(futures) -> None:
+            nonlocal inserted
+            for future in futures:
+                inserted += future.result()
+            rate = inserted / max(time.perf_counter() - start_time, 1e-9)
+            logging.info(f"Bulk load into '{collection.name}': {inserted} documents inserted ({rate:.0f} docs/s)")
+            if progress_callback is not None:
+                progress_callback(inserted)
+
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            pending = set()
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size, na_values=[NA_VALUE]):
+                documents = chunk_to_documents(chunk)
+                for start in range(0, len(documents), batch_size):
+                    if len(pending) >= 2 * n_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(insert_batch, collection, documents[start:start + batch_size], max_retries))
+            done, _ = wait(pending)
+            collect(done)
+        return inserted
+    except Exception as e:
+        raise CustomException(e, sys)
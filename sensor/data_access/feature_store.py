@@ -0,0 +1,82 @@
+from typing import List, Optional
+import os
+import sys
+import pandas as pd
+from bson import ObjectId
+from sensor.constant.training_pipeline import DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR, DATA_INGESTION_FEATURE_STORE_MANIFEST_FILE_NAME, DATA_INGESTION_FEATURE_STORE_COMPRESSION
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.utils.main_utils import read_yaml_file, write_yaml_file, save_dataframe, read_dataframe
+
+
+class FeatureStore:
+    """
+    Persistent, append-only feature store shared by every pipeline run.
+    Each incremental ingestion appends its delta as a new part file and moves the
+    watermark (the largest MongoDB `_id` ingested so far) forward in the manifest.
+    Only the parts listed in the manifest belong to the store, so a part written by a
+    run that failed before updating the manifest is ignored and fetched again.
+    """
+
+    def __init__(self, feature_store_dir: str = DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR,
+                 compression: Optional[str] = DATA_INGESTION_FEATURE_STORE_COMPRESSION):
+        self.feature_store_dir = feature_store_dir
+        self.compression = compression
+        self.manifest_file_path = os.path.join(feature_store_dir, DATA_INGESTION_FEATURE_STORE_MANIFEST_FILE_NAME)
+
+    def read_manifest(self) -> dict:
+        try:
+            if not os.path.exists(self.manifest_file_path):
+                return {"watermark": None, "rows": 0, "parts": []}
+            return read_yaml_file(self.manifest_file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_watermark(self) -> Optional[ObjectId]:
+        watermark = self.read_manifest().get("watermark")
+        return None if watermark is None else ObjectId(watermark)
+
+    def append(self, dataframe: pd.DataFrame, watermark: ObjectId) -> str:
+        try:
+            manifest = self.read_manifest()
+            part_file_name = f"part-{watermark}.parquet"
+            part_file_path = os.path.join(self.feature_store_dir, part_file_name)
+            save_dataframe(part_file_path, dataframe, compression=self.compression)
+
+            manifest["parts"].append(part_file_name)
+            manifest["rows"] += len(dataframe)
+            manifest["watermark"] = str(watermark)
+            write_yaml_file(self.manifest_file_path, manifest)
+            logging.info(f"Appended {len(dataframe)} rows to feature store as {part_file_path}, watermark: {watermark}")
+            return part_file_path
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        try:
+            parts = self.read_manifest()["parts"]
+            if not parts:
+                return pd.DataFrame()
+            logging.info(f"Loading {len(parts)} feature store parts from {self.feature_store_dir}")
+            return pd.concat([read_dataframe(os.path.join(self.feature_store_dir, part), columns=columns) for part in parts],
+                             ignore_index=True)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load_since(self, watermark: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Rows appended after `watermark` (a watermark of this store), None when the store has
+        no part ending at that watermark (e.g. it was rebuilt since).
+        """
+        try:
+            parts = self.read_manifest()["parts"]
+            part_file_name = f"part-{watermark}.parquet"
+            if part_file_name not in parts:
+                return None
+            new_parts = parts[parts.index(part_file_name) + 1:]
+            if not new_parts:
+                return pd.DataFrame()
+            return pd.concat([read_dataframe(os.path.join(self.feature_store_dir, part), columns=columns) for part in new_parts],
+                             ignore_index=True)
+        except Exception as e:
+            raise CustomException(e, sys)
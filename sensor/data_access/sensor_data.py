@@ -1,12 +1,190 @@
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Tuple
+import mmap
+import multiprocessing as mp
 import numpy as np
 import pandas as pd
-import json
+from bson import ObjectId
 from sensor.configuration.mongo_db_connection import MongoDBCLient
-from sensor.constant.database import DATABASE_NAME
+from sensor.constant.database import DATABASE_NAME, NA_VALUE, EXPORT_BATCH_SIZE, EXPORT_PARTITIONS, EXPORT_SAMPLE_SIZE, BULK_LOAD_CHUNK_SIZE, BULK_LOAD_BATCH_SIZE, BULK_LOAD_WORKERS
+from sensor.data_access.bulk_loader import bulk_load_csv
 from sensor.exception import CustomException
 from sensor.logger import logging
-import sys,os
+import sys
+
+
+def _to_float32(values: list) -> np.ndarray:
+    """
+    Converts one batch of raw column values into float32, mapping "na"/None to NaN.
+    Raises ValueError when the column holds non numeric values (e.g. the `class` labels).
+    """
+    array = np.asarray(values, dtype=object)
+    missing = pd.isna(array) | (array == NA_VALUE)
+    array[missing] = np.nan
+    return array.astype(np.float32)
+
+
+def _assemble_dataframe(values: np.ndarray, columns: List[str], numeric_columns: List[str], objects: dict) -> pd.DataFrame:
+    """
+    Wraps a (n_numeric, n_rows) float32 block as a DataFrame without copying it and
+    inserts the object columns back at their original positions.
+    """
+    if not values.flags.c_contiguous:
+        values = np.ascontiguousarray(values)
+    dataframe = pd.DataFrame(values.T, columns=numeric_columns, copy=False)
+    for index, column in enumerate(columns):
+        if column in objects:
+            dataframe.insert(index, column, objects[column])
+    return dataframe
+
+
+class _ColumnarFrameBuilder:
+    """
+    Builds a DataFrame from batches of MongoDB documents without materialising the documents.
+    Numeric columns are written into one pre-allocated (n_columns, n_rows) float32 block, which
+    is exactly the layout pandas keeps internally, so the final DataFrame wraps it without a copy.
+    When `values` is given the builder writes into that fixed buffer instead of allocating one;
+    rows beyond it go to the growable `spill` builder when one is set, otherwise they raise.
+    """
+
+    def __init__(self, capacity: int = 0, values: Optional[np.ndarray] = None):
+        self.capacity = max(int(capacity), 1) if values is None else values.shape[1]
+        self.n_rows = 0
+        self.columns: Optional[List[str]] = None
+        self.numeric_columns: List[str] = []
+        self.object_columns: List[str] = []
+        self.values = values
+        self.objects = {}
+        self._fixed = values is not None
+        self.spill: Optional["_ColumnarFrameBuilder"] = None
+
+    def set_columns(self, columns: List[str], numeric_columns: List[str]) -> None:
+        self.columns = list(columns)
+        self.numeric_columns = [column for column in self.columns if column in numeric_columns]
+        self.object_columns = [column for column in self.columns if column not in numeric_columns]
+        if self.values is None:
+            self.values = np.empty((len(self.numeric_columns), self.capacity), dtype=np.float32)
+        self.objects = {column: [] for column in self.object_columns}
+
+    def _init_columns(self, batch: list) -> None:
+        columns = [column for column in batch[0].keys() if column != "_id"]
+        numeric_columns = []
+        for column in columns:
+            try:
+                _to_float32([document.get(column) for document in batch])
+                numeric_columns.append(column)
+            except (TypeError, ValueError):
+                pass
+        self.set_columns(columns, numeric_columns)
+        logging.info(f"Streaming export: {len(self.numeric_columns)} float32 columns, object columns: {self.object_columns}")
+
+    def _reserve(self, n_rows: int) -> None:
+        required = self.n_rows + n_rows
+        if required <= self.capacity:
+            return
+        if self._fixed:
+            raise ValueError(f"{required} rows do not fit the fixed buffer of {self.capacity} rows")
+        capacity = max(required, 2 * self.capacity)
+        values = np.empty((len(self.numeric_columns), capacity), dtype=np.float32)
+        values[:, :self.n_rows] = self.values[:, :self.n_rows]
+        self.values = values
+        self.capacity = capacity
+
+    def add_batch(self, batch: list) -> None:
+        if not batch:
+            return
+        if self.columns is None:
+            self._init_columns(batch)
+        if self.spill is not None and self.n_rows + len(batch) > self.capacity:
+            room = self.capacity - self.n_rows
+            self.add_batch(batch[:room])
+            self.spill.add_batch(batch[room:])
+            return
+        self._reserve(len(batch))
+        start, stop = self.n_rows, self.n_rows + len(batch)
+        for index, column in enumerate(self.numeric_columns):
+            try:
+                self.values[index, start:stop] = _to_float32([document.get(column) for document in batch])
+            except (TypeError, ValueError):
+                raise ValueError(f"Column '{column}' holds non numeric values after row {start}")
+        for column in self.object_columns:
+            self.objects[column].extend(document.get(column) for document in batch)
+        self.n_rows = stop
+
+    def consume(self, cursor, batch_size: int) -> None:
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) == batch_size:
+                self.add_batch(batch)
+                batch = []
+        self.add_batch(batch)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if self.columns is None:
+            return pd.DataFrame()
+        return _assemble_dataframe(self.values[:, :self.n_rows], self.columns, self.numeric_columns, self.objects)
+
+
+# seeded sampling keeps a document when a multiplicative hash of the last 8 hex digits of its
+# `_id` (process byte + insertion counter), shifted by an offset drawn from the seed, falls below
+# ratio * modulus. Knuth's multiplier moves consecutive counters by ~0.236 of the modulus, so
+# consecutively inserted documents are spread over the range instead of kept in blocks
+_ID_HASH_MULTIPLIER = 2654435761
+_ID_HASH_MODULUS = 2147483647
+
+
+def _id_hash_offset(seed: int) -> int:
+    return int(np.random.default_rng(seed).integers(_ID_HASH_MODULUS))
+
+
+def _id_hash_expression(seed: int) -> dict:
+    """
+    Aggregation expression of the seeded `_id` hash in [0, _ID_HASH_MODULUS), computed on the server.
+    The counter is reduced modulo the modulus first so the product stays within a signed 64 bit long.
+    """
+    object_id = {"$toString": "$_id"}
+    digits = [{"$indexOfCP": ["0123456789abcdef", {"$substrCP": [object_id, 16 + index, 1]}]} for index in range(8)]
+    value = {"$mod": [{"$toLong": {"$add": [{"$multiply": [digit, 16 ** (7 - index)]} for index, digit in enumerate(digits)]}},
+                      _ID_HASH_MODULUS]}
+    return {"$mod": [{"$add": [{"$multiply": [value, _ID_HASH_MULTIPLIER]}, _id_hash_offset(seed)]}, _ID_HASH_MODULUS]}
+
+
+# anonymous shared mapping holding the float32 block of a partitioned export;
+# forked workers inherit it and write their `_id` range straight into it
+_SHARED_BLOCK: Optional[mmap.mmap] = None
+
+
+def _export_projection(exclude_columns: Optional[List[str]] = None) -> dict:
+    """
+    Projection that leaves `_id` and the `exclude_columns` on the server.
+    """
+    projection = {"_id": 0}
+    projection.update({column: 0 for column in exclude_columns or []})
+    return projection
+
+
+def _export_partition(collection_name: str, database_name: Optional[str], query: dict, offset: int, capacity: int,
+                      total_rows: int, columns: List[str], numeric_columns: List[str], batch_size: int,
+                      exclude_columns: Optional[List[str]] = None):
+    """
+    Worker of `SensorData.export_collection_partitioned`. Opens its own MongoDB client,
+    reads one `_id` range and writes the numeric columns into rows
+    [offset, offset + capacity) of the shared block. Documents inserted into the range after
+    the `$bucketAuto` counts (concurrent writers) go to a growable spill buffer.
+    Returns (n_rows, object columns, spilled float32 values, spilled object columns).
+    """
+    MongoDBCLient.client = None  # a client must never be shared across fork
+    collection = SensorData()._get_collection(collection_name, database_name)
+    block = np.frombuffer(_SHARED_BLOCK, dtype=np.float32, count=len(numeric_columns) * total_rows)
+    values = block.reshape(len(numeric_columns), total_rows)[:, offset:offset + capacity]
+    builder = _ColumnarFrameBuilder(values=values)
+    builder.set_columns(columns, numeric_columns)
+    builder.spill = _ColumnarFrameBuilder(capacity=batch_size)
+    builder.spill.set_columns(columns, numeric_columns)
+    cursor = collection.find(query, projection=_export_projection(exclude_columns), batch_size=batch_size)
+    builder.consume(cursor, batch_size=batch_size)
+    return builder.n_rows, builder.objects, builder.spill.values[:, :builder.spill.n_rows], builder.spill.objects
 
 
 class SensorData:
@@ -22,33 +200,25 @@ class SensorData:
         except Exception as e:
             logging.error(f"Error connecting to MongoDB: {e}")
             raise CustomException(e, sys)
+
+    def _get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
         
-    def save_csv_file(self, file_path, collection_name: str, database_name: Optional[str] = None):
+    def save_csv_file(self, file_path, collection_name: str, database_name: Optional[str] = None,
+                      chunk_size: int = BULK_LOAD_CHUNK_SIZE, batch_size: int = BULK_LOAD_BATCH_SIZE,
+                      n_workers: int = BULK_LOAD_WORKERS):
         try:
-            data_frame = pd.read_csv(file_path)
-            data_frame.reset_index(drop=True, inplace=True)
-            records = list(json.loads(data_frame.T.to_json()).values())
-            
-            dir_path = os.path.dirname(file_path)
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path, exist_ok=True)
-                
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client[database_name][collection_name]
-            collection.insert_many(records)
-            return len(records)
+            collection = self._get_collection(collection_name, database_name)
+            return bulk_load_csv(collection, file_path, chunk_size=chunk_size, batch_size=batch_size, n_workers=n_workers)
         except Exception as e:
             raise CustomException(e, sys)
         
     def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
         try:
             logging.info(f"Exporting collection '{collection_name}' from database '{database_name or DATABASE_NAME}' to DataFrame.")
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client[database_name][collection_name]
+            collection = self._get_collection(collection_name, database_name)
             
             logging.info(f"Fetching documents from collection '{collection_name}'.")
             documents = list(collection.find())
@@ -73,4 +243,224 @@ class SensorData:
             return df
         except Exception as e:
             logging.error(f"Error exporting collection as DataFrame: {e}")
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    def stream_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None,
+                                       batch_size: int = EXPORT_BATCH_SIZE, query: Optional[dict] = None,
+                                       exclude_columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Streaming variant of `export_collection_as_dataframe`.
+        Reads the cursor in batches of `batch_size` documents with `_id` projected out and
+        builds float32 columns batch by batch ("na" becomes NaN during the build), so the
+        peak memory stays close to the size of the final DataFrame.
+        `query` restricts the export, e.g. to the `_id` range after an ingestion watermark,
+        and `exclude_columns` are projected out on the server.
+        """
+        try:
+            logging.info(f"Streaming collection '{collection_name}' from database '{database_name or DATABASE_NAME}' in batches of {batch_size}.")
+            collection = self._get_collection(collection_name, database_name)
+            if query:
+                logging.info(f"Export query: {query}")
+                expected_rows = collection.count_documents(query)
+            else:
+                expected_rows = collection.estimated_document_count()
+            cursor = collection.find(query or {}, projection=_export_projection(exclude_columns), batch_size=batch_size)
+            df = self._build_dataframe_from_cursor(cursor, batch_size=batch_size, expected_rows=expected_rows)
+
+            if df.empty:
+                logging.error(f"No documents found in collection '{collection_name}'")
+                raise ValueError(f"No documents found in collection '{collection_name}'")
+
+            logging.info(f"DataFrame streamed successfully with shape: {df.shape}")
+            return df
+        except Exception as e:
+            logging.error(f"Error streaming collection as DataFrame: {e}")
+            raise CustomException(e, sys)
+
+    def get_max_object_id(self, collection_name: str, database_name: Optional[str] = None) -> Optional[ObjectId]:
+        """
+        Returns the largest `_id` of the collection (None when the collection is empty).
+        Used as the upper bound of an incremental export.
+        """
+        try:
+            collection = self._get_collection(collection_name, database_name)
+            document = collection.find_one({}, projection={"_id": 1}, sort=[("_id", -1)])
+            return None if document is None else document["_id"]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_collection_state(self, collection_name: str, database_name: Optional[str] = None) -> dict:
+        """
+        Summary of the collection content used to fingerprint the ingestion stage: document count,
+        latest `_id` and the server-side `dbHash` md5 of the collection, which changes on in-place
+        updates. `dbHash` scans the collection on the server and is not allowed everywhere (e.g.
+        shared clusters); without it in-place updates of existing documents are not seen.
+        """
+        try:
+            collection = self._get_collection(collection_name, database_name)
+            max_object_id = self.get_max_object_id(collection_name, database_name)
+            try:
+                content_hash = collection.database.command("dbHash", collections=[collection_name])["collections"].get(collection_name)
+            except Exception as e:
+                logging.warning(f"dbHash of '{collection_name}' not available ({e}), in-place updates are not fingerprinted")
+                content_hash = None
+            return {
+                "count": collection.estimated_document_count(),
+                "max_id": None if max_object_id is None else str(max_object_id),
+                "content_hash": content_hash,
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def export_collection_partitioned(self, collection_name: str, database_name: Optional[str] = None,
+                                      n_partitions: int = EXPORT_PARTITIONS, batch_size: int = EXPORT_BATCH_SIZE,
+                                      query: Optional[dict] = None, exclude_columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Parallel variant of `stream_collection_as_dataframe`.
+        The collection is split into `n_partitions` `_id` ranges with `$bucketAuto` and each
+        range is read by its own worker process with its own client. Workers write into one
+        shared float32 block sized from the bucket counts, so merging the partitions costs no copy
+        (documents inserted after the counts are appended from the workers' spill buffers).
+        Workers are forked from the calling process, so only use it from a process without
+        threads holding locks (e.g. not inside the API server).
+        Falls back to the single cursor export when fork is not available.
+        """
+        global _SHARED_BLOCK
+        try:
+            if n_partitions <= 1 or "fork" not in mp.get_all_start_methods():
+                return self.stream_collection_as_dataframe(collection_name, database_name, batch_size=batch_size,
+                                                           query=query, exclude_columns=exclude_columns)
+
+            collection = self._get_collection(collection_name, database_name)
+            match = query or {}
+            buckets = list(collection.aggregate(
+                [{"$match": match}, {"$bucketAuto": {"groupBy": "$_id", "buckets": n_partitions}}],
+                allowDiskUse=True
+            ))
+            if not buckets:
+                logging.error(f"No documents found in collection '{collection_name}'")
+                raise ValueError(f"No documents found in collection '{collection_name}'")
+
+            sample_builder = _ColumnarFrameBuilder()
+            sample = collection.find(match, projection=_export_projection(exclude_columns)).limit(EXPORT_SAMPLE_SIZE)
+            sample_builder._init_columns(list(sample))
+            columns, numeric_columns = sample_builder.columns, sample_builder.numeric_columns
+
+            counts = [bucket["count"] for bucket in buckets]
+            offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).tolist()
+            total_rows = sum(counts)
+            logging.info(f"Partitioned export of '{collection_name}': {len(buckets)} partitions, {total_rows} documents.")
+
+            _SHARED_BLOCK = mmap.mmap(-1, max(len(numeric_columns) * total_rows * 4, 1))
+            values = np.frombuffer(_SHARED_BLOCK, dtype=np.float32, count=len(numeric_columns) * total_rows)
+            values = values.reshape(len(numeric_columns), total_rows)
+            with ProcessPoolExecutor(max_workers=len(buckets), mp_context=mp.get_context("fork")) as executor:
+                futures = []
+                for index, bucket in enumerate(buckets):
+                    upper_bound = "$lte" if index == len(buckets) - 1 else "$lt"
+                    id_range = {"_id": {"$gte": bucket["_id"]["min"], upper_bound: bucket["_id"]["max"]}}
+                    partition_query = {"$and": [match, id_range]} if match else id_range
+                    futures.append(executor.submit(
+                        _export_partition, collection_name, database_name, partition_query, offsets[index],
+                        counts[index], total_rows, columns, numeric_columns, batch_size, exclude_columns
+                    ))
+                results = [future.result() for future in futures]
+
+            # documents deleted between $bucketAuto and the reads leave gaps; close them in place
+            n_rows = 0
+            objects = {column: [] for column in columns if column not in numeric_columns}
+            for offset, (partition_rows, partition_objects, _, _) in zip(offsets, results):
+                if offset != n_rows:
+                    values[:, n_rows:n_rows + partition_rows] = values[:, offset:offset + partition_rows]
+                n_rows += partition_rows
+                for column, column_values in partition_objects.items():
+                    objects[column].extend(column_values)
+            values = values[:, :n_rows]
+
+            # documents inserted after $bucketAuto did not fit the shared block, append them
+            spilled_values = [spill_values for _, _, spill_values, _ in results if spill_values.shape[1]]
+            if spilled_values:
+                logging.warning(f"{sum(block.shape[1] for block in spilled_values)} documents were inserted during the "
+                                f"partitioned export and appended after the shared block")
+                values = np.concatenate([values] + spilled_values, axis=1)
+                for _, _, _, spill_objects in results:
+                    for column, column_values in spill_objects.items():
+                        objects[column].extend(column_values)
+
+            df = _assemble_dataframe(values, columns, numeric_columns, objects)
+            logging.info(f"DataFrame exported with {len(buckets)} partitions, shape: {df.shape}")
+            return df
+        except Exception as e:
+            logging.error(f"Error exporting collection with partitions: {e}")
+            raise CustomException(e, sys)
+        finally:
+            _SHARED_BLOCK = None
+
+    def export_sampled_dataframe(self, collection_name: str, target_column: str, sampling_ratios: dict,
+                                 database_name: Optional[str] = None, query: Optional[dict] = None,
+                                 exclude_columns: Optional[List[str]] = None, seed: Optional[int] = None,
+                                 batch_size: int = EXPORT_BATCH_SIZE) -> Tuple[pd.DataFrame, dict]:
+        """
+        Stratified export that runs entirely in server-side aggregation pipelines.
+        Every class of `target_column` is matched with `query`; classes listed in
+        `sampling_ratios` are downsampled to that fraction and `exclude_columns` are
+        projected out, so only the sampled rows and kept columns leave the database.
+        Without a `seed` `$sample` draws the sampled rows; with one they are selected
+        reproducibly by a seeded hash of `_id` evaluated in the `$match`, which keeps about
+        (not exactly) the ratio of the class. Returns the DataFrame and the sampling plan,
+        holding the rows actually exported per class.
+        """
+        try:
+            collection = self._get_collection(collection_name, database_name)
+            match = query or {}
+            class_counts = {
+                group["_id"]: group["count"] for group in collection.aggregate(
+                    [{"$match": match}, {"$group": {"_id": f"${target_column}", "count": {"$sum": 1}}}]
+                )
+            }
+            if not class_counts:
+                logging.error(f"No documents found in collection '{collection_name}'")
+                raise ValueError(f"No documents found in collection '{collection_name}'")
+
+            projection = _export_projection(exclude_columns)
+            sampling_plan = {"query": match, "exclude_columns": list(exclude_columns or []), "seed": seed, "classes": {}}
+            pipelines = []
+            for label, count in sorted(class_counts.items(), key=lambda item: str(item[0])):
+                ratio = min(float(sampling_ratios.get(label, 1.0)), 1.0)
+                sample_size = count if ratio >= 1.0 else int(round(count * ratio))
+                class_match = {"$and": [match, {target_column: label}]} if match else {target_column: label}
+                if sample_size == count:
+                    stages = [{"$match": class_match}]
+                elif seed is None:
+                    stages = [{"$match": class_match}, {"$sample": {"size": sample_size}}]
+                else:
+                    hash_filter = {"$expr": {"$lt": [_id_hash_expression(seed), ratio * _ID_HASH_MODULUS]}}
+                    stages = [{"$match": {"$and": [class_match, hash_filter]}}]
+                pipelines.append((label, stages + [{"$project": projection}]))
+                sampling_plan["classes"][label] = {"count": count, "ratio": ratio, "sample_size": sample_size}
+            logging.info(f"Sampling plan: {sampling_plan}")
+
+            expected_rows = sum(plan["sample_size"] for plan in sampling_plan["classes"].values())
+            builder = _ColumnarFrameBuilder(capacity=expected_rows)
+            for label, pipeline in pipelines:
+                n_rows = builder.n_rows
+                builder.consume(collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size), batch_size=batch_size)
+                plan = sampling_plan["classes"][label]
+                plan["rows"] = builder.n_rows - n_rows
+                # the seeded hash keeps an approximate share, flag a class far outside binomial noise
+                tolerance = 4 * np.sqrt(plan["count"] * plan["ratio"] * (1 - plan["ratio"])) + 1
+                if abs(plan["rows"] - plan["sample_size"]) > tolerance:
+                    logging.warning(f"Seeded sampling of class {label!r} kept {plan['rows']} rows, "
+                                    f"expected {plan['sample_size']} +- {tolerance:.0f}")
+            df = builder.to_dataframe()
+            logging.info(f"Sampled DataFrame exported with shape: {df.shape}")
+            return df, sampling_plan
+        except Exception as e:
+            logging.error(f"Error exporting sampled collection: {e}")
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _build_dataframe_from_cursor(cursor, batch_size: int, expected_rows: int = 0) -> pd.DataFrame:
+        builder = _ColumnarFrameBuilder(capacity=expected_rows)
+        builder.consume(cursor, batch_size=batch_size)
+        return builder.to_dataframe()
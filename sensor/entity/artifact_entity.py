@@ -1,9 +1,12 @@
 from dataclasses import dataclass
+from typing import List, Optional
 
 @dataclass
 class DataIngestionArtifact:
     train_file_path: str
     test_file_path: str
+    feature_store_file_path: str
+    sampling_plan: Optional[dict] = None
 
 @dataclass
 class DataValidationArtifact:
@@ -13,24 +16,66 @@ class DataValidationArtifact:
     invalid_train_file_path: str
     invalid_test_file_path: str
     drift_report_file_path: str
+    reference_sketch_file_path: Optional[str] = None
+    train_profile_file_path: Optional[str] = None
+    test_profile_file_path: Optional[str] = None
+    peak_memory_mb: Optional[float] = None
     
 @dataclass
 class DataTransformationArtifact:
     transformed_object_file_path: str
     transformed_train_file_path: str
     transformed_test_file_path: str
+    imbalance_strategy: Optional[str] = None
+    scale_pos_weight: Optional[float] = None
+    # transformed_*_file_path hold the features, the targets are stored separately
+    transformed_train_target_file_path: Optional[str] = None
+    transformed_test_target_file_path: Optional[str] = None
+    train_shape: Optional[List[int]] = None
+    test_shape: Optional[List[int]] = None
+    feature_dtype: Optional[str] = None
+    target_dtype: Optional[str] = None
+    # training rows before resampling, the same files as the train split when the strategy does not resample
+    transformed_unbalanced_train_file_path: Optional[str] = None
+    transformed_unbalanced_train_target_file_path: Optional[str] = None
+
+@dataclass
+class ModelTuningArtifact:
+    results_file_path: str
+    best_params: dict
+    best_rounds: int
+    best_validation_f1: float
+    n_configurations: int
 
 @dataclass
 class ClassificationMetricArtifact:
     f1_score: float
     precision_score: float
     recall_score: float
+    # 10 * FP + 500 * FN
+    aps_cost: Optional[float] = None
     
+@dataclass
+class ModelCrossValidationArtifact:
+    folds_file_path: str
+    fold_predictions_file_path: str
+    n_splits: int
+    # validation metrics averaged over the folds, their sample variance, and the mean training metrics
+    mean_metric_artifact: ClassificationMetricArtifact
+    variance_metric_artifact: ClassificationMetricArtifact
+    train_mean_metric_artifact: ClassificationMetricArtifact
+    # lowest APS cost threshold over the out-of-fold probabilities, and that cost
+    best_threshold: Optional[float] = None
+    best_threshold_cost: Optional[float] = None
+
 @dataclass
 class ModelTrainerArtifact:
     trained_model_file_path: str
     train_metric_artifact: ClassificationMetricArtifact
     test_metric_artifact: ClassificationMetricArtifact
+    n_rounds: Optional[int] = None
+    train_time_seconds: Optional[float] = None
+    training_mode: Optional[str] = None
 
 
 @dataclass
@@ -41,9 +86,13 @@ class ModelEvaluationArtifact:
     trained_model_path: str
     train_model_metric_artifact: ClassificationMetricArtifact
     best_model_metric_artifact: ClassificationMetricArtifact
+    evaluated_rows: Optional[int] = None
+    # rows of the best model served from the prediction cache
+    best_model_cached_rows: Optional[int] = None
     
     
 @dataclass
 class ModelPusherArtifact:
     saved_model_path: str
-    model_file_path: str
\ No newline at end of file
+    model_file_path: str
+    saved_reference_sketch_path: Optional[str] = None
\ No newline at end of file
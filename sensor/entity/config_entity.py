@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 import os
 from sensor.constant import training_pipeline
 from sensor.logger import logging
@@ -6,11 +7,26 @@ from sensor.exception import CustomException
 import sys
 
 class TrainingPipelineConfig:
-    def __init__(self, timestamp: datetime):
+    def __init__(self, timestamp: datetime, resume_timestamp: Optional[str] = None):
+        """
+        :param resume_timestamp: timestamp of an earlier run to resume, its artifact dir must be
+            directly under ARTIFACT_DIR and hold a checkpoint manifest
+        """
         try:
-            timestamp = timestamp.strftime("%m_%d_%Y_%H_%M_%S")
+            if resume_timestamp is None:
+                timestamp = timestamp.strftime("%m_%d_%Y_%H_%M_%S")
+            else:
+                # resuming an earlier run keeps its artifact dir and timestamp
+                artifact_root = os.path.realpath(training_pipeline.ARTIFACT_DIR)
+                resume_dir = os.path.realpath(os.path.join(artifact_root, resume_timestamp))
+                if os.path.dirname(resume_dir) != artifact_root:
+                    raise ValueError(f"Invalid run timestamp to resume: {resume_timestamp!r}")
+                if not os.path.isfile(os.path.join(resume_dir, training_pipeline.CHECKPOINT_FILE_NAME)):
+                    raise ValueError(f"No checkpointed run to resume for timestamp {resume_timestamp!r}")
+                timestamp = os.path.basename(resume_dir)
+            artifact_dir = os.path.join(training_pipeline.ARTIFACT_DIR, timestamp)
             self.pipeline_name = training_pipeline.PIPELINE_NAME
-            self.artifact_dir = os.path.join(training_pipeline.ARTIFACT_DIR, timestamp)
+            self.artifact_dir = artifact_dir
             self.timestamp = timestamp
         except Exception as e:
             raise CustomException(e, sys)
@@ -25,6 +41,18 @@ class DataIngestionConfig:
             self.test_file_path = os.path.join(self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TEST_FILE_NAME)
             self.train_test_split_ratio: float = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
             self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+            self.streaming_export: bool = training_pipeline.DATA_INGESTION_STREAMING_EXPORT
+            self.export_batch_size: int = training_pipeline.DATA_INGESTION_EXPORT_BATCH_SIZE
+            self.export_partitions: int = training_pipeline.DATA_INGESTION_EXPORT_PARTITIONS
+            self.pushdown_projection: bool = training_pipeline.DATA_INGESTION_PUSHDOWN_PROJECTION
+            self.row_filter: dict = dict(training_pipeline.DATA_INGESTION_ROW_FILTER)
+            self.sampling_ratios: dict = dict(training_pipeline.DATA_INGESTION_SAMPLING_RATIOS)
+            self.sampling_seed: int = training_pipeline.DATA_INGESTION_SAMPLING_SEED
+            self.incremental_ingestion: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+            self.persistent_feature_store_dir: str = training_pipeline.DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR
+            self.file_compression: str = training_pipeline.DATA_INGESTION_FEATURE_STORE_COMPRESSION
+            self.export_csv: bool = training_pipeline.DATA_INGESTION_EXPORT_CSV
+            self.stage_cache: bool = training_pipeline.DATA_INGESTION_STAGE_CACHE
             logging.info(f"Data Ingestion configuration created with collection name: {self.collection_name}")
         except Exception as e:
             raise CustomException(e, sys)
@@ -40,15 +68,36 @@ class DataValidationConfig:
         self.invalid_test_file_path: str = os.path.join(self.invalid_data_dir, training_pipeline.TEST_FILE_NAME)
         
         self.drift_report_file_path: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR, training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
+        self.drift_workers: int = training_pipeline.DATA_VALIDATION_DRIFT_WORKERS
+        self.reference_sketch_file_path: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_REFERENCE_SKETCH_DIR, training_pipeline.REFERENCE_SKETCH_FILE_NAME)
+        self.sketch_k: int = training_pipeline.DATA_VALIDATION_SKETCH_K
+        self.out_of_core: bool = training_pipeline.DATA_VALIDATION_OUT_OF_CORE
+        self.chunk_size: int = training_pipeline.DATA_VALIDATION_CHUNK_SIZE
+        self.profile_dir: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_PROFILE_DIR)
+        self.train_profile_file_path: str = os.path.join(self.profile_dir, os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + ".yaml")
+        self.test_profile_file_path: str = os.path.join(self.profile_dir, os.path.splitext(training_pipeline.TEST_FILE_NAME)[0] + ".yaml")
 
 
 class DataTransformationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
         
         self.data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.DATA_TRANSFORMATION_DIR_NAME)
-        self.transformed_train_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, training_pipeline.TRAIN_FILE_NAME.replace("csv","npy"))
-        self.transformed_test_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, training_pipeline.TEST_FILE_NAME.replace("csv", "npy"))
+        self.transformed_train_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + ".npy")
+        self.transformed_test_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, os.path.splitext(training_pipeline.TEST_FILE_NAME)[0] + ".npy")
         self.transformed_object_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,training_pipeline.PREPROCSSING_OBJECT_FILE_NAME)
+        self.transformed_train_target_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_TARGET_FILE_SUFFIX + ".npy")
+        self.transformed_test_target_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, os.path.splitext(training_pipeline.TEST_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_TARGET_FILE_SUFFIX + ".npy")
+        self.transformed_unbalanced_train_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_UNBALANCED_FILE_SUFFIX + ".npy")
+        self.transformed_unbalanced_train_target_file_path: str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_UNBALANCED_FILE_SUFFIX + training_pipeline.DATA_TRANSFORMATION_TARGET_FILE_SUFFIX + ".npy")
+        self.feature_dtype: str = training_pipeline.DATA_TRANSFORMATION_FEATURE_DTYPE
+        self.target_dtype: str = training_pipeline.DATA_TRANSFORMATION_TARGET_DTYPE
+        self.imbalance_strategy: str = training_pipeline.DATA_TRANSFORMATION_IMBALANCE_STRATEGY
+        self.smote_k_neighbors: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS
+        self.smote_neighbor_pool: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL
+        self.streaming_fit: bool = training_pipeline.DATA_TRANSFORMATION_STREAMING_FIT
+        self.fit_chunk_size: int = training_pipeline.DATA_TRANSFORMATION_FIT_CHUNK_SIZE
+        self.fit_workers: int = training_pipeline.DATA_TRANSFORMATION_FIT_WORKERS
+        self.sketch_k: int = training_pipeline.DATA_TRANSFORMATION_SKETCH_K
         
         
         
@@ -58,13 +107,81 @@ class ModelTrainerConfig:
         self.trained_model_file_path: str = os.path.join(self.model_trainer_dir, training_pipeline.MODEL_TRAINER_TRAINED_MODEL_DIR, training_pipeline.MODEL_FILE_NAME)
         self.expected_accuracy: float = training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
         self.overfitting_underfitting_threshold = training_pipeline.MODEL_TRAINER_OVER_FITING_UNDER_FITING_THRESHOLD
+        self.engine: str = training_pipeline.MODEL_TRAINER_ENGINE
+        self.nthread: int = training_pipeline.MODEL_TRAINER_NTHREAD
+        self.max_bin: int = training_pipeline.MODEL_TRAINER_MAX_BIN
+        self.max_rounds: int = training_pipeline.MODEL_TRAINER_MAX_ROUNDS
+        self.early_stopping_rounds: int = training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS
+        self.validation_split: float = training_pipeline.MODEL_TRAINER_VALIDATION_SPLIT
+        self.batch_rows: int = training_pipeline.MODEL_TRAINER_BATCH_ROWS
+        self.imbalance_strategy: str = training_pipeline.DATA_TRANSFORMATION_IMBALANCE_STRATEGY
+        self.smote_k_neighbors: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS
+        self.smote_neighbor_pool: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL
+        self.warm_start: bool = training_pipeline.MODEL_TRAINER_WARM_START
+        self.warm_start_rounds: int = training_pipeline.MODEL_TRAINER_WARM_START_ROUNDS
+        self.warm_start_max_delta_ratio: float = training_pipeline.MODEL_TRAINER_WARM_START_MAX_DELTA_RATIO
+        self.warm_start_max_drift_share: float = training_pipeline.MODEL_TRAINER_WARM_START_MAX_DRIFT_SHARE
+        self.warm_start_test_split: float = training_pipeline.MODEL_TRAINER_WARM_START_TEST_SPLIT
+        self.warm_start_seed: int = training_pipeline.MODEL_TRAINER_WARM_START_SEED
+        self.incremental_ingestion: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.feature_store_dir: str = training_pipeline.DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR
         
 
+class ModelTuningConfig:
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.model_tuning_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.MODEL_TUNING_DIR_NAME)
+        self.results_file_path: str = os.path.join(self.model_tuning_dir, training_pipeline.MODEL_TUNING_RESULTS_FILE_NAME)
+        self.n_configurations: int = training_pipeline.MODEL_TUNING_N_CONFIGURATIONS
+        self.min_rounds: int = training_pipeline.MODEL_TUNING_MIN_ROUNDS
+        self.max_rounds: int = training_pipeline.MODEL_TUNING_MAX_ROUNDS
+        self.eta: int = training_pipeline.MODEL_TUNING_ETA
+        self.workers: int = training_pipeline.MODEL_TUNING_WORKERS
+        self.validation_split: float = training_pipeline.MODEL_TUNING_VALIDATION_SPLIT
+        self.seed: int = training_pipeline.MODEL_TUNING_SEED
+        self.overfitting_underfitting_threshold: float = training_pipeline.MODEL_TRAINER_OVER_FITING_UNDER_FITING_THRESHOLD
+        self.max_bin: int = training_pipeline.MODEL_TRAINER_MAX_BIN
+        self.batch_rows: int = training_pipeline.MODEL_TRAINER_BATCH_ROWS
+        self.imbalance_strategy: str = training_pipeline.DATA_TRANSFORMATION_IMBALANCE_STRATEGY
+        self.smote_k_neighbors: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS
+        self.smote_neighbor_pool: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL
+
+
+class ModelCrossValidationConfig:
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.model_cross_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.MODEL_CROSS_VALIDATION_DIR_NAME)
+        self.features_file_path: str = os.path.join(self.model_cross_validation_dir, training_pipeline.MODEL_CROSS_VALIDATION_DATA_DIR, training_pipeline.MODEL_CROSS_VALIDATION_FEATURES_FILE_NAME)
+        self.target_file_path: str = os.path.join(self.model_cross_validation_dir, training_pipeline.MODEL_CROSS_VALIDATION_DATA_DIR, training_pipeline.MODEL_CROSS_VALIDATION_TARGET_FILE_NAME)
+        self.folds_file_path: str = os.path.join(self.model_cross_validation_dir, training_pipeline.MODEL_CROSS_VALIDATION_FOLDS_FILE_NAME)
+        self.fold_predictions_file_path: str = os.path.join(self.model_cross_validation_dir, training_pipeline.MODEL_CROSS_VALIDATION_PREDICTIONS_FILE_NAME)
+        self.n_splits: int = training_pipeline.MODEL_CROSS_VALIDATION_N_SPLITS
+        self.workers: int = training_pipeline.MODEL_CROSS_VALIDATION_WORKERS
+        self.nthread: int = training_pipeline.MODEL_CROSS_VALIDATION_NTHREAD
+        self.seed: int = training_pipeline.MODEL_CROSS_VALIDATION_SEED
+        self.feature_dtype: str = training_pipeline.DATA_TRANSFORMATION_FEATURE_DTYPE
+        self.target_dtype: str = training_pipeline.DATA_TRANSFORMATION_TARGET_DTYPE
+        self.imbalance_strategy: str = training_pipeline.DATA_TRANSFORMATION_IMBALANCE_STRATEGY
+        self.smote_k_neighbors: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS
+        self.smote_neighbor_pool: int = training_pipeline.DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL
+        # the fold models are trained like the trainer trains the model
+        self.engine: str = training_pipeline.MODEL_TRAINER_ENGINE
+        self.max_bin: int = training_pipeline.MODEL_TRAINER_MAX_BIN
+        self.max_rounds: int = training_pipeline.MODEL_TRAINER_MAX_ROUNDS
+        self.early_stopping_rounds: int = training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS
+        self.validation_split: float = training_pipeline.MODEL_TRAINER_VALIDATION_SPLIT
+        self.batch_rows: int = training_pipeline.MODEL_TRAINER_BATCH_ROWS
+
+
 class ModelEvaluationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
         self.model_evaluation_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.MODEL_EVALUATION_DIR_NAME) 
         self.report_file_path = os.path.join(self.model_evaluation_dir, training_pipeline.MODEL_EVALUATION_REPORT_NAME)
         self.change_threshold = training_pipeline.MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE  
+        self.prediction_cache: bool = training_pipeline.MODEL_EVALUATION_PREDICTION_CACHE
+        self.prediction_cache_dir: str = training_pipeline.MODEL_EVALUATION_PREDICTION_CACHE_DIR
+        self.prediction_cache_max_models: int = training_pipeline.MODEL_EVALUATION_PREDICTION_CACHE_MAX_MODELS
+        self.max_rows: int = training_pipeline.MODEL_EVALUATION_MAX_ROWS
+        self.seed: int = training_pipeline.MODEL_EVALUATION_SEED
+        self.workers: int = training_pipeline.MODEL_EVALUATION_WORKERS
         
         
 class ModelPusherConfig:
@@ -74,4 +191,6 @@ class ModelPusherConfig:
         self.model_file_path = os.path.join(self.model_evaluation_dir, training_pipeline.MODEL_FILE_NAME)
         timestamp = round(datetime.now().timestamp())
         
-        self.saved_model_path = os.path.join(training_pipeline.SAVED_MODEL_DIR, f"{timestamp}", training_pipeline.MODEL_FILE_NAME)
\ No newline at end of file
+        self.saved_model_path = os.path.join(training_pipeline.SAVED_MODEL_DIR, f"{timestamp}", training_pipeline.MODEL_FILE_NAME)
+        self.reference_sketch_file_path = os.path.join(self.model_evaluation_dir, training_pipeline.REFERENCE_SKETCH_FILE_NAME)
+        self.saved_reference_sketch_path = os.path.join(training_pipeline.SAVED_MODEL_DIR, f"{timestamp}", training_pipeline.REFERENCE_SKETCH_FILE_NAME)
\ No newline at end of file
@@ -0,0 +1,210 @@
+from concurrent.futures import ProcessPoolExecutor
+from sensor.constant.training_pipeline import (DATA_VALIDATION_DRIFT_THRESHOLD, DATA_VALIDATION_DRIFT_METRICS,
+                                               DATA_VALIDATION_PSI_BINS, DATA_VALIDATION_DRIFT_WORKERS,
+                                               DATA_VALIDATION_DRIFT_BLOCK_SIZE)
+from sensor.exception import CustomException
+from sensor.logger import logging
+from scipy.stats import kstwo
+from typing import List, Optional
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+import sys
+
+DRIFT_METRICS = ("ks", "psi", "wasserstein")
+PSI_EPSILON = 1e-4
+
+# sorted reference block of the engine that forked the worker
+_REFERENCE: Optional[np.ndarray] = None
+
+
+def to_sorted_block(dataframe: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    Returns a (n_columns, n_rows) float32 block holding every column sorted ascending, NaN last.
+    Categorical columns are compared on their codes (missing -> NaN).
+    """
+    block = np.empty((len(columns), len(dataframe)), dtype=np.float32)
+    for index, column in enumerate(columns):
+        series = dataframe[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            block[index] = np.where(codes < 0, np.nan, codes)
+        else:
+            block[index] = series.to_numpy(dtype=np.float32, na_value=np.nan)
+    block.sort(axis=1)
+    return block
+
+
+def compare_sorted_blocks(reference: np.ndarray, current: np.ndarray, metrics=DRIFT_METRICS,
+                          psi_bins: int = DATA_VALIDATION_PSI_BINS) -> dict:
+    """
+    Compares two row-sorted (n_columns, n_rows) blocks column by column in one vectorized pass.
+
+    Both blocks are merged with a stable sort (linear merge of two sorted runs), after which
+    the empirical CDFs of both samples are cumulative counts over the merged rows. NaNs sort
+    to the end of every row and are left out of the counts, so each column is compared on its
+    observed values only. KS p-values use the asymptotic distribution (ks_2samp method="asymp").
+    """
+    # columns without observed values divide by zero; they are masked with `testable`
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n_columns, n_reference = reference.shape
+        reference_valid = (~np.isnan(reference)).sum(axis=1)
+        current_valid = (~np.isnan(current)).sum(axis=1)
+        testable = (reference_valid > 0) & (current_valid > 0)
+        n_rows = n_reference + current.shape[1]
+        positions = np.arange(n_rows)
+
+        merged = np.concatenate([reference, current], axis=1)
+        order = np.argsort(merged, axis=1, kind="stable")
+        values = np.take_along_axis(merged, order, axis=1)
+        del merged
+        # NaNs of both samples end up after every observed value, so the valid rows are a prefix
+        valid = positions[None, :] < (reference_valid + current_valid)[:, None]
+        reference_count = np.cumsum(order < n_reference, axis=1, dtype=np.int64)
+        current_count = positions[None, :] + 1 - reference_count
+        del order
+        # the CDFs are only defined at the last row of a run of equal values
+        group_end = np.empty_like(valid)
+        group_end[:, :-1] = values[:, 1:] != values[:, :-1]
+        group_end[:, -1] = True
+        group_end &= valid
+
+        result = {
+            "reference_missing_ratio": 1 - reference_valid / max(n_reference, 1),
+            "current_missing_ratio": 1 - current_valid / max(current.shape[1], 1),
+        }
+
+        if "ks" in metrics:
+            # |F_ref - F_cur| scaled by n_ref * n_cur stays an exact integer
+            scaled_gap = np.abs(reference_count * current_valid[:, None] - current_count * reference_valid[:, None])
+            statistic = np.where(group_end, scaled_gap, 0).max(axis=1) / np.maximum(reference_valid * current_valid, 1)
+            effective_n = np.where(testable, reference_valid * current_valid / np.maximum(reference_valid + current_valid, 1), 1)
+            p_value = np.clip(kstwo.sf(statistic, np.round(effective_n)), 0, 1)
+            result["ks_statistic"] = np.where(testable, statistic, np.nan)
+            result["p_value"] = np.where(testable, p_value, np.nan)
+
+        if "wasserstein" in metrics:
+            # integral of |F_ref - F_cur| between consecutive merged values
+            cdf_gap = np.abs(reference_count[:, :-1] / reference_valid[:, None] - current_count[:, :-1] / current_valid[:, None])
+            steps = np.diff(values, axis=1).astype(np.float64)
+            area = np.where(valid[:, 1:], cdf_gap * steps, 0).sum(axis=1)
+            result["wasserstein"] = np.where(testable, area, np.nan)
+
+        if "psi" in metrics:
+            # bin edges are reference quantiles; the merged position of reference row k is
+            # k + (current rows placed before it), read off the running reference count
+            quantiles = np.arange(1, psi_bins) / psi_bins
+            edge_ranks = np.clip(np.ceil(quantiles[None, :] * reference_valid[:, None]).astype(np.int64) - 1, 0,
+                                 np.maximum(reference_valid - 1, 0)[:, None])
+            edge_positions = np.stack([np.searchsorted(counts, ranks + 1) for counts, ranks in zip(reference_count, edge_ranks)])
+            # move every edge to the end of its run of equal values so ties fall into one bin
+            run_end = np.where(group_end, positions[None, :], n_rows - 1)
+            run_end = np.minimum.accumulate(run_end[:, ::-1], axis=1)[:, ::-1]
+            edge_positions = np.take_along_axis(run_end, np.minimum(edge_positions, n_rows - 1), axis=1)
+            reference_edges = np.take_along_axis(reference_count, edge_positions, axis=1) / reference_valid[:, None]
+            current_edges = np.take_along_axis(current_count, edge_positions, axis=1) / current_valid[:, None]
+            zeros, ones = np.zeros((n_columns, 1)), np.ones((n_columns, 1))
+            reference_share = np.clip(np.diff(np.hstack([zeros, reference_edges, ones]), axis=1), PSI_EPSILON, None)
+            current_share = np.clip(np.diff(np.hstack([zeros, current_edges, ones]), axis=1), PSI_EPSILON, None)
+            psi = ((current_share - reference_share) * np.log(current_share / reference_share)).sum(axis=1)
+            result["psi"] = np.where(testable, psi, np.nan)
+
+    return result
+
+
+def _set_reference(reference: np.ndarray) -> None:
+    global _REFERENCE
+    _REFERENCE = reference
+
+
+def _compare_column_range(start: int, current: np.ndarray, metrics, psi_bins: int, block_size: int) -> dict:
+    """
+    Worker entry point: compares `current` against rows start:start+len(current) of the inherited reference.
+    """
+    reference = _REFERENCE[start:start + len(current)]
+    results = [compare_sorted_blocks(reference[offset:offset + block_size], current[offset:offset + block_size],
+                                     metrics, psi_bins)
+               for offset in range(0, len(current), block_size)]
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+class DriftEngine:
+    """
+    Column-wise drift statistics between a reference sample and incoming batches.
+
+    `fit` sorts every reference column once; `compare` only sorts the incoming batch and
+    merges it with the sorted reference, so the same engine can score batch after batch.
+    Columns are processed in blocks of `block_size` rows of the sorted block, either in
+    process or split across `n_jobs` worker processes. The workers are forked once per fit
+    and inherit the sorted reference, so only the incoming batch is sent to them; call
+    `close` (or use the engine as a context manager) to stop them.
+    """
+
+    def __init__(self, metrics=DATA_VALIDATION_DRIFT_METRICS, threshold: float = DATA_VALIDATION_DRIFT_THRESHOLD,
+                 psi_bins: int = DATA_VALIDATION_PSI_BINS, n_jobs: int = DATA_VALIDATION_DRIFT_WORKERS,
+                 block_size: int = DATA_VALIDATION_DRIFT_BLOCK_SIZE):
+        unknown_metrics = set(metrics) - set(DRIFT_METRICS)
+        if unknown_metrics:
+            raise ValueError(f"Unknown drift metrics: {sorted(unknown_metrics)}")
+        self.metrics = tuple(metrics)
+        self.threshold = threshold
+        self.psi_bins = psi_bins
+        self.n_jobs = max(1, n_jobs)
+        self.block_size = max(1, block_size)
+        self.columns: Optional[List[str]] = None
+        self.reference: Optional[np.ndarray] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "DriftEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def fit(self, reference_df: pd.DataFrame, columns: Optional[List[str]] = None) -> "DriftEngine":
+        try:
+            self.columns = list(reference_df.columns if columns is None else columns)
+            self.reference = to_sorted_block(reference_df, self.columns)
+            self.close()
+            if self.n_jobs > 1:
+                self._executor = ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=mp.get_context("fork"),
+                                                     initializer=_set_reference, initargs=(self.reference,))
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def compare(self, current_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns one row per column with the requested statistics and `drift_status`
+        (KS p-value below threshold). Columns that are entirely missing on either side
+        get NaN statistics and are not flagged.
+        """
+        try:
+            if self.reference is None:
+                raise ValueError("DriftEngine.compare called before fit")
+            current = to_sorted_block(current_df, self.columns)
+
+            if self._executor is not None:
+                bounds = np.linspace(0, len(self.columns), self.n_jobs + 1).astype(int)
+                futures = [self._executor.submit(_compare_column_range, start, current[start:stop], self.metrics,
+                                                 self.psi_bins, self.block_size)
+                           for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+                results = [future.result() for future in futures]
+            else:
+                results = [compare_sorted_blocks(self.reference[start:start + self.block_size],
+                                                 current[start:start + self.block_size], self.metrics, self.psi_bins)
+                           for start in range(0, len(self.columns), self.block_size)]
+
+            report = pd.DataFrame({key: np.concatenate([result[key] for result in results]) for key in results[0]},
+                                  index=pd.Index(self.columns, name="column"))
+            if "p_value" in report:
+                report["drift_status"] = report["p_value"] < self.threshold
+            logging.info(f"Drift computed for {len(self.columns)} columns ({', '.join(self.metrics)})")
+            return report
+        except Exception as e:
+            raise CustomException(e, sys)
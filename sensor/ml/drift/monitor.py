@@ -0,0 +1,177 @@
+from collections import deque
+from datetime import datetime
+from sensor.constant.application import (DRIFT_MONITOR_INTERVAL_SECONDS, DRIFT_MONITOR_WINDOWS, DRIFT_MONITOR_BUFFER_ROWS,
+                                         DRIFT_MONITOR_MIN_ROWS)
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR, TARGET_COLUMN
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.drift.sketch import ReferenceSketch
+from sensor.ml.model.estimator import ModelResolver
+from sensor.utils.main_utils import load_object
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import os
+import sys
+import threading
+
+
+class DriftMonitor:
+    """
+    In-process drift monitor for scored traffic.
+
+    `observe` only copies the batch into a bounded buffer (flushed into KLL sketches once it
+    holds `buffer_rows` rows), so the request path stays cheap. Every `interval` seconds the
+    buffer is folded into the current interval sketch, the last `windows` interval sketches
+    are merged and compared with the reference sketch pushed next to the serving model.
+    Memory is constant: at most `windows` + 1 sketches and one buffer.
+    """
+
+    def __init__(self, model_dir: str = SAVED_MODEL_DIR, interval: float = DRIFT_MONITOR_INTERVAL_SECONDS,
+                 windows: int = DRIFT_MONITOR_WINDOWS, buffer_rows: int = DRIFT_MONITOR_BUFFER_ROWS,
+                 min_rows: int = DRIFT_MONITOR_MIN_ROWS):
+        self.model_dir = model_dir
+        self.interval = interval
+        self.buffer_rows = buffer_rows
+        self.min_rows = min_rows
+        self.reference_sketch_path: Optional[str] = None
+        self.reference: Optional[ReferenceSketch] = None
+        self.columns: List[str] = []
+        self.rows_observed = 0
+        self.report: Optional[pd.DataFrame] = None
+        self.window_rows = 0
+        self.last_compared_at: Optional[str] = None
+        self._windows = deque(maxlen=windows)
+        self._interval_sketch: Optional[ReferenceSketch] = None
+        self._buffer: List[np.ndarray] = []
+        self._buffered_rows = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_sketch(self) -> ReferenceSketch:
+        return ReferenceSketch(self.columns, k=self.reference.k, hist_edges=self.reference.hist_edges)
+
+    def _load_reference(self) -> None:
+        """
+        (Re)loads the reference sketch of the serving model; a new model resets the windows.
+        """
+        model_resolver = ModelResolver(model_dir=self.model_dir)
+        path = model_resolver.get_best_reference_sketch_path() if model_resolver.is_model_exists() else None
+        if path is None or not os.path.exists(path):
+            self.reference, self.reference_sketch_path = None, None
+            return
+        if path == self.reference_sketch_path:
+            return
+        reference = load_object(path)
+        self.columns = [column for column in reference.columns if column != TARGET_COLUMN]
+        self.reference = reference.select(self.columns)
+        self.reference_sketch_path = path
+        self._windows.clear()
+        self._interval_sketch = self._new_sketch()
+        self._buffer, self._buffered_rows = [], 0
+        self.report, self.window_rows = None, 0
+        logging.info(f"Drift monitor reference loaded from {path}")
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        block = np.concatenate(self._buffer, axis=1)
+        block.sort(axis=1)
+        self._interval_sketch.update_sorted_block(block)
+        self._buffer, self._buffered_rows = [], 0
+
+    def observe(self, dataframe: pd.DataFrame) -> None:
+        """
+        Records a scored batch. Features missing from the batch count as nulls.
+        """
+        try:
+            with self._lock:
+                if self.reference is None:
+                    return
+                values = dataframe.reindex(columns=self.columns).to_numpy(dtype=np.float32, na_value=np.nan)
+                self._buffer.append(values.T)
+                self._buffered_rows += len(values)
+                self.rows_observed += len(values)
+                if self._buffered_rows >= self.buffer_rows:
+                    self._flush()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def compare(self) -> Optional[pd.DataFrame]:
+        """
+        Closes the current interval and compares the window with the reference.
+        """
+        try:
+            with self._lock:
+                self._load_reference()
+                if self.reference is None:
+                    return None
+                self._flush()
+                if self._interval_sketch.row_count:
+                    self._windows.append(self._interval_sketch)
+                    self._interval_sketch = self._new_sketch()
+                windows, reference = list(self._windows), self.reference
+
+            window = self._new_sketch()
+            for sketch in windows:
+                window.merge(sketch)
+            if window.row_count < self.min_rows:
+                return self.report
+            report = reference.compare(window)
+
+            with self._lock:
+                if reference is self.reference:
+                    self.report, self.window_rows = report, window.row_count
+                    self.last_compared_at = datetime.now().isoformat()
+            logging.info(f"Drift monitor: {int(report['drift_status'].sum())} of {len(report)} features drifted "
+                         f"over the last {window.row_count} rows")
+            return report
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.compare()
+            except Exception as e:
+                logging.error(f"Drift monitor comparison failed: {e}")
+
+    def start(self) -> None:
+        try:
+            with self._lock:
+                self._load_reference()
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+                self._thread.start()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_status(self) -> dict:
+        """
+        JSON friendly state: reference in use, traffic seen and the latest per-feature drift.
+        """
+        with self._lock:
+            report = self.report
+            status = {
+                "reference_sketch_path": self.reference_sketch_path,
+                "rows_observed": self.rows_observed,
+                "window_rows": self.window_rows,
+                "last_compared_at": self.last_compared_at,
+                "drifted_columns": [],
+                "columns": {},
+            }
+        if report is not None:
+            status["drifted_columns"] = report.index[report["drift_status"]].to_list()
+            status["columns"] = {
+                column: {key: None if pd.isna(value) else value for key, value in row.items()}
+                for column, row in report.to_dict(orient="index").items()
+            }
+        return status
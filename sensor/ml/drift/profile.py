@@ -0,0 +1,176 @@
+from sensor.exception import CustomException
+from sensor.utils.schema_loader import SchemaLoader
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import sys
+
+
+class DatasetProfile:
+    """
+    Column profile of a dataset built in one vectorized pass per DataFrame: non-null count,
+    null rate, mean, std, min / max, zero-variance flag and schema conformance (column known
+    to the schema, dtype as compiled by SchemaLoader), plus the schema columns that are missing.
+
+    Moments are kept as (count, mean, M2) per column and combined with Chan's formula, so
+    profiles of separate chunks merge into the profile of the whole dataset.
+    """
+
+    def __init__(self, columns: List[str], dtypes: List[str], schema_loader: Optional[SchemaLoader] = None):
+        self.schema_loader = schema_loader if schema_loader is not None else SchemaLoader.get()
+        self.columns = list(columns)
+        self.dtypes = list(dtypes)
+        n_columns = len(self.columns)
+        self.n_rows = 0
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.minimum = np.full(n_columns, np.nan)
+        self.maximum = np.full(n_columns, np.nan)
+        self.numeric = self._numeric_flags(self.dtypes)
+
+    @staticmethod
+    def _numeric_flags(dtypes: List[str]) -> np.ndarray:
+        return np.array([pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype)) if dtype != "category" else False
+                         for dtype in dtypes], dtype=bool)
+
+    @classmethod
+    def from_columns(cls, columns: List[str], schema_loader: Optional[SchemaLoader] = None) -> "DatasetProfile":
+        """
+        Empty profile of a file known only by its header; schema and column checks work
+        right away and the observed dtypes are taken from the first chunk passed to `update`.
+        """
+        try:
+            schema_loader = schema_loader if schema_loader is not None else SchemaLoader.get()
+            dtypes = [str(pd.api.types.pandas_dtype(schema_loader.dtypes[column])) if column in schema_loader.dtypes else "object"
+                      for column in columns]
+            return cls(columns, dtypes, schema_loader)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def from_dataframe(cls, dataframe: pd.DataFrame, schema_loader: Optional[SchemaLoader] = None) -> "DatasetProfile":
+        try:
+            profile = cls(list(dataframe.columns), [str(dtype) for dtype in dataframe.dtypes], schema_loader)
+            profile.update(dataframe)
+            return profile
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def update(self, dataframe: pd.DataFrame) -> "DatasetProfile":
+        """
+        Adds a chunk with the same columns to the profile.
+        """
+        try:
+            if self.n_rows == 0:
+                self.dtypes = [str(dtype) for dtype in dataframe[self.columns].dtypes]
+                self.numeric = self._numeric_flags(self.dtypes)
+            chunk = DatasetProfile(self.columns, self.dtypes, self.schema_loader)
+            chunk.n_rows = len(dataframe)
+            chunk.count = np.array([dataframe[column].count() for column in self.columns], dtype=np.int64)
+            numeric_index = np.flatnonzero(self.numeric)
+            if len(numeric_index) and len(dataframe):
+                # column-major float64 copy built column by column (no intermediate frame)
+                values = np.empty((len(dataframe), len(numeric_index)), order="F")
+                for position, index in enumerate(numeric_index):
+                    values[:, position] = dataframe[self.columns[index]].to_numpy(dtype=np.float64, na_value=np.nan)
+                count = chunk.count[numeric_index]
+                observed = count > 0
+                chunk.minimum[numeric_index[observed]] = np.nanmin(values[:, observed], axis=0)
+                chunk.maximum[numeric_index[observed]] = np.nanmax(values[:, observed], axis=0)
+                # moments in place on the copy to keep one chunk-sized buffer
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    mean = np.where(observed, np.nansum(values, axis=0) / count, 0)
+                values -= mean
+                np.square(values, out=values)
+                chunk.mean[numeric_index] = mean
+                chunk.m2[numeric_index] = np.nansum(values, axis=0)
+            return self.merge(chunk)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def merge(self, other: "DatasetProfile") -> "DatasetProfile":
+        try:
+            if other.columns != self.columns:
+                raise ValueError("Cannot merge profiles of different columns")
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            with np.errstate(invalid="ignore", divide="ignore"):
+                share = np.where(count > 0, other.count / count, 0)
+            self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * share
+            self.mean = self.mean + delta * share
+            self.count = count
+            self.n_rows += other.n_rows
+            self.minimum = np.fmin(self.minimum, other.minimum)
+            self.maximum = np.fmax(self.maximum, other.maximum)
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def n_columns(self) -> int:
+        return len(self.columns)
+
+    @property
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.numeric & (self.count > 1), np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    @property
+    def zero_variance(self) -> np.ndarray:
+        return self.numeric & (self.count > 1) & (self.minimum == self.maximum)
+
+    @property
+    def zero_variance_columns(self) -> List[str]:
+        return [column for column, flag in zip(self.columns, self.zero_variance) if flag]
+
+    @property
+    def missing_schema_columns(self) -> List[str]:
+        present = set(self.columns)
+        return [column for column in self.schema_loader.columns if column not in present]
+
+    @property
+    def missing_numerical_columns(self) -> List[str]:
+        present = set(self.columns)
+        return [column for column in self.schema_loader.numerical_columns if column not in present]
+
+    @property
+    def unexpected_columns(self) -> List[str]:
+        return [column for column in self.columns if column not in self.schema_loader.dtypes]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        expected = [str(pd.api.types.pandas_dtype(self.schema_loader.dtypes[column])) if column in self.schema_loader.dtypes else None
+                    for column in self.columns]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            null_rate = 1 - self.count / max(self.n_rows, 1)
+        return pd.DataFrame({
+            "dtype": self.dtypes,
+            "expected_dtype": expected,
+            "in_schema": [dtype is not None for dtype in expected],
+            "dtype_conforms": [dtype == expected_dtype for dtype, expected_dtype in zip(self.dtypes, expected)],
+            "count": self.count,
+            "null_rate": null_rate,
+            "mean": np.where(self.numeric & (self.count > 0), self.mean, np.nan),
+            "std": self.std,
+            "min": self.minimum,
+            "max": self.maximum,
+            "zero_variance": self.zero_variance,
+        }, index=pd.Index(self.columns, name="column"))
+
+    def to_dict(self) -> dict:
+        """
+        YAML friendly profile: dataset level checks and one entry per column.
+        """
+        columns = {
+            column: {key: None if pd.isna(value) else value for key, value in row.items()}
+            for column, row in self.to_dataframe().to_dict(orient="index").items()
+        }
+        return {
+            "n_rows": int(self.n_rows),
+            "n_columns": self.n_columns,
+            "missing_schema_columns": self.missing_schema_columns,
+            "missing_numerical_columns": self.missing_numerical_columns,
+            "unexpected_columns": self.unexpected_columns,
+            "zero_variance_columns": self.zero_variance_columns,
+            "columns": columns,
+        }
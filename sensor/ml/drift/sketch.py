@@ -0,0 +1,300 @@
+from sensor.constant.training_pipeline import (DATA_VALIDATION_DRIFT_THRESHOLD, DATA_VALIDATION_DRIFT_METRICS,
+                                               DATA_VALIDATION_PSI_BINS, DATA_VALIDATION_SKETCH_K)
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.drift.drift_engine import DRIFT_METRICS, PSI_EPSILON, to_sorted_block
+from scipy.stats import kstwo
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import sys
+
+KLL_CAPACITY_DECAY = 2 / 3
+KLL_MIN_CAPACITY = 8
+
+
+def _step_cdf(values: np.ndarray, cumulative: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Evaluates the step CDF of sorted `values` with cumulative weights `cumulative` at `points`.
+    """
+    index = np.searchsorted(values, points, side="right")
+    return np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0) / cumulative[-1]
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch of one column. Items of level h stand for 2**h observed values;
+    a full level is sorted and every other item (random offset) is promoted one level up,
+    which keeps the sketch at roughly 3 * k items whatever the number of values seen.
+    Two sketches merge level by level, so sketches of separate batches add up.
+    """
+
+    def __init__(self, k: int = DATA_VALIDATION_SKETCH_K, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0, dtype=np.float32)]
+        self._rng = np.random.default_rng(seed)
+        self._sorted = None
+
+    @property
+    def count(self) -> int:
+        return int(sum(len(items) << level for level, items in enumerate(self.levels)))
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(KLL_MIN_CAPACITY, int(np.ceil(self.k * KLL_CAPACITY_DECAY ** depth)))
+
+    def _compress(self) -> None:
+        while sum(len(items) for items in self.levels) > sum(self._capacity(level) for level in range(len(self.levels))):
+            level = next(level for level, items in enumerate(self.levels) if len(items) > self._capacity(level))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float32))
+            items = np.sort(self.levels[level])
+            # an odd item stays behind so the promoted pairs carry the exact weight
+            keep = items[:1] if len(items) % 2 else items[:0]
+            pairs = items[len(keep):]
+            promoted = pairs[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+        self._sorted = None
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Adds the observed (non NaN) values.
+        """
+        values = np.asarray(values, dtype=np.float32)
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float32))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def sorted_view(self):
+        """
+        Returns (values, cumulative weights) of all items in ascending value order.
+        """
+        if self._sorted is None:
+            values = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(items), 1 << level, dtype=np.int64) for level, items in enumerate(self.levels)])
+            order = np.argsort(values, kind="stable")
+            self._sorted = values[order], np.cumsum(weights[order])
+        return self._sorted
+
+    def cdf(self, points: np.ndarray) -> np.ndarray:
+        values, cumulative = self.sorted_view()
+        if not len(values):
+            return np.full(len(points), np.nan)
+        return _step_cdf(values, cumulative, points)
+
+    def quantile(self, quantiles: np.ndarray) -> np.ndarray:
+        values, cumulative = self.sorted_view()
+        if not len(values):
+            return np.full(len(quantiles), np.nan)
+        index = np.searchsorted(cumulative, np.asarray(quantiles) * cumulative[-1], side="left")
+        return values[np.minimum(index, len(values) - 1)]
+
+
+class ReferenceSketch:
+    """
+    Compact, mergeable summary of a reference dataset, used for drift checks without the
+    reference rows: per column a KLL quantile sketch, row / null counts, min / max and a
+    histogram on bins fixed by the reference deciles of the first data seen.
+
+    `update` adds a batch and `merge` adds another sketch; both keep memory constant, so a
+    rolling reference can be maintained batch after batch. `compare` scores a batch against
+    the sketch with the statistics of DriftEngine.
+    """
+
+    def __init__(self, columns: List[str], k: int = DATA_VALIDATION_SKETCH_K, psi_bins: int = DATA_VALIDATION_PSI_BINS,
+                 hist_edges: Optional[np.ndarray] = None):
+        """
+        :param hist_edges: histogram bin edges to use instead of the deciles of the first data,
+            e.g. the edges of a reference sketch this one will be compared with.
+        """
+        self.columns = list(columns)
+        self.k = k
+        self.psi_bins = psi_bins if hist_edges is None else hist_edges.shape[1] + 1
+        self.sketches = [KLLSketch(k=k, seed=index) for index in range(len(self.columns))]
+        self.row_count = 0
+        self.null_count = np.zeros(len(self.columns), dtype=np.int64)
+        self.minimum = np.full(len(self.columns), np.inf)
+        self.maximum = np.full(len(self.columns), -np.inf)
+        self.hist_edges: Optional[np.ndarray] = None if hist_edges is None else np.array(hist_edges)
+        self.hist_counts = np.zeros((len(self.columns), self.psi_bins), dtype=np.int64)
+
+    @classmethod
+    def from_dataframe(cls, dataframe: pd.DataFrame, columns: Optional[List[str]] = None, **kwargs) -> "ReferenceSketch":
+        try:
+            sketch = cls(list(dataframe.columns if columns is None else columns), **kwargs)
+            sketch.update(dataframe)
+            return sketch
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _histogram(self, block: np.ndarray, valid_count: np.ndarray) -> np.ndarray:
+        counts = np.empty((len(self.columns), self.psi_bins), dtype=np.int64)
+        for index, (values, edges) in enumerate(zip(block, self.hist_edges)):
+            below = np.searchsorted(values[:valid_count[index]], edges, side="right")
+            counts[index] = np.diff(np.concatenate([[0], below, [valid_count[index]]]))
+        return counts
+
+    def _rebinned_counts(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Histogram counts of this sketch on other bin `edges`, read off the quantile sketches.
+        """
+        if self.hist_edges is not None and np.array_equal(edges, self.hist_edges):
+            return self.hist_counts
+        valid_count = self.row_count - self.null_count
+        counts = np.zeros((len(self.columns), edges.shape[1] + 1), dtype=np.int64)
+        for index, sketch in enumerate(self.sketches):
+            if valid_count[index]:
+                cdf = np.concatenate([[0], sketch.cdf(edges[index]), [1]])
+                counts[index] = np.round(np.diff(cdf) * valid_count[index]).astype(np.int64)
+        return counts
+
+    def select(self, columns: List[str]) -> "ReferenceSketch":
+        """
+        Sketch restricted to `columns` (shares the per-column quantile sketches with this one).
+        """
+        try:
+            positions = [self.columns.index(column) for column in columns]
+            selected = ReferenceSketch(columns, k=self.k, psi_bins=self.psi_bins)
+            selected.sketches = [self.sketches[position] for position in positions]
+            selected.row_count = self.row_count
+            selected.null_count = self.null_count[positions]
+            selected.minimum = self.minimum[positions]
+            selected.maximum = self.maximum[positions]
+            selected.hist_edges = None if self.hist_edges is None else self.hist_edges[positions]
+            selected.hist_counts = self.hist_counts[positions]
+            return selected
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def update(self, dataframe: pd.DataFrame) -> None:
+        try:
+            self.update_sorted_block(to_sorted_block(dataframe, self.columns))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def update_sorted_block(self, block: np.ndarray) -> None:
+        """
+        Adds a (n_columns, n_rows) block of this sketch's columns, each row sorted with NaN last.
+        """
+        try:
+            valid_count = (~np.isnan(block)).sum(axis=1)
+            for index, sketch in enumerate(self.sketches):
+                sketch.update(block[index, :valid_count[index]])
+            self.row_count += block.shape[1]
+            self.null_count += block.shape[1] - valid_count
+            with np.errstate(invalid="ignore"):
+                self.minimum = np.fmin(self.minimum, np.where(valid_count > 0, block[:, 0], np.nan))
+                self.maximum = np.fmax(self.maximum, block[np.arange(len(block)), np.maximum(valid_count - 1, 0)])
+            if self.hist_edges is None:
+                quantiles = np.arange(1, self.psi_bins) / self.psi_bins
+                self.hist_edges = np.stack([sketch.quantile(quantiles) for sketch in self.sketches])
+            self.hist_counts += self._histogram(block, valid_count)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def merge(self, other: "ReferenceSketch") -> "ReferenceSketch":
+        """
+        Adds `other` (same columns) into this sketch. Histogram counts of `other` are moved
+        onto this sketch's bins through its quantile sketch when the bins differ.
+        """
+        try:
+            if other.columns != self.columns:
+                raise ValueError("Cannot merge sketches built on different columns")
+            if self.hist_edges is None:
+                self.hist_edges = other.hist_edges
+            if other.hist_edges is not None:
+                self.hist_counts += other._rebinned_counts(self.hist_edges)
+            for sketch, other_sketch in zip(self.sketches, other.sketches):
+                sketch.merge(other_sketch)
+            self.row_count += other.row_count
+            self.null_count += other.null_count
+            self.minimum = np.fmin(self.minimum, other.minimum)
+            self.maximum = np.fmax(self.maximum, other.maximum)
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Per column null rate, min, max and quartiles.
+        """
+        quartiles = np.stack([sketch.quantile(np.array([0.25, 0.5, 0.75])) for sketch in self.sketches])
+        return pd.DataFrame({
+            "null_rate": self.null_count / max(self.row_count, 1),
+            "min": np.where(np.isfinite(self.minimum), self.minimum, np.nan),
+            "max": np.where(np.isfinite(self.maximum), self.maximum, np.nan),
+            "q25": quartiles[:, 0], "median": quartiles[:, 1], "q75": quartiles[:, 2],
+        }, index=pd.Index(self.columns, name="column"))
+
+    def compare(self, current, metrics=DATA_VALIDATION_DRIFT_METRICS,
+                threshold: float = DATA_VALIDATION_DRIFT_THRESHOLD) -> pd.DataFrame:
+        """
+        Drift of a batch (DataFrame) or of another sketch against this sketch; same report
+        layout as DriftEngine.compare. KS and Wasserstein use the sketch CDF (rank error about
+        1/k; Wasserstein is only indicative on heavy tails, which the sketch samples coarsely),
+        PSI the histogram.
+        """
+        try:
+            unknown_metrics = set(metrics) - set(DRIFT_METRICS)
+            if unknown_metrics:
+                raise ValueError(f"Unknown drift metrics: {sorted(unknown_metrics)}")
+            if isinstance(current, ReferenceSketch):
+                if current.columns != self.columns:
+                    raise ValueError("Cannot compare sketches built on different columns")
+                current_rows = current.row_count
+                current_valid = current.row_count - current.null_count
+                current_views = [sketch.sorted_view() for sketch in current.sketches]
+                current_counts = current._rebinned_counts(self.hist_edges)
+            else:
+                block = to_sorted_block(current, self.columns)
+                current_rows = block.shape[1]
+                current_valid = (~np.isnan(block)).sum(axis=1)
+                current_views = [(values[:valid], np.arange(1, valid + 1)) for values, valid in zip(block, current_valid)]
+                current_counts = self._histogram(block, current_valid)
+            reference_valid = self.row_count - self.null_count
+            testable = (reference_valid > 0) & (current_valid > 0)
+            statistic = np.full(len(self.columns), np.nan)
+            wasserstein = np.full(len(self.columns), np.nan)
+
+            for index in np.flatnonzero(testable):
+                reference_values, reference_cumulative = self.sketches[index].sorted_view()
+                current_values, current_cumulative = current_views[index]
+                # both step CDFs evaluated on the union of their jump points
+                points = np.union1d(reference_values, current_values)
+                reference_cdf = _step_cdf(reference_values, reference_cumulative, points)
+                current_cdf = _step_cdf(current_values, current_cumulative, points)
+                gap = np.abs(reference_cdf - current_cdf)
+                statistic[index] = gap.max()
+                wasserstein[index] = (gap[:-1] * np.diff(points.astype(np.float64))).sum()
+
+            result = {
+                "reference_missing_ratio": self.null_count / max(self.row_count, 1),
+                "current_missing_ratio": 1 - current_valid / max(current_rows, 1),
+            }
+            if "ks" in metrics:
+                effective_n = np.where(testable, reference_valid * current_valid / np.maximum(reference_valid + current_valid, 1), 1)
+                result["ks_statistic"] = statistic
+                result["p_value"] = np.where(testable, np.clip(kstwo.sf(np.nan_to_num(statistic), np.round(effective_n)), 0, 1), np.nan)
+            if "wasserstein" in metrics:
+                result["wasserstein"] = wasserstein
+            if "psi" in metrics:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    reference_share = np.clip(self.hist_counts / reference_valid[:, None], PSI_EPSILON, None)
+                    current_share = np.clip(current_counts / current_valid[:, None], PSI_EPSILON, None)
+                    psi = ((current_share - reference_share) * np.log(current_share / reference_share)).sum(axis=1)
+                result["psi"] = np.where(testable, psi, np.nan)
+
+            report = pd.DataFrame(result, index=pd.Index(self.columns, name="column"))
+            if "p_value" in report:
+                report["drift_status"] = report["p_value"] < threshold
+            logging.info(f"Drift against reference sketch computed for {len(self.columns)} columns")
+            return report
+        except Exception as e:
+            raise CustomException(e, sys)
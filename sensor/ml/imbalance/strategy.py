@@ -0,0 +1,129 @@
+from imblearn.combine import SMOTETomek
+from sensor.constant.training_pipeline import DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS, DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL
+from sensor.exception import CustomException
+from sklearn.neighbors import NearestNeighbors
+from typing import Optional, Tuple
+import inspect
+import numpy as np
+import sys
+
+
+class ImbalanceStrategy:
+    """
+    How the class imbalance of the training set is handled. `fit_resample` returns the
+    (possibly resampled) training data and `scale_pos_weight` the positive class weight the
+    trainer should use, None when the data is already balanced by resampling. `resamples` tells
+    whether `fit_resample` may change the rows, so callers can skip materializing them otherwise.
+    """
+    name: str = ""
+    resamples: bool = False
+
+    def fit_resample(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return x, y
+
+    def scale_pos_weight(self, y: np.ndarray) -> Optional[float]:
+        return None
+
+
+class SMOTETomekStrategy(ImbalanceStrategy):
+    """
+    SMOTE oversampling of the minority class followed by Tomek-link cleaning. The Tomek step
+    is a nearest neighbour search over every row in all feature dimensions.
+    """
+    name = "smote_tomek"
+    resamples = True
+
+    def __init__(self, random_state: Optional[int] = None):
+        self.random_state = random_state
+
+    def fit_resample(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        try:
+            return SMOTETomek(sampling_strategy="minority", random_state=self.random_state).fit_resample(x, y)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class ApproximateSMOTEStrategy(ImbalanceStrategy):
+    """
+    SMOTE without the Tomek step, with neighbours searched in a random pool of at most
+    `neighbor_pool` minority rows: each synthetic row interpolates between a minority row and
+    one of its `k_neighbors` nearest pool rows, so the cost grows linearly with the data.
+    """
+    name = "approx_smote"
+    resamples = True
+
+    def __init__(self, k_neighbors: int = DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS,
+                 neighbor_pool: int = DATA_TRANSFORMATION_SMOTE_NEIGHBOR_POOL,
+                 sampling_ratio: float = 1.0, random_state: Optional[int] = None):
+        """
+        :param sampling_ratio: minority / majority row ratio after resampling
+        """
+        self.k_neighbors = k_neighbors
+        self.neighbor_pool = neighbor_pool
+        self.sampling_ratio = sampling_ratio
+        self.random_state = random_state
+
+    def fit_resample(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        try:
+            classes, counts = np.unique(y, return_counts=True)
+            minority = classes[np.argmin(counts)]
+            minority_x = x[y == minority]
+            n_synthetic = int(self.sampling_ratio * counts.max()) - len(minority_x)
+            if n_synthetic <= 0 or len(minority_x) < 2:
+                return x, y
+
+            rng = np.random.default_rng(self.random_state)
+            pool = minority_x
+            if len(pool) > self.neighbor_pool:
+                pool = pool[rng.choice(len(pool), self.neighbor_pool, replace=False)]
+            k_neighbors = min(self.k_neighbors, len(pool) - 1)
+
+            # neighbours only for the minority rows drawn as anchors
+            anchors = rng.integers(0, len(minority_x), n_synthetic)
+            unique_anchors, anchor_position = np.unique(anchors, return_inverse=True)
+            distance, neighbors = NearestNeighbors(n_neighbors=k_neighbors + 1).fit(pool).kneighbors(minority_x[unique_anchors])
+            # the anchor itself (or an exact duplicate) sits at distance 0, move it behind the real neighbours
+            order = np.argsort(distance == 0, axis=1, kind="stable")[:, :k_neighbors]
+            neighbors = np.take_along_axis(neighbors, order, axis=1)
+
+            neighbor = neighbors[anchor_position, rng.integers(0, k_neighbors, n_synthetic)]
+            anchor_x = minority_x[anchors]
+            gap = rng.random((n_synthetic, 1)).astype(x.dtype, copy=False)
+            synthetic = anchor_x + gap * (pool[neighbor] - anchor_x)
+
+            x_resampled = np.concatenate([x, synthetic])
+            y_resampled = np.concatenate([np.asarray(y), np.full(n_synthetic, minority, dtype=np.asarray(y).dtype)])
+            return x_resampled, y_resampled
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class ClassWeightStrategy(ImbalanceStrategy):
+    """
+    No resampling: the trainer up-weights the positive class by negative / positive row count
+    (XGBoost `scale_pos_weight`).
+    """
+    name = "class_weight"
+
+    def scale_pos_weight(self, y: np.ndarray) -> Optional[float]:
+        positives = int(np.count_nonzero(y == 1))
+        if positives == 0:
+            return None
+        return float((len(y) - positives) / positives)
+
+
+IMBALANCE_STRATEGIES = {strategy.name: strategy for strategy in (SMOTETomekStrategy, ApproximateSMOTEStrategy, ClassWeightStrategy)}
+
+
+def get_imbalance_strategy(name: str, **kwargs) -> ImbalanceStrategy:
+    """
+    Builds the strategy registered under `name`; keyword arguments the strategy does not take are ignored.
+    """
+    try:
+        if name not in IMBALANCE_STRATEGIES:
+            raise ValueError(f"Unknown imbalance strategy {name!r}, expected one of {sorted(IMBALANCE_STRATEGIES)}")
+        strategy_cls = IMBALANCE_STRATEGIES[name]
+        parameters = inspect.signature(strategy_cls).parameters
+        return strategy_cls(**{key: value for key, value in kwargs.items() if key in parameters})
+    except Exception as e:
+        raise CustomException(e, sys)
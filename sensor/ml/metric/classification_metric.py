@@ -1,21 +1,96 @@
+from sensor.constant.training_pipeline import APS_FALSE_POSITIVE_COST, APS_FALSE_NEGATIVE_COST
 from sensor.entity.artifact_entity import ClassificationMetricArtifact
 from sensor.exception import CustomException
-from sklearn.metrics import f1_score, precision_score, recall_score
+from typing import Tuple
 import numpy as np
+import pandas as pd
 import os, sys
 
+
+def get_confusion_counts(y_true, y_pred) -> Tuple[int, int, int, int]:
+    """
+    (tn, fp, fn, tp) of binary 0 / 1 labels, counted in one bincount over 2 * y_true + y_pred.
+    """
+    y_true = np.asarray(y_true).astype(np.int64, copy=False).ravel()
+    y_pred = np.asarray(y_pred).astype(np.int64, copy=False).ravel()
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f"y_true and y_pred have different lengths: {len(y_true)} != {len(y_pred)}")
+    if y_true.size and (min(y_true.min(), y_pred.min()) < 0 or max(y_true.max(), y_pred.max()) > 1):
+        raise ValueError("Classification metrics expect binary 0 / 1 labels")
+    tn, fp, fn, tp = np.bincount(2 * y_true + y_pred, minlength=4)
+    return int(tn), int(fp), int(fn), int(tp)
+
+
+def get_aps_cost(fp: int, fn: int, fp_cost: float = APS_FALSE_POSITIVE_COST, fn_cost: float = APS_FALSE_NEGATIVE_COST) -> float:
+    """
+    APS failure challenge cost: an unnecessary check (false positive) costs `fp_cost`,
+    a missed failure (false negative) `fn_cost`.
+    """
+    return float(fp_cost * fp + fn_cost * fn)
+
+
 def get_classification_score(y_true, y_pred) -> ClassificationMetricArtifact:
     try:
-        model_f1_score = f1_score(y_true, y_pred)
-        model_recall_score = recall_score(y_true, y_pred)
-        model_precision_score = precision_score(y_true, y_pred)
-        
+        tn, fp, fn, tp = get_confusion_counts(y_true, y_pred)
+        # an undefined ratio counts as 0, as sklearn's zero_division default does
+        model_precision_score = tp / (tp + fp) if tp + fp else 0.0
+        model_recall_score = tp / (tp + fn) if tp + fn else 0.0
+        model_f1_score = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+
         classification_metric = ClassificationMetricArtifact(
             f1_score=model_f1_score,
             precision_score=model_precision_score,
-            recall_score=model_recall_score
+            recall_score=model_recall_score,
+            aps_cost=get_aps_cost(fp, fn)
         )
-        
+
         return classification_metric
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+
+def get_threshold_costs(y_true, probability, fp_cost: float = APS_FALSE_POSITIVE_COST,
+                        fn_cost: float = APS_FALSE_NEGATIVE_COST) -> pd.DataFrame:
+    """
+    Cost of every decision threshold "positive when probability >= threshold", in one pass:
+    the scores are sorted once (descending) and the true / false positives above each
+    distinct score are cumulative sums, so the sweep is O(n log n) for n rows. The first
+    row, threshold +inf, predicts everything negative.
+    """
+    try:
+        y_true = np.asarray(y_true).astype(np.int64, copy=False).ravel()
+        probability = np.asarray(probability, dtype=np.float64).ravel()
+        order = np.argsort(-probability, kind="stable")
+        scores = probability[order]
+        tp = np.cumsum(y_true[order])
+        fp = np.arange(1, len(scores) + 1) - tp
+        # ties share a threshold, keep the last row of each run of equal scores
+        last = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1] if len(scores) else np.empty(0, dtype=np.int64)
+        positives = int(tp[-1]) if len(tp) else 0
+        tp = np.r_[0, tp[last]]
+        fp = np.r_[0, fp[last]]
+        fn = positives - tp
+        return pd.DataFrame({
+            "threshold": np.r_[np.inf, scores[last]],
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "tn": len(y_true) - positives - fp,
+            "cost": fp_cost * fp + fn_cost * fn,
+        })
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def get_best_threshold(y_true, probability, fp_cost: float = APS_FALSE_POSITIVE_COST,
+                       fn_cost: float = APS_FALSE_NEGATIVE_COST) -> Tuple[float, float]:
+    """
+    (threshold, cost) of the lowest-cost threshold of `get_threshold_costs`; among equal
+    costs the highest threshold.
+    """
+    try:
+        costs = get_threshold_costs(y_true, probability, fp_cost=fp_cost, fn_cost=fn_cost)
+        best = costs.iloc[int(np.argmin(costs["cost"].to_numpy()))]
+        return float(best["threshold"]), float(best["cost"])
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,166 @@
+from concurrent.futures import ProcessPoolExecutor
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.imbalance.strategy import ImbalanceStrategy
+from sensor.ml.metric.classification_metric import get_classification_score, get_best_threshold
+from sensor.ml.model.xgb_training import train_quantile_dmatrix
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import FunctionTransformer
+from typing import Optional
+from xgboost import XGBClassifier
+import multiprocessing as mp
+import numpy as np
+import os
+import pandas as pd
+import sys
+import time
+
+METRICS = ("f1_score", "precision_score", "recall_score", "aps_cost")
+
+# per process fold state: the memory-mapped dataset shared by every fold
+_STATE = {}
+
+
+def _init_state(features_file_path: str, target_file_path: str, params: dict, imbalance_strategy: ImbalanceStrategy,
+                engine: str, quantile_params: dict, preprocessor) -> None:
+    """
+    Worker initializer: maps the dataset read-only, so every worker reads the same page cache copy.
+    """
+    _STATE.update(x=np.load(features_file_path, mmap_mode="r"), y=np.load(target_file_path, mmap_mode="r"),
+                  params=params, imbalance_strategy=imbalance_strategy, engine=engine, quantile_params=quantile_params,
+                  preprocessor=preprocessor)
+
+
+def _train_fold(fold: int, train_index: np.ndarray, validation_index: np.ndarray) -> dict:
+    """
+    Fits the preprocessor on the training rows of `fold`, transforms them and the validation rows
+    with it and trains the fold model as the trainer does with its engine: rebalances the training
+    rows as DataTransformation does and fits an XGBClassifier, or hands them to
+    `train_quantile_dmatrix`, which holds its early stopping rows out before rebalancing. The
+    training metric is scored on the fold rows before resampling, like the validation rows.
+    """
+    start = time.perf_counter()
+    x, y = _STATE["x"], _STATE["y"]
+    imbalance_strategy = _STATE["imbalance_strategy"]
+    # imputer and scaler fitted on the training rows of the fold only
+    preprocessor = clone(_STATE["preprocessor"]).fit(x[train_index])
+    x_fold = preprocessor.transform(x[train_index]).astype(np.float32, copy=False)
+    x_validation = preprocessor.transform(x[validation_index]).astype(np.float32, copy=False)
+    y_fold = np.asarray(y[train_index])
+    params = dict(_STATE["params"])
+    if _STATE["engine"] == "quantile_dmatrix":
+        nthread, random_state = params.pop("n_jobs"), params.pop("random_state")
+        model = train_quantile_dmatrix(x_fold, y_fold, imbalance_strategy, nthread=nthread, random_state=random_state,
+                                       params=params, **_STATE["quantile_params"])
+    else:
+        x_train, y_train = imbalance_strategy.fit_resample(x_fold, y_fold)
+        scale_pos_weight = imbalance_strategy.scale_pos_weight(y_train)
+        if scale_pos_weight is not None:
+            params["scale_pos_weight"] = scale_pos_weight
+        model = XGBClassifier(**params).fit(x_train, y_train)
+
+    y_validation = np.asarray(y[validation_index])
+    probability = model.predict_proba(x_validation)[:, 1]
+    # scored on the fold rows before resampling, the class distribution of the validation rows
+    train_metric = get_classification_score(y_fold, model.predict(x_fold))
+    validation_metric = get_classification_score(y_validation, (probability > 0.5).astype(int))
+    return {
+        "fold": fold,
+        "train_rows": len(y_fold),
+        "validation_rows": len(y_validation),
+        **{f"train_{metric}": getattr(train_metric, metric) for metric in METRICS},
+        **{f"validation_{metric}": getattr(validation_metric, metric) for metric in METRICS},
+        "seconds": time.perf_counter() - start,
+        "validation_index": validation_index,
+        "probability": probability,
+    }
+
+
+class StratifiedKFoldEvaluation:
+    """
+    Stratified k-fold evaluation of the XGBoost model the trainer fits with `engine`. The folds
+    are trained by `n_jobs` worker processes, each XGBoost model using `nthread` threads (-1: the
+    cores split evenly between the workers). Workers memory-map the saved untransformed dataset
+    instead of receiving a copy; only the rows of their fold are materialized, to fit the
+    preprocessor on them and rebalance them.
+
+    After `fit`, `fold_results` holds the train / validation metrics of every fold, `mean`
+    and `variance` (sample variance over the folds) the validation metrics,
+    `fold_predictions` the out-of-fold probability of every row, and `best_threshold` /
+    `best_threshold_cost` the APS cost-optimal decision threshold on those probabilities.
+    """
+
+    def __init__(self, n_splits: int, n_jobs: int, nthread: int, imbalance_strategy: ImbalanceStrategy,
+                 params: Optional[dict] = None, seed: int = 42, engine: str = "xgb_classifier",
+                 quantile_params: Optional[dict] = None, preprocessor=None):
+        """
+        :param preprocessor: unfitted transformer (e.g. the imputer / scaler pipeline of DataTransformation)
+            cloned and fitted on the training rows of every fold; the saved features are untransformed
+        :param engine: the trainer engine the fold models are trained with, "xgb_classifier" or "quantile_dmatrix"
+        :param quantile_params: keyword arguments of `train_quantile_dmatrix` for the "quantile_dmatrix" engine
+            (max_bin, max_rounds, early_stopping_rounds, validation_split, batch_rows)
+        """
+        self.n_splits = n_splits
+        self.n_jobs = n_jobs
+        self.nthread = nthread
+        self.imbalance_strategy = imbalance_strategy
+        self.params = dict(params or {})
+        self.seed = seed
+        self.engine = engine
+        self.quantile_params = dict(quantile_params or {})
+        self.preprocessor = preprocessor if preprocessor is not None else FunctionTransformer()
+        self.fold_results: Optional[pd.DataFrame] = None
+        self.fold_predictions: Optional[pd.DataFrame] = None
+        self.mean: Optional[dict] = None
+        self.variance: Optional[dict] = None
+        self.train_mean: Optional[dict] = None
+        self.best_threshold: Optional[float] = None
+        self.best_threshold_cost: Optional[float] = None
+
+    def fit(self, features_file_path: str, target_file_path: str) -> "StratifiedKFoldEvaluation":
+        try:
+            y = np.load(target_file_path, mmap_mode="r")
+            folds = StratifiedKFold(n_splits=self.n_splits, shuffle=True, random_state=self.seed)
+            tasks = [(fold, train_index, validation_index)
+                     for fold, (train_index, validation_index) in enumerate(folds.split(np.zeros(len(y)), np.asarray(y)))]
+
+            n_jobs = max(1, min(self.n_jobs, self.n_splits))
+            nthread = self.nthread
+            if nthread == -1 and n_jobs > 1:
+                nthread = max(1, (os.cpu_count() or 1) // n_jobs)
+            params = {"random_state": self.seed, **self.params, "n_jobs": nthread}
+            initargs = (features_file_path, target_file_path, params, self.imbalance_strategy, self.engine, self.quantile_params,
+                        self.preprocessor)
+
+            if n_jobs > 1:
+                with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp.get_context("fork"),
+                                         initializer=_init_state, initargs=initargs) as executor:
+                    results = list(executor.map(_train_fold, *zip(*tasks)))
+            else:
+                _init_state(*initargs)
+                try:
+                    results = [_train_fold(*task) for task in tasks]
+                finally:
+                    _STATE.clear()
+
+            self.fold_predictions = pd.DataFrame({
+                "row": np.concatenate([result["validation_index"] for result in results]),
+                "fold": np.concatenate([np.full(len(result["probability"]), result["fold"]) for result in results]),
+                "probability": np.concatenate([result["probability"] for result in results]),
+            }).sort_values("row").reset_index(drop=True)
+            self.fold_predictions.insert(2, "y_true", np.asarray(y)[self.fold_predictions["row"].to_numpy()])
+            self.fold_results = pd.DataFrame([{key: value for key, value in result.items()
+                                               if key not in ("validation_index", "probability")} for result in results])
+
+            self.mean = {metric: float(self.fold_results[f"validation_{metric}"].mean()) for metric in METRICS}
+            self.variance = {metric: float(self.fold_results[f"validation_{metric}"].var(ddof=1)) for metric in METRICS}
+            self.train_mean = {metric: float(self.fold_results[f"train_{metric}"].mean()) for metric in METRICS}
+            self.best_threshold, self.best_threshold_cost = get_best_threshold(self.fold_predictions["y_true"],
+                                                                               self.fold_predictions["probability"])
+            logging.info(f"{self.n_splits}-fold cross-validation ({n_jobs} workers x {nthread} threads): "
+                         f"F1 {self.mean['f1_score']:.4f} (variance {self.variance['f1_score']:.2e}), "
+                         f"cost-optimal threshold {self.best_threshold:.4f} (cost {self.best_threshold_cost:.0f})")
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,6 +1,9 @@
 import os, sys
-from sensor.constant.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME, REFERENCE_SKETCH_FILE_NAME
 from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.model.fused_transform import FusedPreprocessor
+from typing import Optional
 class TargetValueMapping:
     def __init__(self):
         self.neg: int = 0
@@ -9,17 +12,50 @@ class TargetValueMapping:
         return self.__dict__
     
     def reverse_mapping(self):
-        mapping_response = self.to_dict
+        mapping_response = self.to_dict()
         return dict(zip(mapping_response.values(), mapping_response.keys()))
     
     
 class SensorModel:
-    def __init__(self, preprocessor, model):
+    def __init__(self, preprocessor, model, training_state: Optional[dict] = None):
+        """
+        :param training_state: what the model was trained on (data watermark, row counts, warm starts), used for warm starts
+        """
         try:
             self.preprocessor = preprocessor
             self.model = model
+            self.training_state = training_state
+            self.fused_preprocessor = self.compile_preprocessor(preprocessor)
         except Exception as e:
             raise e
+
+    @staticmethod
+    def compile_preprocessor(preprocessor) -> Optional[FusedPreprocessor]:
+        """
+        Fused float32 transform used by `predict`, None (sklearn path) when the preprocessor cannot be fused.
+        """
+        try:
+            return FusedPreprocessor.from_pipeline(preprocessor)
+        except Exception as e:
+            logging.warning(f"Preprocessor is not fused, predictions use the sklearn pipeline: {e}")
+            return None
+
+    def predict(self, x):
+        try:
+            # models pickled before the fused transform existed have no such attribute
+            fused_preprocessor = getattr(self, "fused_preprocessor", None)
+            if fused_preprocessor is not None:
+                x_transform = fused_preprocessor.transform(x)
+            else:
+                # the preprocessor was fitted on a DataFrame, feed it the same columns in the same order
+                feature_names = getattr(self.preprocessor, "feature_names_in_", None)
+                if feature_names is not None and hasattr(x, "columns"):
+                    x = x[feature_names]
+                x_transform = self.preprocessor.transform(x)
+            y_hat = self.model.predict(x_transform)
+            return y_hat
+        except Exception as e:
+            raise CustomException(e, sys)
         
 class ModelResolver:
     def __init__(self, model_dir=SAVED_MODEL_DIR):
@@ -42,6 +78,15 @@ class ModelResolver:
         except Exception as e:
             raise CustomException(e, sys)
 
+    def get_best_reference_sketch_path(self) -> str:
+        """
+        Path of the reference sketch pushed next to the best model (it may not exist for older models).
+        """
+        try:
+            return os.path.join(os.path.dirname(self.get_best_model_path()), REFERENCE_SKETCH_FILE_NAME)
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def is_model_exists(self) -> bool:
         try:
             if not os.path.exists(self.model_dir):
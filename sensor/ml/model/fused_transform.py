@@ -0,0 +1,122 @@
+from sensor.constant.training_pipeline import FUSED_TRANSFORM_MAX_BUFFER_ROWS, FUSED_TRANSFORM_RTOL, FUSED_TRANSFORM_ATOL
+from sensor.exception import CustomException
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import RobustScaler
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import sys
+import threading
+
+
+class FusedPreprocessor:
+    """
+    Inference-only compilation of a fitted `SimpleImputer` -> `RobustScaler` pipeline.
+
+    Fill values, centers and reciprocal scales are kept as contiguous float32 rows and applied
+    in one pass, in place on a per-thread float32 buffer:
+        out = (x - center) * inv_scale, and (fill - center) * inv_scale where x is missing
+    No input validation, float64 upcast or intermediate frame. The returned array is a view of
+    the buffer and is overwritten by the next `transform` call on the same thread.
+    """
+
+    def __init__(self, fill_value: np.ndarray, center: np.ndarray, scale: np.ndarray,
+                 feature_names: Optional[List[str]] = None, max_buffer_rows: int = FUSED_TRANSFORM_MAX_BUFFER_ROWS):
+        self.center = np.ascontiguousarray(center, dtype=np.float32)
+        self.inv_scale = np.ascontiguousarray(1 / np.asarray(scale, dtype=np.float64), dtype=np.float32)
+        # the scaled value of a missing entry, computed once in float64
+        self.filled = np.ascontiguousarray((np.asarray(fill_value, dtype=np.float64) - center) / scale, dtype=np.float32)
+        self.feature_names = None if feature_names is None else list(feature_names)
+        self.max_buffer_rows = max_buffer_rows
+        self._local = threading.local()
+
+    @property
+    def n_features(self) -> int:
+        return len(self.center)
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline, check: bool = True) -> "FusedPreprocessor":
+        """
+        Compiles a fitted pipeline of an optional SimpleImputer followed by an optional RobustScaler.
+        Raises ValueError for any other pipeline or, with `check`, when the compiled transform
+        does not match the pipeline on probe data.
+        """
+        steps = [step for _, step in pipeline.steps] if isinstance(pipeline, Pipeline) else [pipeline]
+        imputer = steps.pop(0) if steps and isinstance(steps[0], SimpleImputer) else None
+        scaler = steps.pop(0) if steps and isinstance(steps[0], RobustScaler) else None
+        if steps or (imputer is None and scaler is None):
+            raise ValueError(f"Cannot fuse preprocessor {pipeline}")
+        n_features = (imputer or scaler).n_features_in_
+        if imputer is not None and (imputer.add_indicator or len(imputer.statistics_) != n_features
+                                    or np.isnan(imputer.statistics_.astype(np.float64)).any()):
+            raise ValueError(f"Cannot fuse {imputer}: it drops or adds columns")
+
+        fill_value = imputer.statistics_.astype(np.float64) if imputer is not None else np.full(n_features, np.nan)
+        center = scaler.center_ if scaler is not None and scaler.center_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if scaler is not None and scaler.scale_ is not None else np.ones(n_features)
+        feature_names = getattr(pipeline, "feature_names_in_", None)
+        fused = cls(fill_value, center, scale, feature_names=None if feature_names is None else list(feature_names))
+        if check:
+            fused.check_equivalence(pipeline)
+        return fused
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _buffers(self, n_rows: int):
+        if n_rows > self.max_buffer_rows:
+            return np.empty((n_rows, self.n_features), dtype=np.float32), np.empty((n_rows, self.n_features), dtype=bool)
+        out = getattr(self._local, "out", None)
+        if out is None or len(out) < n_rows:
+            # grow to the next power of two so a stream of growing batches reallocates rarely
+            capacity = min(self.max_buffer_rows, 1 << max(n_rows - 1, 1).bit_length())
+            self._local.out = out = np.empty((capacity, self.n_features), dtype=np.float32)
+            self._local.mask = np.empty((capacity, self.n_features), dtype=bool)
+        return out[:n_rows], self._local.mask[:n_rows]
+
+    def transform(self, x) -> np.ndarray:
+        try:
+            if hasattr(x, "columns"):
+                if self.feature_names is not None and list(x.columns) != self.feature_names:
+                    x = x[self.feature_names]
+                # a view for frames backed by a single float block
+                values = x.to_numpy()
+            else:
+                values = np.asarray(x)
+            if values.ndim != 2 or values.shape[1] != self.n_features:
+                raise ValueError(f"Expected {self.n_features} features, got shape {values.shape}")
+
+            out, mask = self._buffers(len(values))
+            np.copyto(out, values, casting="unsafe")
+            np.isnan(out, out=mask)
+            out -= self.center
+            out *= self.inv_scale
+            np.copyto(out, self.filled, where=mask)
+            return out
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def check_equivalence(self, pipeline: Pipeline, n_rows: int = 512, missing_rate: float = 0.1, seed: int = 0) -> float:
+        """
+        Compares the fused transform with `pipeline.transform` on random rows spread around the
+        fitted centers; returns the largest absolute difference, raises ValueError beyond tolerance.
+        """
+        rng = np.random.default_rng(seed)
+        scale = 1 / self.inv_scale.astype(np.float64)
+        probe = self.center + scale * rng.standard_normal((n_rows, self.n_features)) * 3
+        probe[rng.random(probe.shape) < missing_rate] = np.nan
+        probe = pd.DataFrame(probe, columns=self.feature_names) if self.feature_names is not None else probe
+
+        expected = pipeline.transform(probe)
+        actual = self.transform(probe).astype(np.float64)
+        max_error = float(np.max(np.abs(actual - expected))) if actual.size else 0.0
+        if not np.allclose(actual, expected, rtol=FUSED_TRANSFORM_RTOL, atol=FUSED_TRANSFORM_ATOL):
+            raise ValueError(f"Fused preprocessor differs from the pipeline by up to {max_error}")
+        return max_error
@@ -0,0 +1,186 @@
+from concurrent.futures import ProcessPoolExecutor
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.imbalance.strategy import ImbalanceStrategy
+from sensor.ml.metric.classification_metric import get_classification_score
+from sensor.ml.model.xgb_training import ArrayBatchIter
+from sklearn.model_selection import train_test_split
+from typing import List, Optional
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+import sys
+import time
+import xgboost as xgb
+
+# (low, high, scale) of each sampled XGBoost parameter; "int" draws integers, "log" log-uniform
+SEARCH_SPACE = {
+    "max_depth": (3, 10, "int"),
+    "learning_rate": (0.02, 0.3, "log"),
+    "subsample": (0.6, 1.0, "linear"),
+    "colsample_bytree": (0.5, 1.0, "linear"),
+    "min_child_weight": (1.0, 10.0, "log"),
+    "reg_lambda": (0.1, 10.0, "log"),
+}
+
+# per process training state: quantized train / validation matrices built once from the memory map
+_STATE = {}
+
+
+def sample_configurations(n_configurations: int, seed: int) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    configurations = []
+    for _ in range(n_configurations):
+        params = {}
+        for name, (low, high, scale) in SEARCH_SPACE.items():
+            if scale == "int":
+                params[name] = int(rng.integers(low, high + 1))
+            elif scale == "log":
+                params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        configurations.append(params)
+    return configurations
+
+
+def _init_state(features_file_path: str, target_file_path: str, train_index: np.ndarray, validation_index: np.ndarray,
+                base_params: dict, max_bin: int, batch_rows: int, imbalance_strategy: ImbalanceStrategy) -> None:
+    """
+    Worker initializer: maps the transformed arrays read-only (shared page cache, nothing pickled),
+    rebalances the train rows as DataTransformation does and quantizes them and the validation
+    rows once for every task of this process. The validation rows keep the real class distribution.
+    """
+    x = np.load(features_file_path, mmap_mode="r")
+    y = np.load(target_file_path, mmap_mode="r")
+    nthread = base_params.get("nthread", -1)
+    x_fold = x[train_index]
+    x_train, y_train = imbalance_strategy.fit_resample(x_fold, np.asarray(y[train_index]))
+    scale_pos_weight = imbalance_strategy.scale_pos_weight(y_train)
+    if scale_pos_weight is not None:
+        base_params = {"scale_pos_weight": scale_pos_weight, **base_params}
+    dtrain = xgb.QuantileDMatrix(ArrayBatchIter(x_train, y_train, np.arange(len(y_train)), batch_rows), max_bin=max_bin, nthread=nthread)
+    # the train F1 of the overfitting check is scored on the train rows before resampling
+    dtrain_unbalanced = dtrain
+    if x_train is not x_fold:
+        dtrain_unbalanced = xgb.QuantileDMatrix(ArrayBatchIter(x, y, train_index, batch_rows), ref=dtrain, nthread=nthread)
+    dvalidation = xgb.QuantileDMatrix(ArrayBatchIter(x, y, validation_index, batch_rows), ref=dtrain, nthread=nthread)
+    _STATE.update(dtrain=dtrain, dtrain_unbalanced=dtrain_unbalanced, dvalidation=dvalidation, y_train=np.asarray(y[train_index]),
+                  y_validation=np.asarray(y[validation_index]), base_params=base_params, max_bin=max_bin)
+
+
+def _train_rung(config_id: int, params: dict, rounds: int, previous_rounds: int, model: Optional[bytearray]) -> dict:
+    """
+    Boosts configuration `config_id` from `previous_rounds` (continuing `model`) up to `rounds`
+    and scores it on the training and validation rows.
+    """
+    start = time.perf_counter()
+    booster = xgb.train({**_STATE["base_params"], **params, "max_bin": _STATE["max_bin"]}, _STATE["dtrain"],
+                        num_boost_round=rounds - previous_rounds, xgb_model=None if model is None else xgb.Booster(model_file=model))
+    train_metric = get_classification_score(_STATE["y_train"], (booster.predict(_STATE["dtrain_unbalanced"]) > 0.5).astype(int))
+    validation_metric = get_classification_score(_STATE["y_validation"], (booster.predict(_STATE["dvalidation"]) > 0.5).astype(int))
+    return {
+        "config_id": config_id,
+        "rounds": rounds,
+        "train_f1": train_metric.f1_score,
+        "validation_f1": validation_metric.f1_score,
+        "validation_precision": validation_metric.precision_score,
+        "validation_recall": validation_metric.recall_score,
+        "seconds": time.perf_counter() - start,
+        "model": booster.save_raw(raw_format="ubj"),
+    }
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving over random XGBoost configurations: `n_configurations` are boosted for
+    `min_rounds`, the best 1 / `eta` (by validation F1, configurations whose train / validation
+    F1 gap exceeds `overfitting_threshold` ranked last) go on with `eta` times more rounds, and
+    so on until one configuration is left or `max_rounds` is reached. Survivors continue their
+    booster from the previous rung instead of starting over.
+
+    `fit` takes the transformed training rows before resampling: the validation rows are split
+    out of them first, so they hold no synthetic rows and keep the real class distribution, and
+    each worker rebalances only its train rows with `imbalance_strategy`. Workers of the process
+    pool memory-map the arrays themselves, so they are held once in the page cache and never
+    pickled; each worker quantizes them once.
+    """
+
+    def __init__(self, n_configurations: int, min_rounds: int, max_rounds: int, eta: int, n_jobs: int,
+                 validation_split: float, overfitting_threshold: float, max_bin: int, batch_rows: int,
+                 imbalance_strategy: Optional[ImbalanceStrategy] = None, base_params: Optional[dict] = None, seed: int = 42):
+        self.n_configurations = n_configurations
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.n_jobs = n_jobs
+        self.validation_split = validation_split
+        self.overfitting_threshold = overfitting_threshold
+        self.max_bin = max_bin
+        self.batch_rows = batch_rows
+        self.imbalance_strategy = imbalance_strategy or ImbalanceStrategy()
+        self.base_params = dict(base_params or {})
+        self.seed = seed
+        self.results: Optional[pd.DataFrame] = None
+        self.best_params: Optional[dict] = None
+        self.best_rounds: Optional[int] = None
+        self.best_validation_f1: Optional[float] = None
+
+    def _rank(self, rung_results: List[dict]) -> List[dict]:
+        return sorted(rung_results, key=lambda result: (abs(result["train_f1"] - result["validation_f1"]) > self.overfitting_threshold,
+                                                        -result["validation_f1"], result["config_id"]))
+
+    def fit(self, features_file_path: str, target_file_path: str) -> "SuccessiveHalvingSearch":
+        try:
+            y = np.load(target_file_path, mmap_mode="r")
+            train_index, validation_index = train_test_split(np.arange(len(y)), test_size=self.validation_split,
+                                                             stratify=np.asarray(y), random_state=self.seed)
+            train_index, validation_index = np.sort(train_index), np.sort(validation_index)
+            base_params = {"objective": "binary:logistic", "tree_method": "hist", "seed": self.seed,
+                           # leave one XGBoost thread per worker unless set explicitly
+                           "nthread": 1 if self.n_jobs > 1 else -1, **self.base_params}
+            initargs = (features_file_path, target_file_path, train_index, validation_index, base_params, self.max_bin, self.batch_rows,
+                        self.imbalance_strategy)
+
+            executor = None
+            if self.n_jobs > 1:
+                executor = ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=mp.get_context("fork"),
+                                               initializer=_init_state, initargs=initargs)
+            else:
+                _init_state(*initargs)
+            try:
+                configurations = sample_configurations(self.n_configurations, self.seed)
+                survivors = [(config_id, None, 0) for config_id in range(len(configurations))]
+                rounds, rung, rows = self.min_rounds, 0, []
+                while True:
+                    tasks = [(config_id, configurations[config_id], rounds, previous_rounds, model)
+                             for config_id, model, previous_rounds in survivors]
+                    if executor is not None:
+                        rung_results = list(executor.map(_train_rung, *zip(*tasks)))
+                    else:
+                        rung_results = [_train_rung(*task) for task in tasks]
+                    ranked = self._rank(rung_results)
+                    for result in rung_results:
+                        row = {key: value for key, value in result.items() if key != "model"}
+                        row["overfit"] = abs(result["train_f1"] - result["validation_f1"]) > self.overfitting_threshold
+                        rows.append({"rung": rung, **row, **configurations[result["config_id"]]})
+                    logging.info(f"Successive halving: {len(tasks)} configurations at {rounds} rounds, "
+                                 f"best validation F1 {ranked[0]['validation_f1']:.4f}")
+                    next_rounds = rounds * self.eta
+                    n_survivors = len(ranked) // self.eta
+                    if n_survivors < 1 or next_rounds > self.max_rounds:
+                        break
+                    survivors = [(result["config_id"], result["model"], rounds) for result in ranked[:n_survivors]]
+                    rounds, rung = next_rounds, rung + 1
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+                _STATE.clear()
+
+            best = ranked[0]
+            self.best_params = configurations[best["config_id"]]
+            self.best_rounds = best["rounds"]
+            self.best_validation_f1 = best["validation_f1"]
+            self.results = pd.DataFrame(rows).sort_values(["rung", "validation_f1"], ascending=[True, False]).reset_index(drop=True)
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
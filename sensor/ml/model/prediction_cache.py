@@ -0,0 +1,95 @@
+from sensor.constant.training_pipeline import MODEL_EVALUATION_PREDICTION_CACHE_DIR, MODEL_EVALUATION_PREDICTION_CACHE_MAX_MODELS
+from sensor.exception import CustomException
+from sensor.logger import logging
+from typing import Tuple
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import sys
+
+
+def hash_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    sha256 of the content of a file, e.g. a pickled model.
+    """
+    try:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def hash_rows(dataframe: pd.DataFrame) -> np.ndarray:
+    """
+    64 bit content hash of every row (columns in name order, index ignored).
+    """
+    try:
+        return pd.util.hash_pandas_object(dataframe[sorted(dataframe.columns)], index=False).to_numpy()
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class PredictionCache:
+    """
+    Predictions of saved models, one file per model content hash holding the sorted row
+    hashes it scored and their predictions. Rows are looked up by content, so a model is
+    only scored on the rows it has not seen, whatever the split or order of the data.
+    The files of the least recently used models beyond `max_models` are removed.
+    """
+
+    def __init__(self, cache_dir: str = MODEL_EVALUATION_PREDICTION_CACHE_DIR,
+                 max_models: int = MODEL_EVALUATION_PREDICTION_CACHE_MAX_MODELS):
+        self.cache_dir = cache_dir
+        self.max_models = max_models
+
+    def _path(self, model_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{model_hash}.npz")
+
+    def _load(self, model_hash: str) -> Tuple[np.ndarray, np.ndarray]:
+        path = self._path(model_hash)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int8)
+        with np.load(path) as content:
+            return content["row_hash"], content["prediction"]
+
+    def lookup(self, model_hash: str, row_hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (predictions, hit): cached predictions of the rows where `hit` is True.
+        """
+        try:
+            cached_hashes, cached_predictions = self._load(model_hash)
+            predictions = np.zeros(len(row_hashes), dtype=np.int8)
+            if not len(cached_hashes):
+                return predictions, np.zeros(len(row_hashes), dtype=bool)
+            position = np.minimum(np.searchsorted(cached_hashes, row_hashes), len(cached_hashes) - 1)
+            hit = cached_hashes[position] == row_hashes
+            predictions[hit] = cached_predictions[position[hit]]
+            os.utime(self._path(model_hash))
+            return predictions, hit
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def update(self, model_hash: str, row_hashes: np.ndarray, predictions: np.ndarray) -> None:
+        try:
+            if not len(row_hashes):
+                return
+            cached_hashes, cached_predictions = self._load(model_hash)
+            row_hash, index = np.unique(np.concatenate([cached_hashes, row_hashes]), return_index=True)
+            prediction = np.concatenate([cached_predictions, np.asarray(predictions, dtype=np.int8)])[index]
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file_path = os.path.join(self.cache_dir, f"{model_hash}.tmp.npz")
+            np.savez(tmp_file_path, row_hash=row_hash, prediction=prediction)
+            os.replace(tmp_file_path, self._path(model_hash))
+
+            cache_files = sorted((os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                                  if name.endswith(".npz") and ".tmp" not in name), key=os.path.getmtime, reverse=True)
+            for file_path in cache_files[self.max_models:]:
+                os.remove(file_path)
+            logging.info(f"Prediction cache of model {model_hash[:12]}: {len(row_hash)} rows")
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,116 @@
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.imbalance.strategy import ImbalanceStrategy
+from sklearn.model_selection import train_test_split
+from typing import Optional
+from xgboost import XGBClassifier
+import numpy as np
+import sys
+import xgboost as xgb
+
+
+class ArrayBatchIter(xgb.DataIter):
+    """
+    Feeds the rows `index` of (x, y) to XGBoost `batch_rows` at a time, so a QuantileDMatrix
+    is built from a memory-mapped array without materializing the selected rows at once.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, index: np.ndarray, batch_rows: int):
+        self.x = x
+        self.y = y
+        self.index = index
+        self.batch_rows = batch_rows
+        self._position = 0
+        super().__init__()
+
+    def next(self, input_data) -> int:
+        if self._position >= len(self.index):
+            return 0
+        batch = self.index[self._position:self._position + self.batch_rows]
+        input_data(data=np.ascontiguousarray(self.x[batch]), label=np.asarray(self.y[batch]))
+        self._position += self.batch_rows
+        return 1
+
+    def reset(self) -> None:
+        self._position = 0
+
+
+def train_quantile_dmatrix(x_train: np.ndarray, y_train: np.ndarray, imbalance_strategy: ImbalanceStrategy, nthread: int,
+                           max_bin: int, max_rounds: int, early_stopping_rounds: int, validation_split: float,
+                           batch_rows: int, random_state: int = 42, params: Optional[dict] = None) -> XGBClassifier:
+    """
+    Trains a binary `hist` booster on QuantileDMatrix built batch by batch from (x_train, y_train),
+    typically memory-mapped: XGBoost only keeps the quantized matrix (one byte per value for
+    max_bin <= 256) instead of a float copy of the features.
+
+    (x_train, y_train) are the training rows before resampling. A stratified `validation_split`
+    of them is held out first, then only the remaining rows are rebalanced with
+    `imbalance_strategy` (materialized when it resamples), so early stopping watches real rows.
+    Boosting stops once the validation log loss has not improved for `early_stopping_rounds`
+    rounds (at most `max_rounds`). The booster, cut after its best iteration, is returned as an
+    XGBClassifier. `params` (e.g. tuned hyperparameters) are added to the booster parameters.
+    """
+    try:
+        index = np.arange(len(y_train))
+        if validation_split > 0:
+            train_index, validation_index = train_test_split(index, test_size=validation_split, stratify=np.asarray(y_train),
+                                                             random_state=random_state)
+            # ascending rows read the memory map sequentially
+            train_index, validation_index = np.sort(train_index), np.sort(validation_index)
+        else:
+            train_index, validation_index = index, None
+
+        x_fit, y_fit, fit_index = x_train, y_train, train_index
+        if imbalance_strategy.resamples:
+            x_fit, y_fit = imbalance_strategy.fit_resample(np.asarray(x_train[train_index]), np.asarray(y_train[train_index]))
+            fit_index = np.arange(len(y_fit))
+        scale_pos_weight = imbalance_strategy.scale_pos_weight(np.asarray(y_fit[fit_index]))
+
+        dtrain = xgb.QuantileDMatrix(ArrayBatchIter(x_fit, y_fit, fit_index, batch_rows), max_bin=max_bin, nthread=nthread)
+        evals = []
+        if validation_index is not None:
+            dvalidation = xgb.QuantileDMatrix(ArrayBatchIter(x_train, y_train, validation_index, batch_rows), ref=dtrain,
+                                              nthread=nthread)
+            evals = [(dvalidation, "validation")]
+
+        params = {**(params or {}), "objective": "binary:logistic", "tree_method": "hist", "max_bin": max_bin,
+                  "nthread": nthread, "eval_metric": "logloss", "seed": random_state}
+        if scale_pos_weight is not None:
+            params["scale_pos_weight"] = scale_pos_weight
+        booster = xgb.train(params, dtrain, num_boost_round=max_rounds, evals=evals,
+                            early_stopping_rounds=early_stopping_rounds if evals else None, verbose_eval=False)
+        logging.info(f"QuantileDMatrix training: {booster.num_boosted_rounds()} rounds, "
+                     f"best iteration {getattr(booster, 'best_iteration', None)}")
+        if evals:
+            # drop the early stopping patience trees, the saved model only holds the trees it predicts with
+            booster = booster[: booster.best_iteration + 1]
+
+        # XGBClassifier keeps the model usable wherever the default estimator is (predict, pickling)
+        model = XGBClassifier(**{key: value for key, value in params.items() if key not in ("nthread", "seed")},
+                              n_jobs=nthread, random_state=random_state)
+        model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+        return model
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def continue_training(model: XGBClassifier, x: np.ndarray, y: np.ndarray, rounds: int) -> XGBClassifier:
+    """
+    Warm start: boosts `rounds` more trees on (x, y) on top of the booster of `model`, with
+    the same parameters, and returns them as a new XGBClassifier. An early stopped `model`
+    is continued from its best iteration, the trees after it are dropped.
+    """
+    try:
+        params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+        champion = model.get_booster()
+        best_iteration = champion.attr("best_iteration")
+        champion = champion[: int(best_iteration) + 1] if best_iteration is not None else champion.copy()
+        booster = xgb.train(params, xgb.DMatrix(x, label=y, nthread=params.get("n_jobs")), num_boost_round=rounds,
+                            xgb_model=champion)
+        # a best iteration from early stopping would hide the new trees at prediction time
+        booster.set_attr(best_iteration=None, best_score=None)
+        warm_model = XGBClassifier(**model.get_params())
+        warm_model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+        return warm_model
+    except Exception as e:
+        raise CustomException(e, sys)
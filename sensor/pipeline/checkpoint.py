@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Optional
+import os
+import sys
+import threading
+import yaml
+from sensor.constant.training_pipeline import CHECKPOINT_FILE_NAME, CHECKPOINT_STATUS_COMPLETED, CHECKPOINT_STATUS_FAILED
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.utils.main_utils import read_yaml_file, artifact_to_dict, artifact_from_dict
+
+
+class PipelineCheckpoint:
+    """
+    Durable manifest of the stages of one artifact dir: for every stage its status
+    (completed / failed), its serialized artifact and the time of the update.
+    The manifest is rewritten atomically on every update, so a crash never leaves
+    a half written checkpoint behind.
+    """
+
+    def __init__(self, artifact_dir: str):
+        try:
+            self.manifest_file_path = os.path.join(artifact_dir, CHECKPOINT_FILE_NAME)
+            self._lock = threading.Lock()
+            if os.path.exists(self.manifest_file_path):
+                self.manifest = read_yaml_file(self.manifest_file_path)
+            else:
+                self.manifest = {"stages": {}}
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def is_completed(self, stage_name: str) -> bool:
+        stage = self.manifest["stages"].get(stage_name)
+        return stage is not None and stage["status"] == CHECKPOINT_STATUS_COMPLETED
+
+    def get_artifact(self, stage_name: str, artifact_cls):
+        """
+        Returns the artifact of a completed stage (None for stages without artifact or not completed).
+        """
+        try:
+            if not self.is_completed(stage_name):
+                return None
+            content = self.manifest["stages"][stage_name].get("artifact")
+            return None if content is None else artifact_from_dict(artifact_cls, content)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def mark(self, stage_name: str, status: str, artifact=None, error: Optional[str] = None) -> None:
+        try:
+            with self._lock:
+                self.manifest["stages"][stage_name] = {
+                    "status": status,
+                    "artifact": None if artifact is None else artifact_to_dict(artifact),
+                    "error": error,
+                    "updated_at": datetime.now().isoformat(),
+                }
+                os.makedirs(os.path.dirname(self.manifest_file_path), exist_ok=True)
+                tmp_file_path = f"{self.manifest_file_path}.tmp"
+                with open(tmp_file_path, "w") as file:
+                    yaml.safe_dump(self.manifest, file)
+                os.replace(tmp_file_path, self.manifest_file_path)
+            logging.info(f"Checkpoint: stage '{stage_name}' {status}")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def mark_completed(self, stage_name: str, artifact=None) -> None:
+        self.mark(stage_name, CHECKPOINT_STATUS_COMPLETED, artifact=artifact)
+
+    def mark_failed(self, stage_name: str, error: Exception) -> None:
+        self.mark(stage_name, CHECKPOINT_STATUS_FAILED, error=str(error))
@@ -0,0 +1,125 @@
+from typing import Callable, List
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import sys
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, STAGE_CACHE_ENABLED, STAGE_CACHE_DIR_NAME
+from sensor.entity.config_entity import TrainingPipelineConfig
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.utils.main_utils import read_yaml_file, write_yaml_file, artifact_to_dict, artifact_from_dict
+from sensor.utils.artifact_store import artifact_store
+
+
+def _hash_files(file_paths: List[str], root_dir: str) -> str:
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        digest.update(os.path.relpath(file_path, root_dir).encode())
+        with open(file_path, "rb") as file_obj:
+            digest.update(file_obj.read())
+    return digest.hexdigest()
+
+
+def get_code_version() -> str:
+    """
+    Hash of every module of the `sensor` package, so any code change invalidates the cache.
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return _hash_files(sorted(glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)), package_dir)
+
+
+class StageCache:
+    """
+    Content-hashed cache of the pipeline stages.
+    A stage fingerprint hashes the stage name, its config (without the paths inside the
+    current artifact dir), the schema, the code version and the stage inputs. Inputs are
+    the upstream artifacts, whose paths point at immutable outputs of an earlier run, so a
+    reused upstream stage leads to the same downstream fingerprint.
+    Completed stages are recorded as `<stage>-<fingerprint>.yaml` under
+    `<artifact_dir>/stage_cache`; a later run with the same fingerprint reuses the recorded
+    artifact as long as every file it points to still exists.
+    """
+
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig, enabled: bool = STAGE_CACHE_ENABLED):
+        try:
+            self.enabled = enabled
+            self.artifact_dir = training_pipeline_config.artifact_dir
+            self.artifact_root = os.path.dirname(self.artifact_dir)
+            self.cache_dir = os.path.join(self.artifact_dir, STAGE_CACHE_DIR_NAME)
+            self.code_version = get_code_version()
+            self.schema_version = _hash_files([SCHEMA_FILE_PATH], os.path.dirname(SCHEMA_FILE_PATH))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def fingerprint(self, stage_name: str, config: object, *inputs) -> str:
+        try:
+            config_state = {
+                key: value for key, value in sorted(vars(config).items())
+                if not (isinstance(value, str) and value.startswith(self.artifact_dir))
+            }
+            payload = {
+                "stage": stage_name,
+                "config": config_state,
+                "inputs": [artifact_to_dict(item) if dataclasses.is_dataclass(item) else item for item in inputs],
+                "schema": self.schema_version,
+                "code": self.code_version,
+            }
+            return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _outputs_exist(artifact) -> bool:
+        for key, value in artifact_to_dict(artifact).items():
+            if key.endswith("_path") and isinstance(value, str) and not os.path.exists(value):
+                return False
+        return True
+
+    def lookup(self, stage_name: str, fingerprint: str, artifact_cls):
+        try:
+            if not self.enabled:
+                return None
+            pattern = os.path.join(self.artifact_root, "*", STAGE_CACHE_DIR_NAME, f"{stage_name}-{fingerprint}.yaml")
+            for record_path in sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True):
+                artifact = artifact_from_dict(artifact_cls, read_yaml_file(record_path)["artifact"])
+                if self._outputs_exist(artifact):
+                    logging.info(f"Stage '{stage_name}' unchanged, reusing artifact recorded in {record_path}")
+                    return artifact
+            return None
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def record(self, stage_name: str, fingerprint: str, artifact) -> None:
+        """
+        Records a completed stage once the artifact store has its outputs on disk.
+        """
+        try:
+            if not self.enabled:
+                return
+            record = {
+                "stage": stage_name,
+                "fingerprint": fingerprint,
+                "code_version": self.code_version,
+                "artifact": artifact_to_dict(artifact),
+            }
+            record_path = os.path.join(self.cache_dir, f"{stage_name}-{fingerprint}.yaml")
+            artifact_store.on_flushed(lambda: write_yaml_file(record_path, record))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run(self, stage_name: str, config: object, inputs: list, artifact_cls, run_stage: Callable[[], object]):
+        """
+        Returns the cached artifact of the stage when its fingerprint matches an earlier
+        run, otherwise runs the stage and records it.
+        """
+        try:
+            fingerprint = self.fingerprint(stage_name, config, *inputs)
+            artifact = self.lookup(stage_name, fingerprint, artifact_cls)
+            if artifact is None:
+                artifact = run_stage()
+                self.record(stage_name, fingerprint, artifact)
+            return artifact
+        except Exception as e:
+            raise CustomException(e, sys)
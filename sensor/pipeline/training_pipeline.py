@@ -1,5 +1,5 @@
-from sensor.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig, ModelTrainerConfig, TrainingPipelineConfig, ModelEvaluationConfig, ModelPusherConfig
-from sensor.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, ModelTrainerArtifact, DataTransformationArtifact, ModelEvaluationArtifact, ModelPusherArtifact
+from sensor.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig, ModelTrainerConfig, TrainingPipelineConfig, ModelEvaluationConfig, ModelPusherConfig, ModelTuningConfig, ModelCrossValidationConfig
+from sensor.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, ModelTrainerArtifact, DataTransformationArtifact, ModelEvaluationArtifact, ModelPusherArtifact, ModelTuningArtifact, ModelCrossValidationArtifact
 
 from sensor.exception import CustomException
 import sys, os
@@ -7,27 +7,52 @@ from sensor.logger import logging
 from sensor.components.data_ingestion import DataIngestion
 from sensor.components.data_validation import DataValidation
 from sensor.components.data_transformation import DataTransformation
+from sensor.components.model_tuning import ModelTuning
+from sensor.components.model_cross_validation import ModelCrossValidation
 from sensor.components.model_trainer import ModelTrainer
 from sensor.components.model_evaluation import ModelEvaluation
 from sensor.components.model_pusher import ModelPusher
 from sensor.cloud_storage.s3_syncer import S3Sync
-from sensor.constant.training_pipeline import SAVED_MODEL_DIR
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR, MODEL_TUNING_ENABLED, MODEL_CROSS_VALIDATION_ENABLED
 from sensor.constant.s3_bucket import TRAINING_BUCKET_NAME
+from sensor.utils.artifact_store import artifact_store
+from sensor.pipeline.stage_cache import StageCache
+from sensor.pipeline.checkpoint import PipelineCheckpoint
+from sensor.data_access.sensor_data import SensorData
+from sensor.ml.model.estimator import ModelResolver
 from datetime import datetime
+from typing import Optional
 
 class TrainPipeline:
     is_pipeline_running = False
     
-    def __init__(self):
+    def __init__(self, resume_timestamp: Optional[str] = None):
+        """
+        :param resume_timestamp: timestamp (artifact dir name) of an earlier run to resume from its first incomplete stage.
+        """
         self.s3_sync = S3Sync()
-        self.training_pipeline_config = TrainingPipelineConfig(timestamp=datetime.now())
+        self.training_pipeline_config = TrainingPipelineConfig(timestamp=datetime.now(), resume_timestamp=resume_timestamp)
+        self.stage_cache = StageCache(self.training_pipeline_config)
+        self.checkpoint = PipelineCheckpoint(self.training_pipeline_config.artifact_dir)
+        self._resuming = resume_timestamp is not None
         
     def start_data_ingestion(self)-> DataIngestionArtifact:
         try:
             self.data_ingestion_config = DataIngestionConfig(training_pipeline_config=self.training_pipeline_config)
             logging.info("Starting Data Ingestion")
-            data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            if not self.data_ingestion_config.stage_cache:
+                data_ingestion_artifact = DataIngestion(data_ingestion_config=self.data_ingestion_config).initiate_data_ingestion()
+            else:
+                collection_state = SensorData().get_collection_state(collection_name=self.data_ingestion_config.collection_name)
+                fingerprint = self.stage_cache.fingerprint("data_ingestion", self.data_ingestion_config, collection_state)
+                data_ingestion_artifact = self.stage_cache.lookup("data_ingestion", fingerprint, DataIngestionArtifact)
+                if data_ingestion_artifact is not None:
+                    logging.warning(f"Reusing the cached ingestion {data_ingestion_artifact.train_file_path} for collection "
+                                    f"state {collection_state}: documents updated in place since then are not in it, "
+                                    f"disable DATA_INGESTION_STAGE_CACHE to export the collection again")
+                else:
+                    data_ingestion_artifact = DataIngestion(data_ingestion_config=self.data_ingestion_config).initiate_data_ingestion()
+                    self.stage_cache.record("data_ingestion", fingerprint, data_ingestion_artifact)
             logging.info(f"Data ingestion completed and artifact: {data_ingestion_artifact}")
             return data_ingestion_artifact
         
@@ -38,9 +63,10 @@ class TrainPipeline:
         try:
             data_validation_config = DataValidationConfig(training_pipeline_config=self.training_pipeline_config)
             
-            data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact, data_validation_config=data_validation_config)
-            
-            data_vaidation_artifact = data_validation.initiate_data_validation()
+            data_vaidation_artifact = self.stage_cache.run(
+                "data_validation", data_validation_config, [data_ingestion_artifact], DataValidationArtifact,
+                lambda: DataValidation(data_ingestion_artifact=data_ingestion_artifact, data_validation_config=data_validation_config).initiate_data_validation()
+            )
             
             return data_vaidation_artifact
         
@@ -50,18 +76,57 @@ class TrainPipeline:
     def start_data_transformation(self, data_validation_artifact: DataValidationArtifact):
         try:
             data_transformation_config = DataTransformationConfig(training_pipeline_config=self.training_pipeline_config)
-            data_transformation = DataTransformation(data_validation_artifact=data_validation_artifact, data_transformation_config=data_transformation_config)
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            data_transformation_artifact = self.stage_cache.run(
+                "data_transformation", data_transformation_config, [data_validation_artifact], DataTransformationArtifact,
+                lambda: DataTransformation(data_validation_artifact=data_validation_artifact, data_transformation_config=data_transformation_config).initiate_data_transformation()
+            )
             return data_transformation_artifact
         except Exception as e:
             raise CustomException(e, sys)
         
         
-    def start_model_trainer(self, data_transformation_artifact:DataTransformationArtifact):
+    def start_model_tuning(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTuningArtifact:
+        try:
+            model_tuning_config = ModelTuningConfig(training_pipeline_config=self.training_pipeline_config)
+            model_tuning_artifact = self.stage_cache.run(
+                "model_tuning", model_tuning_config, [data_transformation_artifact], ModelTuningArtifact,
+                lambda: ModelTuning(model_tuning_config, data_transformation_artifact).initiate_model_tuning()
+            )
+            return model_tuning_artifact
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def start_model_cross_validation(self, data_validation_artifact: DataValidationArtifact, data_transformation_artifact: DataTransformationArtifact,
+                                     model_tuning_artifact: Optional[ModelTuningArtifact] = None) -> ModelCrossValidationArtifact:
+        try:
+            model_cross_validation_config = ModelCrossValidationConfig(training_pipeline_config=self.training_pipeline_config)
+            model_cross_validation_artifact = self.stage_cache.run(
+                "model_cross_validation", model_cross_validation_config, [data_validation_artifact, data_transformation_artifact, model_tuning_artifact],
+                ModelCrossValidationArtifact,
+                lambda: ModelCrossValidation(model_cross_validation_config, data_validation_artifact, data_transformation_artifact,
+                                             model_tuning_artifact).initiate_model_cross_validation()
+            )
+            return model_cross_validation_artifact
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def start_model_trainer(self, data_transformation_artifact:DataTransformationArtifact, model_tuning_artifact: Optional[ModelTuningArtifact] = None,
+                            data_validation_artifact: Optional[DataValidationArtifact] = None,
+                            model_cross_validation_artifact: Optional[ModelCrossValidationArtifact] = None):
         try:
             model_trainer_config = ModelTrainerConfig(training_pipeline_config=self.training_pipeline_config)
-            model_trainer = ModelTrainer(model_trainer_config,data_transformation_artifact)
-            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            inputs = [data_transformation_artifact, model_tuning_artifact]
+            if model_cross_validation_artifact is not None:
+                inputs.append(model_cross_validation_artifact)
+            if model_trainer_config.warm_start:
+                # a warm start builds on the best model
+                model_resolver = ModelResolver()
+                inputs += [data_validation_artifact, model_resolver.get_best_model_path() if model_resolver.is_model_exists() else None]
+            model_trainer_artifact = self.stage_cache.run(
+                "model_trainer", model_trainer_config, inputs, ModelTrainerArtifact,
+                lambda: ModelTrainer(model_trainer_config,data_transformation_artifact, model_tuning_artifact, data_validation_artifact,
+                                     model_cross_validation_artifact).initiate_model_trainer()
+            )
             return model_trainer_artifact
         except Exception as e:
             raise CustomException(e, sys)
@@ -71,18 +136,21 @@ class TrainPipeline:
         try:
             model_eval_config = ModelEvaluationConfig(self.training_pipeline_config)
 
-            model_eval = ModelEvaluation(model_eval_config, data_validation_artifact, model_trainer_artifact)
-
-            model_eval_artifact = model_eval.initiate_model_evaluation()
+            model_resolver = ModelResolver()
+            best_model_path = model_resolver.get_best_model_path() if model_resolver.is_model_exists() else None
+            model_eval_artifact = self.stage_cache.run(
+                "model_evaluation", model_eval_config, [data_validation_artifact, model_trainer_artifact, best_model_path], ModelEvaluationArtifact,
+                lambda: ModelEvaluation(model_eval_config, data_validation_artifact, model_trainer_artifact).initiate_model_evaluation()
+            )
             return model_eval_artifact
         
         except  Exception as e:
             raise CustomException(e,sys)
         
-    def start_model_pusher(self, model_eval_artidfact: ModelEvaluationArtifact):
+    def start_model_pusher(self, model_eval_artidfact: ModelEvaluationArtifact, data_validation_artifact: DataValidationArtifact = None):
         try:
             model_pusher_config = ModelPusherConfig(training_pipleine_config=self.training_pipeline_config)
-            model_pusher = ModelPusher(model_pusher_config, model_eval_artidfact)
+            model_pusher = ModelPusher(model_pusher_config, model_eval_artidfact, data_validation_artifact)
             model_pusher_artifact = model_pusher.initiate_model_pusher()
             return model_pusher_artifact
         except Exception as e:
@@ -91,34 +159,75 @@ class TrainPipeline:
     def sync_artifact_dir_to_s3(self):
         try:
             aws_buket_url = f"s3://{TRAINING_BUCKET_NAME}/artifact/{self.training_pipeline_config.timestamp}"
-            self.s3_sync.sync_folder_to_s3(folder = self.training_pipeline_config.artifact_dir,aws_buket_url=aws_buket_url)
+            self.s3_sync.sync_folder_to_s3(folder = self.training_pipeline_config.artifact_dir,aws_bucket_url=aws_buket_url)
         except Exception as e:
             raise CustomException(e,sys)
             
     def sync_saved_model_dir_to_s3(self):
         try:
             aws_buket_url = f"s3://{TRAINING_BUCKET_NAME}/{SAVED_MODEL_DIR}"
-            self.s3_sync.sync_folder_to_s3(folder = SAVED_MODEL_DIR,aws_buket_url=aws_buket_url)
+            self.s3_sync.sync_folder_to_s3(folder = SAVED_MODEL_DIR,aws_bucket_url=aws_buket_url)
         except Exception as e:
             raise CustomException(e,sys)
         
        
+    def run_stage(self, stage_name: str, artifact_cls, start_stage):
+        """
+        Runs one stage under the checkpoint manifest. While resuming, stages completed by
+        the earlier run return their recorded artifact; from the first incomplete stage on
+        everything runs again. A stage is marked completed once its outputs are on disk.
+        """
+        if self._resuming and self.checkpoint.is_completed(stage_name):
+            logging.info(f"Resuming: stage '{stage_name}' already completed")
+            return self.checkpoint.get_artifact(stage_name, artifact_cls)
+        self._resuming = False
+        try:
+            artifact = start_stage()
+        except Exception as e:
+            self.checkpoint.mark_failed(stage_name, e)
+            raise
+        artifact_store.on_flushed(lambda: self.checkpoint.mark_completed(stage_name, artifact))
+        return artifact
+
+    def sync_to_s3(self):
+        artifact_store.clear()
+        self.sync_artifact_dir_to_s3()
+        self.sync_saved_model_dir_to_s3()
+
     def run_pipeline(self):
         try:
             TrainPipeline.is_pipeline_running = True
-            data_ingestion_artifact:DataIngestionArtifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact= data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_validation_artifact=data_validation_artifact)
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact)
-            model_eval_artifact = self.start_model_evaluation(data_validation_artifact, model_trainer_artifact)
+            data_ingestion_artifact:DataIngestionArtifact = self.run_stage("data_ingestion", DataIngestionArtifact, self.start_data_ingestion)
+            data_validation_artifact = self.run_stage("data_validation", DataValidationArtifact,
+                                                      lambda: self.start_data_validation(data_ingestion_artifact= data_ingestion_artifact))
+            data_transformation_artifact = self.run_stage("data_transformation", DataTransformationArtifact,
+                                                          lambda: self.start_data_transformation(data_validation_artifact=data_validation_artifact))
+            model_tuning_artifact = None
+            if MODEL_TUNING_ENABLED:
+                model_tuning_artifact = self.run_stage("model_tuning", ModelTuningArtifact,
+                                                       lambda: self.start_model_tuning(data_transformation_artifact))
+            model_cross_validation_artifact = None
+            if MODEL_CROSS_VALIDATION_ENABLED:
+                model_cross_validation_artifact = self.run_stage("model_cross_validation", ModelCrossValidationArtifact,
+                                                                 lambda: self.start_model_cross_validation(data_validation_artifact, data_transformation_artifact,
+                                                                                                           model_tuning_artifact))
+            model_trainer_artifact = self.run_stage("model_trainer", ModelTrainerArtifact,
+                                                    lambda: self.start_model_trainer(data_transformation_artifact, model_tuning_artifact, data_validation_artifact,
+                                                                                     model_cross_validation_artifact))
+            model_eval_artifact = self.run_stage("model_evaluation", ModelEvaluationArtifact,
+                                                 lambda: self.start_model_evaluation(data_validation_artifact, model_trainer_artifact))
             if not model_eval_artifact.is_model_accepted:
                 raise Exception("Trained Model is not Better than the Best Model")
             
-            model_pusher_artifact = self.start_model_pusher(model_eval_artifact)
+            model_pusher_artifact = self.run_stage("model_pusher", ModelPusherArtifact, lambda: self.start_model_pusher(model_eval_artifact, data_validation_artifact))
+            self.run_stage("s3_sync", None, self.sync_to_s3)
+            artifact_store.clear()
             TrainPipeline.is_pipeline_running = False  
-            self.sync_artifact_dir_to_s3()
-            self.sync_saved_model_dir_to_s3()      
         except Exception as e:
+            try:
+                artifact_store.clear()
+            except Exception as store_error:
+                logging.error(f"Error flushing artifacts: {store_error}")
             self.sync_artifact_dir_to_s3()
             TrainPipeline.is_pipeline_running = False
             raise CustomException(e, sys)
\ No newline at end of file
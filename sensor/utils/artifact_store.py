@@ -0,0 +1,111 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+import sys
+import threading
+from sensor.constant.training_pipeline import ARTIFACT_IN_MEMORY_HANDOFF, ARTIFACT_WRITER_THREADS
+from sensor.exception import CustomException
+from sensor.logger import logging
+
+
+class ArtifactStore:
+    """
+    In-process handoff of stage outputs (DataFrames, arrays, fitted objects), keyed by
+    their artifact file path. `put` keeps the object in memory for the next stage and
+    writes it to disk on a background thread; `get` returns the in-memory object or
+    falls back to loading the file, so a stage run on its own still reads from disk.
+    Objects handed over through the store must not be mutated by the reading stage.
+    """
+
+    def __init__(self, enabled: bool = ARTIFACT_IN_MEMORY_HANDOFF, max_workers: int = ARTIFACT_WRITER_THREADS):
+        self.enabled = enabled
+        self._objects: Dict[str, object] = {}
+        self._pending: Dict[str, Future] = {}
+        self._callbacks: List[Future] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact-writer")
+        # callbacks wait on writes, so they get their own thread and never starve the writers
+        self._callback_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-callback")
+
+    def put(self, file_path: str, obj: object, save_fn: Callable[[str, object], None], keep: bool = True) -> None:
+        """
+        Hands `obj` over to later stages (unless `keep` is False) and persists it with
+        `save_fn(file_path, obj)`, in the background when the handoff is enabled.
+        """
+        try:
+            if not self.enabled:
+                save_fn(file_path, obj)
+                return
+            with self._lock:
+                if keep:
+                    self._objects[file_path] = obj
+                self._pending[file_path] = self._executor.submit(save_fn, file_path, obj)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def on_flushed(self, callback: Callable[[], None]) -> None:
+        """
+        Runs `callback` once every write queued so far is on disk, e.g. to record that a
+        stage completed. Callbacks run in order; a failed write skips the callback and the
+        error is raised by `wait`.
+        """
+        try:
+            if not self.enabled:
+                callback()
+                return
+            with self._lock:
+                futures = list(self._pending.values())
+                self._callbacks.append(self._callback_executor.submit(self._run_after, futures, callback))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _run_after(futures: List[Future], callback: Callable[[], None]) -> None:
+        wait(futures)
+        for future in futures:
+            future.result()
+        callback()
+
+    def get(self, file_path: str, load_fn: Callable[[str], object]) -> object:
+        try:
+            with self._lock:
+                obj = self._objects.get(file_path)
+            if obj is not None:
+                logging.info(f"Artifact handed over in memory: {file_path}")
+                return obj
+            self.wait(file_path)
+            return load_fn(file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def wait(self, file_path: Optional[str] = None) -> None:
+        """
+        Blocks until the pending write of `file_path` (or of every artifact) is on disk
+        and re-raises the first write error.
+        """
+        try:
+            with self._lock:
+                if file_path is None:
+                    futures = list(self._pending.values()) + self._callbacks
+                    self._pending.clear()
+                    self._callbacks = []
+                else:
+                    future = self._pending.pop(file_path, None)
+                    futures = [] if future is None else [future]
+            wait(futures)
+            for future in futures:
+                future.result()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def clear(self) -> None:
+        """
+        Flushes every pending write and releases the in-memory objects.
+        """
+        try:
+            self.wait()
+        finally:
+            with self._lock:
+                self._objects.clear()
+
+
+artifact_store = ArtifactStore()
@@ -1,6 +1,12 @@
 import yaml, os, dill, sys
+import dataclasses
+import typing
+from typing import Iterator, List, Optional
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 from sensor.exception import CustomException
 from sensor.logger import logging
 
@@ -26,6 +32,80 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
         raise CustomException(e, sys)
     
 
+def save_dataframe(file_path: str, dataframe: pd.DataFrame, compression: Optional[str] = None) -> None:
+    """
+    Saves a DataFrame in the format given by the file extension:
+    .parquet (columnar, typed), .feather/.arrow (Arrow IPC) or .csv.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        extension = os.path.splitext(file_path)[1]
+        if extension == ".parquet":
+            dataframe.to_parquet(file_path, engine="pyarrow", compression=compression, index=False)
+        elif extension in (".feather", ".arrow"):
+            dataframe.reset_index(drop=True).to_feather(file_path, compression=compression or "uncompressed")
+        else:
+            dataframe.to_csv(file_path, index=False, header=True)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def read_dataframe(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads a DataFrame saved by `save_dataframe`. Parquet and Arrow files are memory
+    mapped and only the requested `columns` are decoded.
+    """
+    try:
+        extension = os.path.splitext(file_path)[1]
+        if extension == ".parquet":
+            return pd.read_parquet(file_path, columns=columns, engine="pyarrow", memory_map=True)
+        if extension in (".feather", ".arrow"):
+            return feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+        return pd.read_csv(file_path, usecols=columns)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def iter_dataframe_chunks(file_path: str, chunk_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yields a saved DataFrame in chunks of at most `chunk_size` rows, so only one chunk is in memory.
+    """
+    try:
+        extension = os.path.splitext(file_path)[1]
+        if extension == ".parquet":
+            for batch in pq.ParquetFile(file_path, memory_map=True).iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+        elif extension in (".feather", ".arrow"):
+            with pa.memory_map(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    batch = reader.get_batch(index)
+                    if columns is not None:
+                        batch = batch.select(columns)
+                    for offset in range(0, batch.num_rows, chunk_size):
+                        yield batch.slice(offset, chunk_size).to_pandas()
+        else:
+            yield from pd.read_csv(file_path, usecols=columns, chunksize=chunk_size)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def read_dataframe_columns(file_path: str) -> List[str]:
+    """
+    Returns the column names of a saved DataFrame from its metadata (or CSV header) only.
+    """
+    try:
+        extension = os.path.splitext(file_path)[1]
+        if extension == ".parquet":
+            return pq.read_schema(file_path).names
+        if extension in (".feather", ".arrow"):
+            with pa.memory_map(file_path) as source:
+                return pa.ipc.open_file(source).schema.names
+        return pd.read_csv(file_path, nrows=0).columns.to_list()
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
 def save_numpy_array_data(file_path: str, array: np.array):
     try:
         dir_path = os.path.dirname(file_path)
@@ -35,8 +115,13 @@ def save_numpy_array_data(file_path: str, array: np.array):
     except Exception as e:
         raise CustomException(e, sys)
 
-def load_numpy_array_data(file_path: str):
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None):
+    """
+    Loads a .npy array; with `mmap_mode` (e.g. "r") the file is memory-mapped instead of read.
+    """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -61,4 +146,46 @@ def load_object(file_path: str):
             return dill.load(file_obj)
     except Exception as e:
         raise CustomException(e, sys)            
-    
\ No newline at end of file
+    
+
+def _to_builtin(value):
+    if isinstance(value, dict):
+        return {key: _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def artifact_to_dict(artifact) -> dict:
+    """
+    Converts an artifact dataclass (nested dataclasses included) into plain YAML friendly values.
+    """
+    try:
+        return _to_builtin(dataclasses.asdict(artifact))
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def artifact_from_dict(artifact_cls, content: dict):
+    """
+    Rebuilds an artifact dataclass written by `artifact_to_dict`, nested dataclasses included.
+    """
+    try:
+        field_types = typing.get_type_hints(artifact_cls)
+        kwargs = {}
+        for field in dataclasses.fields(artifact_cls):
+            if field.name not in content:
+                continue
+            value = content[field.name]
+            field_type = field_types[field.name]
+            # unwrap Optional[...] to find nested artifacts
+            candidates = [arg for arg in typing.get_args(field_type) if arg is not type(None)] or [field_type]
+            nested = next((candidate for candidate in candidates if dataclasses.is_dataclass(candidate)), None)
+            if nested is not None and isinstance(value, dict):
+                value = artifact_from_dict(nested, value)
+            kwargs[field.name] = value
+        return artifact_cls(**kwargs)
+    except Exception as e:
+        raise CustomException(e, sys)
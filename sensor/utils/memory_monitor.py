@@ -0,0 +1,57 @@
+import os
+import resource
+import sys
+import threading
+from sensor.exception import CustomException
+
+STATM_FILE_PATH = "/proc/self/statm"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss_mb() -> float:
+    """
+    Current resident set size of the process in MB (the lifetime peak where /proc is not available).
+    """
+    try:
+        if os.path.exists(STATM_FILE_PATH):
+            with open(STATM_FILE_PATH) as file:
+                return int(file.read().split()[1]) * PAGE_SIZE / 1024 ** 2
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KB elsewhere
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class PeakMemoryMonitor:
+    """
+    Samples the process RSS on a background thread while the `with` block runs and
+    records the highest value seen (`peak_mb`) and its increase over the start (`increase_mb`).
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, get_rss_mb())
+
+    def __enter__(self) -> "PeakMemoryMonitor":
+        self.start_mb = self.peak_mb = get_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, get_rss_mb())
+
+    @property
+    def increase_mb(self) -> float:
+        return self.peak_mb - self.start_mb
@@ -0,0 +1,114 @@
+from typing import Dict, Iterator, List, Optional
+import os
+import sys
+import numpy as np
+import pandas as pd
+from sensor.constant.database import NA_VALUE
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, SCHEMA_DROP_COLS, TARGET_COLUMN, CSV_FILE_EXTENSION
+from sensor.exception import CustomException
+from sensor.logger import logging
+from sensor.ml.model.estimator import TargetValueMapping
+from sensor.utils.main_utils import read_yaml_file, read_dataframe, read_dataframe_columns, iter_dataframe_chunks
+
+# schema.yaml type -> compact pandas dtype; sensor readings are float32 because "na" needs NaN
+SCHEMA_TYPE_MAPPING = {
+    "int": np.float32,
+    "float": np.float32,
+    "category": "category",
+}
+
+
+class SchemaLoader:
+    """
+    Compiles config/schema.yaml once into a dtype map (float32 for the sensor columns,
+    a categorical for `class`) and loads every DataFrame with it, so the "na" readings
+    never produce object or float64 columns.
+    """
+    _loaders: Dict[str, "SchemaLoader"] = {}
+
+    def __init__(self, schema_file_path: str = SCHEMA_FILE_PATH):
+        try:
+            schema = read_yaml_file(schema_file_path)
+            self.columns: List[str] = [name for column in schema["columns"] for name in column]
+            self.numerical_columns: List[str] = list(schema.get("numerical_columns", []))
+            self.drop_columns: List[str] = list(schema.get(SCHEMA_DROP_COLS, []))
+            self.dtypes = {}
+            for column in schema["columns"]:
+                for name, schema_type in column.items():
+                    self.dtypes[name] = SCHEMA_TYPE_MAPPING.get(schema_type, np.float32)
+            if self.dtypes.get(TARGET_COLUMN) == "category":
+                self.dtypes[TARGET_COLUMN] = pd.CategoricalDtype(categories=list(TargetValueMapping().to_dict().keys()))
+            logging.info(f"Compiled schema {schema_file_path} into a dtype map of {len(self.dtypes)} columns")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def get(cls, schema_file_path: str = SCHEMA_FILE_PATH) -> "SchemaLoader":
+        """
+        Returns the loader of `schema_file_path`, compiling the schema only on first use.
+        """
+        if schema_file_path not in cls._loaders:
+            cls._loaders[schema_file_path] = cls(schema_file_path)
+        return cls._loaders[schema_file_path]
+
+    def _usecols(self, columns: Optional[List[str]], schema_columns_only: bool):
+        wanted = set(columns) if columns is not None else None
+
+        def usecols(column: str) -> bool:
+            if wanted is not None:
+                return column in wanted
+            return column in self.dtypes or not schema_columns_only
+        return usecols
+
+    def read_csv(self, file_path_or_buffer, columns: Optional[List[str]] = None,
+                 schema_columns_only: bool = True) -> pd.DataFrame:
+        """
+        Parses a CSV straight into the schema dtypes with "na" as missing value.
+        Only schema columns (or the requested `columns`) are parsed unless
+        `schema_columns_only` is False, which keeps unknown columns for validation.
+        """
+        try:
+            return pd.read_csv(file_path_or_buffer, dtype=self.dtypes, na_values=[NA_VALUE],
+                               usecols=self._usecols(columns, schema_columns_only))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def apply(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Casts the schema columns of an already loaded DataFrame (e.g. Parquet) to the schema dtypes.
+        """
+        try:
+            dtypes = {column: dtype for column, dtype in self.dtypes.items()
+                      if column in dataframe.columns and dataframe[column].dtype != dtype}
+            if not dtypes:
+                return dataframe
+            return dataframe.astype(dtypes, copy=False)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def read(self, file_path: str, columns: Optional[List[str]] = None, schema_columns_only: bool = True) -> pd.DataFrame:
+        try:
+            if os.path.splitext(file_path)[1] == CSV_FILE_EXTENSION:
+                return self.read_csv(file_path, columns=columns, schema_columns_only=schema_columns_only)
+            if schema_columns_only and columns is None:
+                columns = [column for column in read_dataframe_columns(file_path) if column in self.dtypes]
+            return self.apply(read_dataframe(file_path, columns=columns))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def iter_chunks(self, file_path: str, chunk_size: int, columns: Optional[List[str]] = None,
+                    schema_columns_only: bool = True) -> Iterator[pd.DataFrame]:
+        """
+        Same as `read`, one chunk of at most `chunk_size` rows at a time.
+        """
+        try:
+            if os.path.splitext(file_path)[1] == CSV_FILE_EXTENSION:
+                yield from pd.read_csv(file_path, dtype=self.dtypes, na_values=[NA_VALUE], chunksize=chunk_size,
+                                       usecols=self._usecols(columns, schema_columns_only))
+                return
+            if schema_columns_only and columns is None:
+                columns = [column for column in read_dataframe_columns(file_path) if column in self.dtypes]
+            for chunk in iter_dataframe_chunks(file_path, chunk_size, columns=columns):
+                yield self.apply(chunk)
+        except Exception as e:
+            raise CustomException(e, sys)
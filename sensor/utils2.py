@@ -1,20 +1,19 @@
-import pandas as pd
-import numpy as np
 from sensor.logger import logging
-import json
 from sensor.config import mongo_client
+from sensor.constant.database import BULK_LOAD_CHUNK_SIZE, BULK_LOAD_BATCH_SIZE, BULK_LOAD_WORKERS
+from sensor.data_access.bulk_loader import bulk_load_csv
 from sensor.exception import CustomException
 import sys
 
 def dump_csv_file_to_mongodb_collection(file_path:str,database_name:str,
-                                        collection_name:str)->None:
+                                        collection_name:str,
+                                        chunk_size:int = BULK_LOAD_CHUNK_SIZE,
+                                        batch_size:int = BULK_LOAD_BATCH_SIZE,
+                                        n_workers:int = BULK_LOAD_WORKERS)->None:
     try:
-        df = pd.read_csv(file_path)
-        df.reset_index(drop =True, inplace = True)
-        json_records = list(json.loads(df.T.to_json()).values())
-        
-        mongo_client[database_name][collection_name].insert_many(json_records)
-        logging.info("Data Has been transfered to Mongo Db")
+        inserted = bulk_load_csv(mongo_client[database_name][collection_name], file_path,
+                                 chunk_size=chunk_size, batch_size=batch_size, n_workers=n_workers)
+        logging.info(f"Data Has been transfered to Mongo Db: {inserted} documents")
         
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)